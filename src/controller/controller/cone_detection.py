@@ -0,0 +1,113 @@
+"""
+Cone detection with the fine-tuned YOLOv5 model on the CPU.
+
+`ConeDetector` loads the model once and keeps it warm. `DetectionWorker` runs it
+on a thread or in a separate process, so the caller only hands over frames and
+collects the results later. It takes one batch at a time, which lets the caller
+always give it the newest frames instead of queueing old ones.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# columns of the detections of a frame
+X_MIN, Y_MIN, X_MAX, Y_MAX, CONFIDENCE, CLASS = range(6)
+
+
+class ConeDetector:
+    """YOLOv5 model loaded through torch.hub.
+
+    :param str model: path of the fine-tuned weights
+    :param int input_size: pixels of the longer side of the images the model sees
+    :param float confidence: lowest confidence of a detection
+    :param int threads: torch CPU threads, 0 keeps torch's default
+    """
+
+    def __init__(self, model: str, input_size: int = 320, confidence: float = 0.4, threads: int = 0):
+        import torch
+
+        if threads:
+            torch.set_num_threads(threads)
+        self._torch = torch
+        self.model = torch.hub.load("ultralytics/yolov5", "custom", model, device="cpu")
+        self.model.conf = confidence
+        self.model.eval()
+        self.input_size = input_size
+        # the first inferences allocate and tune, they are not paid by the first frame
+        for _ in range(2):
+            self.detect([np.zeros((input_size, input_size, 3), dtype=np.uint8)])
+
+    def detect(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """Detections of every BGR image, (n, 6) arrays of box, confidence and class in its pixels"""
+        with self._torch.inference_mode():
+            results = self.model([image[..., ::-1] for image in images], size=self.input_size)
+        return [boxes.cpu().numpy() for boxes in results.xyxy]
+
+
+def _serve(config: dict, requests, results) -> None:
+    # worker loop, a None request ends it
+    detector = ConeDetector(**config)
+    results.put(None)  # ready
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        key, images = request
+        start = time.perf_counter()
+        detections = detector.detect(images)
+        results.put((key, detections, time.perf_counter() - start))
+
+
+class DetectionWorker:
+    """Runs a `ConeDetector` next to the caller, one batch at a time.
+
+    :param dict config: arguments of the `ConeDetector`
+    :param bool process: run in a separate process instead of a thread, so neither
+        the GIL nor the model's threads compete with the caller
+    """
+
+    def __init__(self, config: dict, process: bool = True):
+        if process:
+            # a fresh interpreter, the caller's ROS context does not survive a fork
+            context = multiprocessing.get_context("spawn")
+            self._requests, self._results = context.Queue(), context.Queue()
+            self._worker = context.Process(target=_serve, args=(config, self._requests, self._results), daemon=True)
+        else:
+            self._requests, self._results = queue.Queue(), queue.Queue()
+            self._worker = threading.Thread(target=_serve, args=(config, self._requests, self._results), daemon=True)
+        self._worker.start()
+        self.ready = False
+        self.busy = False
+
+    def submit(self, key, images: List[np.ndarray]) -> bool:
+        """Hand over a batch of images, returns False while the last one is not done"""
+        if not self.ready or self.busy:
+            return False
+        self.busy = True
+        self._requests.put((key, images))
+        return True
+
+    def result(self) -> Optional[Tuple[object, List[np.ndarray], float]]:
+        """Key, detections and inference seconds of the finished batch, None if there is none"""
+        try:
+            result = self._results.get_nowait()
+        except queue.Empty:
+            return None
+        if result is None:
+            self.ready = True
+            return None
+        self.busy = False
+        return result
+
+    @property
+    def alive(self) -> bool:
+        return self._worker.is_alive()
+
+    def close(self) -> None:
+        self._requests.put(None)
+        self._worker.join(timeout=5)
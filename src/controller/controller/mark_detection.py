@@ -0,0 +1,85 @@
+"""
+Track marks found by color in camera frames.
+
+`MarkDetector` thresholds a downscaled region of interest of the frame in HSV and
+takes the largest connected component as the mark, with OpenCV doing all the
+per-pixel work. A hue range whose lower bound is above the upper one wraps around
+red, like [170, 10].
+"""
+
+from collections import namedtuple
+from typing import Optional, Sequence
+
+import cv2
+import numpy as np
+
+# in pixels of the camera frame, x and y are the centroid, left, top, width and height
+# the bounding box
+Mark = namedtuple("Mark", ["x", "y", "left", "top", "width", "height", "area"])
+
+
+class MarkDetector:
+    """Finds the largest blob of a color in BGR frames.
+
+    :param lower: lowest HSV color of a mark, OpenCV ranges (hue 0 to 179)
+    :param upper: highest HSV color of a mark
+    :param roi: left, top, right and bottom of the searched region as fractions of the frame
+    :param float scale: factor the region is shrunk by before thresholding
+    :param float min_area: smallest area in frame pixels of a mark
+    """
+
+    def __init__(
+        self,
+        lower: Sequence[int],
+        upper: Sequence[int],
+        roi: Sequence[float] = (0.0, 0.0, 1.0, 1.0),
+        scale: float = 0.5,
+        min_area: float = 0.0,
+    ):
+        lower, upper = np.asarray(lower, dtype=np.uint8), np.asarray(upper, dtype=np.uint8)
+        if lower[0] <= upper[0]:
+            self.ranges = [(lower, upper)]
+        else:
+            # the hue range wraps around 180
+            self.ranges = [
+                (lower, np.array([179, upper[1], upper[2]], dtype=np.uint8)),
+                (np.array([0, lower[1], lower[2]], dtype=np.uint8), upper),
+            ]
+        self.roi = tuple(float(v) for v in roi)
+        self.scale = scale
+        self.min_area = min_area
+        self.mask = None
+
+    def detect(self, image: np.ndarray) -> Optional[Mark]:
+        """Largest mark in the BGR `image`, None if there is none"""
+        height, width = image.shape[:2]
+        left, top, right, bottom = self.roi
+        x0, y0 = int(left * width), int(top * height)
+        region = image[y0 : int(bottom * height), x0 : int(right * width)]
+        if self.scale != 1.0:
+            region = cv2.resize(region, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        hsv = cv2.cvtColor(region, cv2.COLOR_BGR2HSV)
+        self.mask = cv2.inRange(hsv, *self.ranges[0])
+        for lower, upper in self.ranges[1:]:
+            cv2.bitwise_or(self.mask, cv2.inRange(hsv, lower, upper), dst=self.mask)
+
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(self.mask, connectivity=8)
+        if count < 2:
+            return None
+        # label 0 is the background
+        largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        area = stats[largest, cv2.CC_STAT_AREA] / self.scale**2
+        if area < self.min_area:
+            return None
+        # pixel centers of the shrunk region back to those of the frame
+        cx, cy = (centroids[largest] + 0.5) / self.scale - 0.5
+        return Mark(
+            x0 + float(cx),
+            y0 + float(cy),
+            x0 + stats[largest, cv2.CC_STAT_LEFT] / self.scale,
+            y0 + stats[largest, cv2.CC_STAT_TOP] / self.scale,
+            stats[largest, cv2.CC_STAT_WIDTH] / self.scale,
+            stats[largest, cv2.CC_STAT_HEIGHT] / self.scale,
+            area,
+        )
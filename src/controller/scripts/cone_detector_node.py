@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import rclpy
+from rclpy.node import Node
+from collections import deque
+import cv2
+
+from sensor_msgs.msg import Image
+from custom_msgs.msg import Detections
+
+from controller.cone_detection import CLASS, CONFIDENCE, X_MAX, X_MIN, Y_MAX, Y_MIN, DetectionWorker
+from drivers.config import node_config
+from drivers.image import FRAME_QOS, ImageDecoder, stamp_latency
+
+class ConeDetectorNode(Node):
+
+    def __init__(self):
+        super().__init__('cone_detector_node')
+        self.logger = self.get_logger()
+        self.logger.info('Initializing cone detector node...')
+
+        # load config
+        config = node_config(self, "detection")
+        self.input_size = int(config.input_size)
+        self.batch = int(config.get("batch", 1))
+
+        # the model loads in the background, frames are dropped until it is warm
+        self.worker = DetectionWorker(
+            {
+                "model": config.model,
+                "input_size": self.input_size,
+                "confidence": float(config.confidence),
+                "threads": int(config.get("threads", 0)),
+            },
+            process=bool(config.get("worker", 1)),
+        )
+
+        # the newest frames only, older ones are dropped while the model is busy
+        self.frames = deque(maxlen=self.batch)
+        self.dropped = 0
+        self.decoder = ImageDecoder()
+
+        # init subscribers and publishers
+        self.image_subscriber = self.create_subscription(Image, config.image_topic, self.image_callback, FRAME_QOS)
+        self.detection_publisher = self.create_publisher(Detections, config.topic, 10)
+        self.timer = self.create_timer(0.005, self.timer_callback)
+
+        self.logger.info('Cone detector node launched.')
+
+    def image_callback(self, msg: Image):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append(msg)
+
+    def timer_callback(self):
+        result = self.worker.result()
+        if result is not None:
+            self.publish(*result)
+        if not self.worker.alive:
+            self.logger.error("Detection worker stopped.", once=True)
+            return
+
+        if not self.worker.ready or self.worker.busy or not self.frames:
+            return
+        frames = list(self.frames)
+        self.frames.clear()
+
+        images, scales = [], []
+        for msg in frames:
+            # the model sees `input_size` pixels anyway, shrinking here saves the copy of the rest
+            image = self.decoder.decode(msg)
+            scale = min(1.0, self.input_size / max(image.shape[:2]))
+            if scale < 1.0:
+                image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            else:
+                image = image.copy()
+            images.append(image)
+            scales.append(scale)
+        headers = [msg.header for msg in frames]
+        self.worker.submit((headers, scales, self.dropped), images)
+        self.dropped = 0
+
+    def publish(self, key, detections, inference_time):
+        self.logger.info("Publishing detections...", once=True)
+
+        headers, scales, dropped = key
+        for header, scale, boxes in zip(headers, scales, detections):
+            msg = Detections()
+            msg.header = header
+            msg.inference_time = float(inference_time)
+            msg.latency = float(stamp_latency(self, msg))
+            msg.dropped = dropped
+            msg.x_min = (boxes[:, X_MIN] / scale).tolist()
+            msg.y_min = (boxes[:, Y_MIN] / scale).tolist()
+            msg.x_max = (boxes[:, X_MAX] / scale).tolist()
+            msg.y_max = (boxes[:, Y_MAX] / scale).tolist()
+            msg.confidence = boxes[:, CONFIDENCE].tolist()
+            msg.class_id = boxes[:, CLASS].astype(int).tolist()
+            self.detection_publisher.publish(msg)
+            dropped = 0
+
+if __name__ == "__main__":
+    rclpy.init(args=None)
+
+    cone_detector_node = ConeDetectorNode()
+    rclpy.spin(cone_detector_node)
+
+    cone_detector_node.worker.close()
+    cone_detector_node.destroy_node()
+    rclpy.shutdown()
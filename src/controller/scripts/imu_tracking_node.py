@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
 
 #!/usr/bin/env python3
+import os
 import rclpy
 from rclpy.node import Node
+from rclpy.qos import DurabilityPolicy, QoSProfile
 from time import sleep
 import numpy as np
 
 from custom_msgs.msg import Imu
 from nav_msgs.msg import Odometry
+from std_msgs.msg import UInt8
 
 from controller.imu_position_tracking.imu_tracker import IMUTracker
+from drivers.config import load_config
+from drivers.imu_calibration import TrackerCalibration
+
+# stationary samples for a cold start, the first 100 are dropped
+COLD_START_SAMPLES = 600
+# samples for the directions of gravity and the magnetic field on a warm start
+WARM_START_SAMPLES = 40
+GRAVITY = 9.80665
+
+def rotation_matrix(w, x, y, z):
+    """Rotation from the sensor frame to the navigation frame of a unit quaternion"""
+    return np.array([
+        [1 - 2*(y*y + z*z), 2*(x*y - w*z), 2*(x*z + w*y)],
+        [2*(x*y + w*z), 1 - 2*(x*x + z*z), 2*(y*z - w*x)],
+        [2*(x*z - w*y), 2*(y*z + w*x), 1 - 2*(x*x + y*y)],
+    ])
 
 class ImuTrackerNode(Node):
 
@@ -24,31 +43,64 @@ class ImuTrackerNode(Node):
         topic = "/imu_tracker/odom"
         self.sample_rate = 150
         # fs.release()
+        calibration_dir = load_config().section("sensors", "imu").get("calibration_dir", "~/.cache/bedman")
+        self.calibration = TrackerCalibration(os.path.join(os.path.expanduser(calibration_dir), "imu_tracker.json"))
+        self.bno_accuracy = None
 
         # Init subscribers
         self.imu_subscriber = self.create_subscription(Imu, imu_topic, self.imu_callback, 10)
+        self.calibration_subscriber = self.create_subscription(
+            UInt8, imu_topic + "/calibration", self.calibration_callback,
+            QoSProfile(depth=1, durability=DurabilityPolicy.TRANSIENT_LOCAL)
+        )
         self.odom_publisher = self.create_publisher(Odometry, topic, 10)
 
         self.imu_tracker = IMUTracker(sampling=self.sample_rate)
         self.initialized = False
         self.imu_data = []
 
+        # state of the position integration on top of the sensor's fused orientation
+        self.velocity = np.zeros(3)
+        self.position = np.zeros(3)
+        self.last_stamp = None
+        self.fused_samples = 0
+        self.orientation = None
+
+        # latest gyro, accelerometer and magnetometer readings, the slower reports are
+        # only in some messages
+        self.readings = [None, None, None]
+
         self.logger.info('IMU tracker node launched.')
 
     def imu_callback(self, msg: Imu):
         self.logger.info("Received IMU data...", once=True)
 
-        data = [msg.angular_velocity.x, msg.angular_velocity.y, msg.angular_velocity.z,
-                msg.linear_acceleration.x, msg.linear_acceleration.y, msg.linear_acceleration.z,
-                msg.magnetic_field.x, msg.magnetic_field.y, msg.magnetic_field.z]
-
-        self.imu_data.append(data)
-
-        if not self.initialized and len(self.imu_data) > 600:
-            self.imu_tracker.initialize(np.array(self.imu_data[100:], dtype=np.float32))
-            self.initialized = True
-            self.logger.info("IMU tracker initialized.", once=True)
-            self.imu_data = []
+        fields = (
+            (msg.angular_velocity, msg.angular_velocity_covariance),
+            (msg.linear_acceleration, msg.linear_acceleration_covariance),
+            (msg.magnetic_field, msg.magnetic_field_covariance),
+        )
+        for i, (vector, covariance) in enumerate(fields):
+            # covariance[0] is -1 when the message does not carry the reading
+            if covariance[0] >= 0:
+                self.readings[i] = [vector.x, vector.y, vector.z]
+
+        if msg.orientation_covariance[0] >= 0:
+            self.orientation = msg.orientation
+        if self.orientation is not None:
+            # the BNO fuses the orientation on chip, only the position is left to integrate
+            if msg.linear_acceleration_covariance[0] >= 0:
+                self.track_fused(msg)
+            return
+
+        if any(reading is None for reading in self.readings):
+            return
+        self.imu_data.append(self.readings[0] + self.readings[1] + self.readings[2])
+
+        if not self.initialized and len(self.imu_data) > WARM_START_SAMPLES and self.calibration.usable(self.bno_accuracy):
+            self.warm_start()
+        elif not self.initialized and len(self.imu_data) > COLD_START_SAMPLES:
+            self.cold_start()
 
         if self.initialized and len(self.imu_data) > (self.sample_rate / 10): # Estimate position every 0.1s
             P = self.imu_tracker.track(np.array(self.imu_data, dtype=np.float32))
@@ -68,6 +120,63 @@ class ImuTrackerNode(Node):
             # msg.pose.pose.orientation.z = float(Q[3])
             self.odom_publisher.publish(msg)
 
+    def track_fused(self, msg: Imu):
+        self.logger.info("Tracking with the IMU's fused orientation.", once=True)
+
+        stamp = msg.header.stamp.sec + msg.header.stamp.nanosec * 1e-9
+        dt, self.last_stamp = (0.0 if self.last_stamp is None else stamp - self.last_stamp), stamp
+        if not 0 < dt < 0.1:
+            return  # first sample or a gap, nothing to integrate over
+
+        q = self.orientation
+        a = msg.linear_acceleration
+        # the accelerometer measures gravity too, it points up in the navigation frame
+        a_nav = rotation_matrix(q.w, q.x, q.y, q.z) @ np.array([a.x, a.y, a.z]) - np.array([0.0, 0.0, GRAVITY])
+        self.position += (self.velocity + 0.5 * a_nav * dt) * dt
+        self.velocity += a_nav * dt
+
+        self.fused_samples += 1
+        if self.fused_samples < self.sample_rate / 10: # Publish position every 0.1s
+            return
+        self.fused_samples = 0
+
+        odom = Odometry()
+        odom.header.stamp = msg.header.stamp
+        odom.pose.pose.position.x = float(self.position[0])
+        odom.pose.pose.position.y = float(self.position[1])
+        odom.pose.pose.position.z = 0.0
+        odom.pose.pose.orientation = self.orientation
+        self.odom_publisher.publish(odom)
+
+    def calibration_callback(self, msg: UInt8):
+        self.bno_accuracy = msg.data
+
+    def cold_start(self):
+        self.imu_tracker.initialize(np.array(self.imu_data[100:], dtype=np.float32))
+        self.initialized = True
+        self.imu_data = []
+
+        # only the sensor's bias and noise are kept, gravity and the magnetic field depend on the pose
+        gn, g0, mn, gyro_noise, gyro_bias, acc_noise, mag_noise = self.imu_tracker._init_list
+        self.calibration.save(
+            self.bno_accuracy, gyro_noise=gyro_noise, gyro_bias=gyro_bias, acc_noise=acc_noise, mag_noise=mag_noise
+        )
+        self.logger.info("IMU tracker initialized.")
+
+    def warm_start(self):
+        self.imu_tracker.initialize(np.array(self.imu_data, dtype=np.float32))
+        self.initialized = True
+        self.imu_data = []
+
+        stored = self.calibration.stored
+        gn, g0, mn, *_ = self.imu_tracker._init_list
+        self.imu_tracker._init_list = (
+            gn, g0, mn,
+            float(stored["gyro_noise"]), np.array(stored["gyro_bias"], dtype=np.float32),
+            float(stored["acc_noise"]), float(stored["mag_noise"]),
+        )
+        self.logger.info("IMU tracker initialized from the stored calibration.")
+
 if __name__ == "__main__":
     rclpy.init(args=None)
 
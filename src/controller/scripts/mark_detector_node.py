@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import rclpy
+from rclpy.node import Node
+
+from sensor_msgs.msg import Image
+from custom_msgs.msg import Mark
+
+from controller.mark_detection import MarkDetector
+from drivers.config import node_config
+from drivers.image import FRAME_QOS, ImageDecoder
+
+class MarkDetectorNode(Node):
+
+    def __init__(self):
+        super().__init__('mark_detector_node')
+        self.logger = self.get_logger()
+        self.logger.info('Initializing mark detector node...')
+
+        # load config
+        config = node_config(self, "mark_detection")
+        self.detector = MarkDetector(
+            [int(v) for v in config.hsv_lower],
+            [int(v) for v in config.hsv_upper],
+            roi=[float(v) for v in config.roi],
+            scale=float(config.scale),
+            min_area=float(config.min_area),
+        )
+        self.decoder = ImageDecoder()
+
+        # init subscribers and publishers, every frame is answered in its own callback
+        self.image_subscriber = self.create_subscription(Image, config.image_topic, self.image_callback, FRAME_QOS)
+        self.mark_publisher = self.create_publisher(Mark, config.topic, 10)
+
+        self.logger.info('Mark detector node launched.')
+
+    def image_callback(self, msg: Image):
+        self.logger.info("Publishing marks...", once=True)
+
+        mark = self.detector.detect(self.decoder.decode(msg))
+
+        out = Mark()
+        out.header = msg.header
+        out.found = mark is not None
+        if mark is not None:
+            out.x, out.y = float(mark.x), float(mark.y)
+            out.left, out.top = float(mark.left), float(mark.top)
+            out.width, out.height = float(mark.width), float(mark.height)
+            out.area = float(mark.area)
+        self.mark_publisher.publish(out)
+
+if __name__ == "__main__":
+    rclpy.init(args=None)
+
+    mark_detector_node = MarkDetectorNode()
+    rclpy.spin(mark_detector_node)
+
+    mark_detector_node.destroy_node()
+    rclpy.shutdown()
@@ -0,0 +1,141 @@
+"""
+Battery state of charge estimation.
+
+The charge is counted from the measured current over the time that really
+passed between two samples and slowly pulled towards the charge read from the
+open-circuit-voltage (OCV) curve of the cells. The open-circuit voltage is the
+terminal voltage plus the drop over the pack's internal resistance, which is
+estimated from the voltage change at every load step. A load spike therefore
+only moves the estimate by the charge it actually draws.
+"""
+
+import bisect
+import math
+
+# resting cell voltage at 0, 5, ..., 100 % charge, typical curves of hobby packs
+OCV_TABLES = {
+    "LIPO": (
+        3.27, 3.61, 3.69, 3.71, 3.73, 3.75, 3.77, 3.79, 3.80, 3.82, 3.84,
+        3.85, 3.87, 3.91, 3.95, 3.98, 4.02, 4.08, 4.11, 4.15, 4.20,
+    ),
+    "LIHV": (
+        3.30, 3.63, 3.71, 3.74, 3.76, 3.78, 3.80, 3.82, 3.84, 3.86, 3.88,
+        3.91, 3.94, 3.98, 4.03, 4.07, 4.12, 4.17, 4.22, 4.28, 4.35,
+    ),
+}
+
+
+def soc_from_ocv(chemistry: str, cell_voltage: float) -> float:
+    """State of charge (0 to 1) of a resting cell at `cell_voltage`"""
+    table = OCV_TABLES[chemistry]
+    if cell_voltage <= table[0]:
+        return 0.0
+    if cell_voltage >= table[-1]:
+        return 1.0
+    i = bisect.bisect_right(table, cell_voltage)
+    step = 1 / (len(table) - 1)
+    low, high = table[i - 1], table[i]
+    return (i - 1 + (cell_voltage - low) / (high - low)) * step
+
+
+class SocEstimator:
+    """Coulomb counting with OCV correction for one battery pack.
+
+    Currents are in A and positive while discharging, voltages are the pack's
+    terminal voltage in V and times are monotonic seconds.
+
+    :param str chemistry: key of `OCV_TABLES`
+    :param int cells: cells in series
+    :param float capacity: capacity in Ah
+    :param float resistance: initial internal resistance of the pack in ohm
+    :param float rest_current: currents below this (in A) count as resting
+    :param float rest_time_constant: seconds to converge to the OCV charge at rest
+    :param float load_time_constant: seconds to converge to the OCV charge under load
+    :param float current_time_constant: seconds of current averaged for the runtime
+    :param float max_gap: longer gaps between samples are not integrated
+    """
+
+    def __init__(
+        self,
+        chemistry: str,
+        cells: int,
+        capacity: float,
+        resistance: float = None,
+        rest_current: float = 0.05,
+        rest_time_constant: float = 60.0,
+        load_time_constant: float = 900.0,
+        current_time_constant: float = 30.0,
+        max_gap: float = 5.0,
+    ):
+        if chemistry not in OCV_TABLES:
+            raise ValueError(f"Unsupported battery type: {chemistry}")
+        self.chemistry = chemistry
+        self.cells = cells
+        self.capacity = capacity
+        # typical 15 mOhm per cell until the first load step was seen
+        self.resistance = resistance if resistance is not None else 0.015 * cells
+        self.rest_current = rest_current
+        self.rest_time_constant = rest_time_constant
+        self.load_time_constant = load_time_constant
+        self.current_time_constant = current_time_constant
+        self.max_gap = max_gap
+
+        self.soc = None
+        self.average_current = 0.0
+        self._last = None  # voltage, current and time of the previous sample
+
+    @property
+    def charge(self) -> float:
+        """Remaining charge in Ah"""
+        return 0.0 if self.soc is None else self.soc * self.capacity
+
+    @property
+    def runtime(self) -> float:
+        """Seconds until empty at the average current, inf while not discharging"""
+        if self.soc is None or self.average_current <= self.rest_current:
+            return math.inf
+        return self.charge / self.average_current * 3600
+
+    def ocv_soc(self, voltage: float, current: float) -> float:
+        """State of charge from the OCV curve, with the resistive drop added back"""
+        ocv = voltage + current * self.resistance
+        return soc_from_ocv(self.chemistry, ocv / self.cells)
+
+    def update(self, voltage: float, current: float, time: float, charge: float = None) -> float:
+        """Add a sample, returns the state of charge (0 to 1). `charge` is the charge in Ah
+        drawn since the last sample if the caller integrated it from more samples."""
+        if self._last is None:
+            self.soc = self.ocv_soc(voltage, current)
+            self.average_current = current
+            self._last = (voltage, current, time)
+            return self.soc
+
+        last_voltage, last_current, last_time = self._last
+        self._last = (voltage, current, time)
+        dt = time - last_time
+        if dt <= 0:
+            return self.soc
+
+        if dt <= self.max_gap:
+            if charge is None:
+                # trapezoidal integration of the current
+                charge = (last_current + current) / 2 * dt / 3600
+            self._update_resistance(voltage - last_voltage, current - last_current)
+        if charge is not None:
+            self.soc -= charge / self.capacity
+
+        # the voltage is trusted more the less current flows
+        tau = self.rest_time_constant if abs(current) < self.rest_current else self.load_time_constant
+        self.soc += dt / (tau + dt) * (self.ocv_soc(voltage, current) - self.soc)
+        self.soc = min(1.0, max(0.0, self.soc))
+
+        self.average_current += dt / (self.current_time_constant + dt) * (current - self.average_current)
+        return self.soc
+
+    def _update_resistance(self, delta_voltage: float, delta_current: float, min_step: float = 0.2) -> None:
+        # a load step between two close samples shows the resistance as the voltage change
+        if abs(delta_current) < min_step:
+            return
+        resistance = -delta_voltage / delta_current
+        if 0 < resistance < 0.2 * self.cells:
+            self.resistance += 0.1 * (resistance - self.resistance)
@@ -0,0 +1,147 @@
+"""
+Non-blocking device bring-up for driver nodes.
+
+Every device is initialized in its own background thread and retried with a
+capped exponential backoff, so a node starts serving the devices that came up
+while the missing ones keep being retried. The state of every device is
+published as a diagnostic_msgs/DiagnosticArray on /diagnostics.
+"""
+
+import threading
+
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+_LEVELS = {
+    PENDING: DiagnosticStatus.WARN,
+    READY: DiagnosticStatus.OK,
+    FAILED: DiagnosticStatus.ERROR,
+}
+
+
+class Device:
+    """A device handled by `BringUp`.
+
+    `value` is whatever the init function returned, or None while the device
+    is not ready. Readers should take `value` once per use, since a failing
+    device is reset from another thread.
+    """
+
+    def __init__(self, manager: "BringUp", name: str, init):
+        self.name = name
+        self.state = PENDING
+        self.value = None
+        self.error = None
+        self.attempts = 0
+        self._manager = manager
+        self._init = init
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def fail(self, error: Exception) -> None:
+        """Report a device that stopped working, its bring-up starts over in the background"""
+        self._manager._restart(self, error)
+
+
+class BringUp:
+    """Initializes the devices of `node` concurrently.
+
+    :param Node node: node used for logging and to publish the device states
+    :param float initial_timeout: seconds to wait after the first failed attempt
+    :param float max_timeout: upper bound of the doubling retry timeout
+    :param float status_period: seconds between two readiness publications
+    """
+
+    def __init__(self, node, initial_timeout: float = 1.0, max_timeout: float = 30.0, status_period: float = 1.0):
+        self.devices = []
+        self._node = node
+        self._logger = node.get_logger()
+        self._initial_timeout = initial_timeout
+        self._max_timeout = max_timeout
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self._status_pub = node.create_publisher(DiagnosticArray, "/diagnostics", 10)
+        self._status_timer = node.create_timer(status_period, self.publish_status)
+
+    def add(self, name: str, init) -> Device:
+        """Register a device and start bringing it up. `init` takes no arguments
+        and returns the initialized device or raises."""
+        device = Device(self, name, init)
+        self.devices.append(device)
+        self._start(device)
+        return device
+
+    @property
+    def ready(self) -> bool:
+        """Whether every device is ready"""
+        return all(device.ready for device in self.devices)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the current bring-up threads are done or `timeout` seconds passed"""
+        for device in self.devices:
+            thread = device._thread
+            if thread is not None:
+                thread.join(timeout)
+        return self.ready
+
+    def shutdown(self) -> None:
+        """Stop retrying, devices that are not ready stay that way"""
+        self._stop.set()
+
+    def publish_status(self) -> None:
+        msg = DiagnosticArray()
+        msg.header.stamp = self._node.get_clock().now().to_msg()
+        for device in self.devices:
+            status = DiagnosticStatus()
+            status.level = _LEVELS[device.state]
+            status.name = f"{self._node.get_name()}: {device.name}"
+            status.hardware_id = device.name
+            status.message = device.error if device.state == FAILED else device.state
+            status.values = [KeyValue(key="attempts", value=str(device.attempts))]
+            msg.status.append(status)
+        self._status_pub.publish(msg)
+
+    def _start(self, device: Device) -> None:
+        device._thread = threading.Thread(target=self._run, args=(device,), name=f"bringup-{device.name}", daemon=True)
+        device._thread.start()
+
+    def _restart(self, device: Device, error: Exception) -> None:
+        with self._lock:
+            if device.state != READY:
+                return
+            device.state = FAILED
+            device.value = None
+            device.error = str(error)
+        self._logger.error(f"{device.name} stopped working: {error}")
+        self._start(device)
+
+    def _run(self, device: Device) -> None:
+        timeout = self._initial_timeout
+        while not self._stop.is_set():
+            self._logger.info(f"Initializing {device.name}...")
+            device.attempts += 1
+            try:
+                value = device._init()
+            except Exception as e:
+                device.error = str(e)
+                device.state = FAILED
+                self._logger.error(f"Failed to initialize {device.name}: {e}")
+                self._logger.error(f"Retrying in {timeout} seconds...")
+                if self._stop.wait(timeout):
+                    return
+                timeout = min(timeout * 2, self._max_timeout)
+                continue
+
+            with self._lock:
+                device.value = value
+                device.error = None
+                device.state = READY
+            self._logger.info(f"{device.name} ready after {device.attempts} attempt(s).")
+            return
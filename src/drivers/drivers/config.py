@@ -0,0 +1,125 @@
+"""
+Shared access to config.yaml.
+
+The file is parsed once per process with PyYAML and exposed as read-only
+sections with attribute access, so nodes no longer need OpenCV just to read
+their settings. Every value of a node's section can be overridden with a ROS
+parameter of the same dotted name, e.g. `--ros-args -p sample_rate:=100` or
+`-p pins.signal:=12`.
+"""
+
+import copy
+import os
+from functools import lru_cache
+from typing import Any, Iterator, List, Mapping, Tuple
+
+import yaml
+
+CONFIG_PATH = os.environ.get("BEDMAN_CONFIG", "/home/user/ws/src/config/config.yaml")
+
+
+class Section(Mapping):
+    """Read-only view of a mapping in the config.
+
+    Keys are available both as items and as attributes. Nested mappings are
+    returned as sections too, all other values keep the type YAML gave them.
+    """
+
+    def __init__(self, data: dict, name: str = ""):
+        self._data = data
+        self._name = name
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            raise KeyError(f"missing config key '{self._key(key)}'") from None
+        if isinstance(value, dict):
+            return Section(value, self._key(key))
+        return value
+
+    def __getattr__(self, key: str) -> Any:
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self[key]
+        except KeyError as e:
+            raise AttributeError(e.args[0]) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"Section({self._name!r}, {self._data!r})"
+
+    def _key(self, key: str) -> str:
+        return f"{self._name}.{key}" if self._name else key
+
+    def section(self, *path: str) -> "Section":
+        """Nested section at `path`"""
+        section = self
+        for key in path:
+            value = section[key]
+            if not isinstance(value, Section):
+                raise KeyError(f"config key '{section._key(key)}' is not a section")
+            section = value
+        return section
+
+    def to_dict(self) -> dict:
+        """Deep copy of the section as plain python objects"""
+        return copy.deepcopy(self._data)
+
+
+@lru_cache(maxsize=None)
+def load_config(path: str = CONFIG_PATH) -> Section:
+    """Parse the config file at `path`. The result is cached per process."""
+    with open(path, "r") as file:
+        lines = file.read().splitlines(keepends=True)
+    # the OpenCV style "%YAML 1.0" header has no document start marker, which
+    # PyYAML rejects, and carries nothing we need
+    while lines and lines[0].startswith("%"):
+        lines.pop(0)
+    return Section(yaml.safe_load("".join(lines)) or {})
+
+
+def _parameters(data: dict, prefix: str = "") -> List[Tuple[str, Any]]:
+    # flatten a section into (dotted name, value) pairs that ROS can hold as parameters
+    params = []
+    for key, value in data.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            params.extend(_parameters(value, name + "."))
+        elif value is None or (isinstance(value, list) and not value):
+            continue  # parameter type can not be inferred
+        elif isinstance(value, list) and any(isinstance(v, (dict, list)) for v in value):
+            continue  # not representable as a parameter
+        else:
+            params.append((name, value))
+    return params
+
+
+def node_config(node, *path: str, config_path: str = CONFIG_PATH) -> Section:
+    """Config section at `path` with the ROS parameter overrides of `node` applied.
+
+    Every value in the section is declared as a parameter of `node` with the
+    config value as default, so it also shows up in `ros2 param list`.
+    """
+    section = load_config(config_path).section(*path)
+    data = section.to_dict()
+
+    for name, default in _parameters(data):
+        value = node.declare_parameter(name, default).value
+        if isinstance(default, list):
+            value = list(value)  # array parameters come back as array.array
+        if value == default:
+            continue
+        *parents, key = name.split(".")
+        target = data
+        for parent in parents:
+            target = target[parent]
+        target[key] = value
+
+    return Section(data, ".".join(path))
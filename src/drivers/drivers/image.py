@@ -0,0 +1,141 @@
+"""
+Image ingestion for camera subscribers.
+
+`image_view` wraps the data of a sensor_msgs/Image as a NumPy array without
+copying it. `ImageDecoder` turns that view into BGR with a single OpenCV call into
+a buffer it reuses, and hands BGR images through as they are. `LatestFrame` keeps
+only the newest message, so a consumer that lags drops frames instead of working
+through a queue of stale ones, and `FrameStats` measures the rate and latency of
+the frames taken for an overlay.
+"""
+
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+from rclpy.qos import HistoryPolicy, QoSProfile, ReliabilityPolicy
+
+# channels and conversion to BGR of the encodings in sensor_msgs/image_encodings.hpp,
+# the Bayer codes follow OpenCV's naming, which is shifted by one row from ROS'
+ENCODINGS = {
+    "bgr8": (3, None),
+    "rgb8": (3, cv2.COLOR_RGB2BGR),
+    "bgra8": (4, cv2.COLOR_BGRA2BGR),
+    "rgba8": (4, cv2.COLOR_RGBA2BGR),
+    "mono8": (1, cv2.COLOR_GRAY2BGR),
+    "yuv422": (2, cv2.COLOR_YUV2BGR_UYVY),
+    "uyvy": (2, cv2.COLOR_YUV2BGR_UYVY),
+    "yuv422_yuy2": (2, cv2.COLOR_YUV2BGR_YUY2),
+    "yuyv": (2, cv2.COLOR_YUV2BGR_YUY2),
+    "bayer_rggb8": (1, cv2.COLOR_BayerBG2BGR),
+    "bayer_bggr8": (1, cv2.COLOR_BayerRG2BGR),
+    "bayer_gbrg8": (1, cv2.COLOR_BayerGR2BGR),
+    "bayer_grbg8": (1, cv2.COLOR_BayerGB2BGR),
+}
+
+# the newest frame only, one that arrives late is not worth retransmitting
+FRAME_QOS = QoSProfile(depth=1, history=HistoryPolicy.KEEP_LAST, reliability=ReliabilityPolicy.BEST_EFFORT)
+
+
+def image_view(msg) -> np.ndarray:
+    """The pixels of a sensor_msgs/Image as an (height, width[, channels]) view of msg.data"""
+    if msg.encoding not in ENCODINGS:
+        raise ValueError(f"unsupported image encoding {msg.encoding}")
+    channels = ENCODINGS[msg.encoding][0]
+    data = np.frombuffer(msg.data, dtype=np.uint8)
+    # rows may be padded past width * channels, the padding stays out of the view
+    rows = data[: msg.height * msg.step].reshape(msg.height, msg.step)[:, : msg.width * channels]
+    return rows.reshape(msg.height, msg.width, channels) if channels > 1 else rows
+
+
+class ImageDecoder:
+    """Decodes sensor_msgs/Image and CompressedImage messages to BGR.
+
+    The result of a conversion is written to a buffer that is reused for the next
+    frame, and BGR images are returned as views of the message, so the image is only
+    valid until the next call and must be copied to keep it.
+    """
+
+    def __init__(self):
+        self._buffer = None
+
+    def decode(self, msg) -> np.ndarray:
+        """BGR image of `msg`"""
+        if hasattr(msg, "format"):
+            # compressed, the decoder always allocates its output
+            return cv2.imdecode(np.frombuffer(msg.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+        view = image_view(msg)
+        code = ENCODINGS[msg.encoding][1]
+        if code is None:
+            return view
+        if self._buffer is None or self._buffer.shape[:2] != (msg.height, msg.width):
+            self._buffer = np.empty((msg.height, msg.width, 3), dtype=np.uint8)
+        return cv2.cvtColor(view, code, dst=self._buffer)
+
+
+class LatestFrame:
+    """Single message slot between a subscription callback and a consumer.
+
+    `put` replaces a message that was not taken yet and counts it as dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._msg = None
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, msg) -> None:
+        with self._lock:
+            if self._msg is not None:
+                self.dropped += 1
+            self._msg = msg
+            self.received += 1
+
+    def take(self):
+        """The newest message, None if there was none since the last call"""
+        with self._lock:
+            msg, self._msg = self._msg, None
+        return msg
+
+
+class FrameStats:
+    """Rate and latency of the frames a consumer takes.
+
+    :param float smoothing: weight of the previous average in the moving averages
+    """
+
+    def __init__(self, smoothing: float = 0.9):
+        self.smoothing = smoothing
+        self.fps = 0.0
+        self.latency = 0.0
+        self._last = None
+
+    def update(self, latency: float, now: Optional[float] = None) -> None:
+        """Record a frame that reached the consumer `latency` seconds after its stamp"""
+        now = time.monotonic() if now is None else now
+        if self._last is None:
+            self.latency = latency
+        elif now > self._last:
+            rate = 1 / (now - self._last)
+            self.fps = rate if self.fps == 0 else self.smoothing * self.fps + (1 - self.smoothing) * rate
+            self.latency = self.smoothing * self.latency + (1 - self.smoothing) * latency
+        self._last = now
+
+    def overlay(self, image: np.ndarray, dropped: int = 0) -> np.ndarray:
+        """Draws the rate, latency and dropped frames on `image`, on a copy if it is read-only"""
+        if not image.flags.writeable:
+            image = image.copy()
+        text = f"{self.fps:5.1f} fps  {1000 * self.latency:6.1f} ms  {dropped} dropped"
+        cv2.putText(image, text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 3, cv2.LINE_AA)
+        cv2.putText(image, text, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+        return image
+
+
+def stamp_latency(node, msg) -> float:
+    """Seconds between the header stamp of `msg` and the node's clock"""
+    stamp = msg.header.stamp.sec + msg.header.stamp.nanosec * 1e-9
+    return node.get_clock().now().nanoseconds * 1e-9 - stamp
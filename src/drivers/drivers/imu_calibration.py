@@ -0,0 +1,128 @@
+"""
+Persistent calibration of the BNO08X and of the IMU tracker.
+
+The BNO08X keeps its dynamic calibration data (DCD) in its own flash and loads
+it at every reset. `DcdManager` keeps the motion engine calibrating while the
+node runs and saves the DCD when the magnetometer reports a better accuracy than
+the saved one, or the same accuracy again after `save_period`. What was saved is
+recorded in a JSON file, so a restart does not replace a good DCD with a worse one.
+
+`TrackerCalibration` keeps the gyro bias and the noise estimates of the IMU
+tracker in a JSON file next to it. They only depend on the sensor, so a tracker
+started while the BNO reports a usable accuracy takes them from there and only
+needs the current directions of gravity and the magnetic field, which a handful
+of samples give.
+"""
+
+import json
+import os
+import time
+from typing import Optional
+
+# accuracy of the BNO08X reports, see adafruit_bno08x.REPORT_ACCURACY_STATUS
+UNRELIABLE, LOW, MEDIUM, HIGH = range(4)
+
+
+def read_json(path: str) -> Optional[dict]:
+    """Content of the JSON file at `path`, None if it is missing or broken"""
+    try:
+        with open(path, "r") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def write_json(path: str, data: dict) -> bool:
+    """Replace the JSON file at `path` atomically, returns whether it worked"""
+    # a file that can not be written only costs the next start its warm start
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, "w") as file:
+            json.dump(data, file, indent=2)
+        os.replace(tmp_file, path)
+    except OSError:
+        return False
+    return True
+
+
+class DcdManager:
+    """Runs the dynamic calibration of a BNO08X and saves it to the sensor's flash.
+
+    The accuracy is taken from the magnetometer reports, so that feature must be
+    enabled; checking it costs no bus traffic.
+
+    :param BNO08X bno: the sensor
+    :param str record_file: JSON file recording the accuracy of the saved DCD
+    :param int save_accuracy: lowest accuracy worth saving
+    :param float save_period: seconds before the same accuracy is saved again
+    """
+
+    def __init__(self, bno, record_file: str, save_accuracy: int = MEDIUM, save_period: float = 600.0):
+        self.bno = bno
+        self.record_file = record_file
+        self.save_accuracy = save_accuracy
+        self.save_period = save_period
+        record = read_json(record_file) or {}
+        self.saved_accuracy = int(record.get("accuracy", UNRELIABLE))
+        self.accuracy = UNRELIABLE
+        self._saved_at = time.monotonic()
+        bno.begin_calibration()
+
+    def update(self) -> bool:
+        """Check the calibration status, returns whether the DCD was saved"""
+        self.accuracy = self.bno.magnetic_accuracy
+        if self.accuracy < self.save_accuracy or self.accuracy < self.saved_accuracy:
+            return False
+        if self.accuracy == self.saved_accuracy and time.monotonic() - self._saved_at < self.save_period:
+            return False
+
+        self.bno.save_calibration_data()
+        self.saved_accuracy = self.accuracy
+        self._saved_at = time.monotonic()
+        write_json(self.record_file, {"accuracy": self.accuracy, "saved": time.time()})
+        return True
+
+
+class TrackerCalibration:
+    """Gyro bias and noise estimates of the IMU tracker, kept across restarts.
+
+    :param str path: JSON file holding them
+    :param int min_accuracy: lowest BNO accuracy, when stored and now, to reuse them at
+    """
+
+    FIELDS = ("gyro_noise", "gyro_bias", "acc_noise", "mag_noise")
+
+    def __init__(self, path: str, min_accuracy: int = MEDIUM):
+        self.path = path
+        self.min_accuracy = min_accuracy
+        self.stored = self.load()
+
+    def load(self) -> Optional[dict]:
+        """The stored estimates, None if there are none"""
+        data = read_json(self.path)
+        if data is None or any(field not in data for field in self.FIELDS):
+            return None
+        return data
+
+    def usable(self, accuracy: Optional[int]) -> bool:
+        """Whether the stored estimates hold for a BNO now reporting `accuracy`"""
+        if self.stored is None or accuracy is None:
+            return False
+        return min(accuracy, int(self.stored.get("accuracy", UNRELIABLE))) >= self.min_accuracy
+
+    def save(self, accuracy: Optional[int], **estimates) -> bool:
+        """Store the estimates named in `FIELDS`, taken while the BNO reported `accuracy`"""
+        data = {field: _plain(estimates[field]) for field in self.FIELDS}
+        data["accuracy"] = UNRELIABLE if accuracy is None else int(accuracy)
+        data["saved"] = time.time()
+        self.stored = data
+        return write_json(self.path, data)
+
+
+def _plain(value):
+    # numpy scalars and arrays as JSON numbers and lists
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return float(value)
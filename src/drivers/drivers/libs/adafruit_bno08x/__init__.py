@@ -38,6 +38,15 @@ from micropython import const
 # TODO: Remove on release
 from .debug import channels, reports
 
+try:
+    from time import clock_gettime, CLOCK_MONOTONIC_RAW
+
+    def _timestamp() -> float:
+        return clock_gettime(CLOCK_MONOTONIC_RAW)
+
+except ImportError:
+    _timestamp = time.monotonic
+
 # For IDE type recognition
 try:
     from typing import Any, Dict, List, Optional, Tuple, Union
@@ -118,10 +127,17 @@ _QUAT_READ_TIMEOUT = 0.500  # timeout in seconds
 _PACKET_READ_TIMEOUT = 2.000  # timeout in seconds
 _FEATURE_ENABLE_TIMEOUT = 2.0
 _DEFAULT_TIMEOUT = 2.0
+_RESET_TIMEOUT = 1.0
+# polling interval bounds used while waiting on the sensor hub, in seconds
+_POLL_INTERVAL_MIN = 0.0005
+_POLL_INTERVAL_MAX = 0.010
 _BNO08X_CMD_RESET = const(0x01)
 _QUAT_Q_POINT = const(14)
 _BNO_HEADER_LEN = const(4)
 
+# SHTP timestamps are expressed in ticks of 100us
+_TIMESTAMP_TICK = 0.0001
+
 _Q_POINT_14_SCALAR = 2 ** (14 * -1)
 _Q_POINT_12_SCALAR = 2 ** (12 * -1)
 # _Q_POINT_10_SCALAR = 2 ** (10 * -1)
@@ -166,6 +182,11 @@ _AVAIL_SENSOR_REPORTS = {
     BNO_REPORT_RAW_GYROSCOPE: (1, 3, 16),
     BNO_REPORT_RAW_MAGNETOMETER: (1, 3, 16),
 }
+# rotation vectors followed by a Q12 heading accuracy estimate in radians
+_HEADING_ACCURACY_REPORTS = (
+    BNO_REPORT_ROTATION_VECTOR,
+    BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR,
+)
 _INITIAL_REPORTS = {
     BNO_REPORT_ACTIVITY_CLASSIFIER: {
         "Tilting": -1,
@@ -219,6 +240,27 @@ def _elapsed(start_time: float) -> float:
     return time.monotonic() - start_time
 
 
+class _PollBackoff:
+    """Exponentially growing sleep between polls of the sensor hub, so waiting on a
+    response doesn't spin on the bus. Call `reset` whenever a packet arrives."""
+
+    def __init__(
+        self, initial: float = _POLL_INTERVAL_MIN, maximum: float = _POLL_INTERVAL_MAX
+    ) -> None:
+        self._initial = initial
+        self._maximum = maximum
+        self._interval = initial
+
+    def reset(self) -> None:
+        """Go back to the shortest polling interval"""
+        self._interval = self._initial
+
+    def sleep(self) -> None:
+        """Sleep for the current interval and double it for the next poll"""
+        time.sleep(self._interval)
+        self._interval = min(self._interval * 2, self._maximum)
+
+
 ############ PACKET PARSING ###########################
 def _parse_sensor_report_data(report_bytes: bytearray) -> Tuple[Tuple, int]:
     """Parses reports with only 16-bit fields"""
@@ -493,6 +535,9 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
 
     """
 
+    # Interrupt (H_INTN) pin, set by the bus specific subclasses that support it
+    _int = None
+
     def __init__(
         self, reset: Optional[DigitalInOut] = None, debug: bool = False
     ) -> None:
@@ -515,6 +560,15 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         self._id_read = False
         # for saving the most recent reading when decoding several packets
         self._readings: Dict[int, Any] = {}
+        # sensor time of the most recent reading of each report, see `report_timestamp`
+        self._report_times: Dict[int, float] = {}
+        # status accuracy (0 to 3) of the most recent reading of each sensor report
+        self._accuracies: Dict[int, int] = {}
+        # heading accuracy estimate in radians of the most recent rotation vectors
+        self._heading_accuracies: Dict[int, float] = {}
+        self._packet_time: float = 0.0
+        self._base_delta: int = 0
+        self._rebase_delta: int = 0
         self.initialize()
 
     def initialize(self) -> None:
@@ -719,6 +773,35 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         except KeyError:
             raise RuntimeError("No raw magnetic report found, is it enabled?") from None
 
+    def report_timestamp(self, report_id: int) -> Optional[float]:
+        """The time at which the sensor sampled the most recent reading of `report_id`,
+        in seconds of CLOCK_MONOTONIC_RAW (`time.monotonic` where not available).
+
+        It is rebuilt from the SHTP base timestamp and the delay carried by each
+        report, relative to the moment the packet started to be read, so bus latency
+        and batching inside the sensor hub are not part of it"""
+        return self._report_times.get(report_id)
+
+    def update(self) -> int:
+        """Process the packets the sensor has ready, returns how many. The properties do
+        this on every access, `reading` and the report metadata do not"""
+        return self._process_available_packets()
+
+    def reading(self, report_id: int) -> Any:
+        """The most recent reading of `report_id`, None if it is not enabled. Unlike the
+        properties it does not process new packets, so several readings of one read agree"""
+        return self._readings.get(report_id)
+
+    def report_accuracy(self, report_id: int) -> Optional[int]:
+        """Status accuracy (0 to 3, see `REPORT_ACCURACY_STATUS`) of the most recent reading
+        of `report_id`"""
+        return self._accuracies.get(report_id)
+
+    def heading_accuracy(self, report_id: int) -> Optional[float]:
+        """Heading accuracy estimate in radians of the most recent reading of the rotation
+        vector or geomagnetic rotation vector `report_id`. The game rotation vector has none"""
+        return self._heading_accuracies.get(report_id)
+
     def begin_calibration(self) -> None:
         """Begin the sensor's self-calibration routine"""
         # start calibration for accel, gyro, and mag
@@ -755,6 +838,13 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         )
         return self._magnetometer_accuracy
 
+    @property
+    def magnetic_accuracy(self) -> int:
+        """Accuracy (0 to 3, see `REPORT_ACCURACY_STATUS`) of the last magnetometer report.
+        Unlike `calibration_status` it is read from the reports, without a command"""
+        self._process_available_packets()
+        return self._magnetometer_accuracy
+
     def _send_me_command(self, subcommand_params: Optional[List[int]]) -> None:
         start_time = time.monotonic()
         local_buffer = self._command_buffer
@@ -766,10 +856,9 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         )
         self._send_packet(_BNO_CHANNEL_CONTROL, local_buffer)
         self._increment_report_seq(_COMMAND_REQUEST)
-        while _elapsed(start_time) < _DEFAULT_TIMEOUT:
-            self._process_available_packets()
-            if self._me_calibration_started_at > start_time:
-                break
+        self._wait_until(
+            lambda: self._me_calibration_started_at > start_time, _DEFAULT_TIMEOUT
+        )
 
     def save_calibration_data(self) -> None:
         """Save the self-calibration data"""
@@ -783,19 +872,16 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         )
         self._send_packet(_BNO_CHANNEL_CONTROL, local_buffer)
         self._increment_report_seq(_COMMAND_REQUEST)
-        while _elapsed(start_time) < _DEFAULT_TIMEOUT:
-            self._process_available_packets()
-            if self._dcd_saved_at > start_time:
-                return
-        raise RuntimeError("Could not save calibration data")
+        if not self._wait_until(lambda: self._dcd_saved_at > start_time, _DEFAULT_TIMEOUT):
+            raise RuntimeError("Could not save calibration data")
 
     ############### private/helper methods ###############
     # # decorator?
-    def _process_available_packets(self, max_packets: Optional[int] = None) -> None:
+    def _process_available_packets(self, max_packets: Optional[int] = None) -> int:
         processed_count = 0
         while self._data_ready:
             if max_packets and processed_count > max_packets:
-                return
+                return processed_count
             # print("reading a packet")
             try:
                 new_packet = self._read_packet()
@@ -808,6 +894,22 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
             self._dbg("")
         self._dbg("")
         self._dbg(" ** DONE! **")
+        return processed_count
+
+    def _wait_until(self, condition: Any, timeout: float) -> bool:
+        """Process incoming packets until `condition()` holds or `timeout` expires,
+        backing off between polls while the sensor has nothing to send"""
+        start_time = time.monotonic()
+        backoff = _PollBackoff()
+        while _elapsed(start_time) < timeout:
+            processed_count = self._process_available_packets(max_packets=10)
+            if condition():
+                return True
+            if processed_count:
+                backoff.reset()
+            else:
+                backoff.sleep()
+        return False
 
     def _wait_for_packet_type(
         self, channel_number: int, report_id: Optional[int] = None, timeout: float = 5.0
@@ -838,8 +940,10 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
 
     def _wait_for_packet(self, timeout: float = _PACKET_READ_TIMEOUT) -> Packet:
         start_time = time.monotonic()
+        backoff = _PollBackoff()
         while _elapsed(start_time) < timeout:
             if not self._data_ready:
+                backoff.sleep()
                 continue
             new_packet = self._read_packet()
             return new_packet
@@ -854,14 +958,20 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         self._sequence_number[channel] = seq
 
     def _handle_packet(self, packet: Packet) -> None:
+        # timestamp records only apply to the reports of their own packet
+        self._base_delta = 0
+        self._rebase_delta = 0
         # split out reports first
         try:
             _separate_batch(packet, self._packet_slices)
-            while len(self._packet_slices) > 0:
-                self._process_report(*self._packet_slices.pop())
+            # process in order, a base timestamp precedes the reports it applies to
+            for report_id, report_bytes in self._packet_slices:
+                self._process_report(report_id, report_bytes)
         except Exception as error:
             print(packet)
             raise error
+        finally:
+            self._packet_slices.clear()
 
     def _handle_control_report(self, report_id: int, report_bytes: bytearray) -> None:
         if report_id == _SHTP_REPORT_PRODUCT_ID_RESPONSE:
@@ -887,6 +997,13 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         if report_id == _COMMAND_RESPONSE:
             self._handle_command_response(report_bytes)
 
+        if report_id == _BASE_TIMESTAMP:
+            self._base_delta = unpack_from("<i", report_bytes, offset=1)[0]
+            self._rebase_delta = 0
+
+        if report_id == _TIMESTAMP_REBASE:
+            self._rebase_delta = unpack_from("<i", report_bytes, offset=1)[0]
+
     def _handle_command_response(self, report_bytes: bytearray) -> None:
         (report_body, response_values) = _parse_command_response(report_bytes)
 
@@ -925,6 +1042,12 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
             self._dbg(outstr)
             self._dbg("")
 
+        # byte 3 holds the low bits of the report delay, the upper six are in the status
+        delay = ((report_bytes[2] & 0xFC) << 6) | report_bytes[3]
+        self._report_times[report_id] = self._packet_time + _TIMESTAMP_TICK * (
+            delay - self._base_delta + self._rebase_delta
+        )
+
         if report_id == BNO_REPORT_STEP_COUNTER:
             self._readings[report_id] = _parse_step_couter_report(report_bytes)
             return
@@ -949,11 +1072,14 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
             self._readings[BNO_REPORT_ACTIVITY_CLASSIFIER] = activity_classification
             return
         sensor_data, accuracy = _parse_sensor_report_data(report_bytes)
+        self._accuracies[report_id] = accuracy
         if report_id == BNO_REPORT_MAGNETOMETER:
             self._magnetometer_accuracy = accuracy
-        # TODO: FIXME; Sensor reports are batched in a LIFO which means that multiple reports
-        # for the same type will end with the oldest/last being kept and the other
-        # newer reports thrown away
+        if report_id in _HEADING_ACCURACY_REPORTS:
+            self._heading_accuracies[report_id] = (
+                unpack_from("<h", report_bytes, offset=12)[0] * _Q_POINT_12_SCALAR
+            )
+        # reports are processed in the order they were batched, so the newest is kept
         self._readings[report_id] = sensor_data
 
     # TODO: Make this a Packet creation
@@ -971,36 +1097,72 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
 
         return set_feature_report
 
+    def _get_feature_report_for(
+        self, feature_id: int, interval_us: int = _DEFAULT_REPORT_INTERVAL
+    ) -> bytearray:
+        if feature_id == BNO_REPORT_ACTIVITY_CLASSIFIER:
+            return self._get_feature_enable_report(
+                feature_id, interval_us, sensor_specific_config=_ENABLED_ACTIVITIES
+            )
+        return self._get_feature_enable_report(feature_id, interval_us)
+
     # TODO: add docs for available features
     # TODO2: I think this should call an fn that imports all the bits for the given feature
     # so we're not carrying around  stuff for extra features
-    def enable_feature(self, feature_id: int) -> None:
-        """Used to enable a given feature of the BNO08x"""
+    def enable_feature(
+        self, feature_id: int, interval_us: int = _DEFAULT_REPORT_INTERVAL
+    ) -> None:
+        """Used to enable a given feature of the BNO08x, reporting every `interval_us`
+        microseconds"""
         self._dbg("\n********** Enabling feature id:", feature_id, "**********")
+        self.enable_features([feature_id], interval_us)
 
-        if feature_id == BNO_REPORT_ACTIVITY_CLASSIFIER:
-            set_feature_report = self._get_feature_enable_report(
-                feature_id, sensor_specific_config=_ENABLED_ACTIVITIES
-            )
+    def enable_features(
+        self,
+        feature_ids: List[int],
+        interval_us: Union[int, Dict[int, int]] = _DEFAULT_REPORT_INTERVAL,
+    ) -> None:
+        """Enable several features of the BNO08x in one batch. All the set feature
+        commands are sent back to back and the responses are collected together,
+        instead of waiting for each feature before sending the next one.
+
+        `interval_us` is the report interval in microseconds, either for all features
+        or as a dict by feature id with the default for the features it leaves out"""
+        if isinstance(interval_us, dict):
+            intervals = interval_us
+            interval_us = _DEFAULT_REPORT_INTERVAL
         else:
-            set_feature_report = self._get_feature_enable_report(feature_id)
-
-        feature_dependency = _RAW_REPORTS.get(feature_id, None)
-        # if the feature was enabled it will have a key in the readings dict
-        if feature_dependency and feature_dependency not in self._readings:
-            self._dbg("Enabling feature depencency:", feature_dependency)
-            self.enable_feature(feature_dependency)
-
-        self._dbg("Enabling", feature_id)
-        self._send_packet(_BNO_CHANNEL_CONTROL, set_feature_report)
-
-        start_time = time.monotonic()  # 1
+            intervals = {}
+        pending: Dict[int, int] = {}
+        for feature_id in feature_ids:
+            interval = intervals.get(feature_id, interval_us)
+            feature_dependency = _RAW_REPORTS.get(feature_id, None)
+            # if the feature was enabled it will have a key in the readings dict
+            if (
+                feature_dependency
+                and feature_dependency not in self._readings
+                and feature_dependency not in pending
+            ):
+                self._dbg("Enabling feature depencency:", feature_dependency)
+                # the raw report is only produced as often as its counterpart
+                pending[feature_dependency] = intervals.get(feature_dependency, interval)
+            if feature_id not in pending:
+                pending[feature_id] = interval
+
+        for feature_id, interval in pending.items():
+            self._dbg("Enabling", feature_id, "every", interval, "us")
+            self._send_packet(
+                _BNO_CHANNEL_CONTROL, self._get_feature_report_for(feature_id, interval)
+            )
 
-        while _elapsed(start_time) < _FEATURE_ENABLE_TIMEOUT:
-            self._process_available_packets(max_packets=10)
-            if feature_id in self._readings:
-                return
-        raise RuntimeError("Was not able to enable feature", feature_id)
+        if not self._wait_until(
+            lambda: all(feature_id in self._readings for feature_id in pending),
+            _FEATURE_ENABLE_TIMEOUT,
+        ):
+            missing = [f for f in pending if f not in self._readings]
+            if len(missing) == 1:
+                raise RuntimeError("Was not able to enable feature", missing[0])
+            raise RuntimeError("Was not able to enable features", missing)
 
     def _check_id(self) -> bool:
         self._dbg("\n********** READ ID **********")
@@ -1077,15 +1239,23 @@ class BNO08X:  # pylint: disable=too-many-instance-attributes, too-many-public-m
         data = bytearray(1)
         data[0] = 1
         _seq = self._send_packet(BNO_CHANNEL_EXE, data)
-        time.sleep(0.5)
-        _seq = self._send_packet(BNO_CHANNEL_EXE, data)
-        time.sleep(0.5)
 
-        for _i in range(3):
+        # after a reset the hub sends its SHTP advertisement followed by a reset
+        # complete on the executable channel; poll for them instead of sleeping
+        start_time = time.monotonic()
+        backoff = _PollBackoff()
+        while _elapsed(start_time) < _RESET_TIMEOUT:
             try:
-                _packet = self._read_packet()
+                packet = self._read_packet()
             except PacketError:
-                time.sleep(0.5)
+                backoff.sleep()
+                continue
+            backoff.reset()
+            if packet.channel_number == BNO_CHANNEL_EXE:
+                break
+        else:
+            self._dbg("no reset complete received")
+            return
 
         self._dbg("OK!")
         # all is good!
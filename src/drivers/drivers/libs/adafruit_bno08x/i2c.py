@@ -8,7 +8,7 @@
 """
 from struct import pack_into
 from adafruit_bus_device import i2c_device
-from . import BNO08X, DATA_BUFFER_SIZE, const, Packet, PacketError
+from . import BNO08X, DATA_BUFFER_SIZE, const, Packet, PacketError, _timestamp
 
 _BNO08X_DEFAULT_ADDRESS = const(0x4A)
 
@@ -17,13 +17,21 @@ class BNO08X_I2C(BNO08X):
     """Library for the BNO08x IMUs from Hillcrest Laboratories
 
     :param ~busio.I2C i2c_bus: The I2C bus the BNO08x is connected to.
+    :param ~digitalio.DigitalInOut int_pin: Optional H_INTN pin. When given, the
+        data ready check reads the pin instead of a packet header over I2C.
 
     """
 
     def __init__(
-        self, i2c_bus, reset=None, address=_BNO08X_DEFAULT_ADDRESS, debug=False
-    ):
+        self,
+        i2c_bus,
+        reset=None,
+        address=_BNO08X_DEFAULT_ADDRESS,
+        debug=False,
+        int_pin=None,
+    ):  # pylint:disable=too-many-arguments
         self.bus_device_obj = i2c_device.I2CDevice(i2c_bus, address)
+        self._int = int_pin
         super().__init__(reset, debug)
 
     def _send_packet(self, channel, data):
@@ -56,6 +64,8 @@ class BNO08X_I2C(BNO08X):
         return packet_header
 
     def _read_packet(self):
+        # the reference point of the SHTP timestamps in this packet
+        self._packet_time = _timestamp()
         with self.bus_device_obj as i2c:
             i2c.readinto(self._data_buffer, end=4)  # this is expecting a header?
         self._dbg("")
@@ -105,6 +115,9 @@ class BNO08X_I2C(BNO08X):
 
     @property
     def _data_ready(self):
+        # H_INTN is active low, so a high pin means there is nothing to read
+        if self._int is not None and self._int.value:
+            return False
         header = self._read_header()
 
         if header.channel_number > 5:
@@ -26,6 +26,9 @@ Implementation Notes
 * Adafruit's Bus Device library: https://github.com/adafruit/Adafruit_CircuitPython_BusDevice
 """
 
+import time
+from collections import namedtuple
+
 from micropython import const
 from adafruit_bus_device.i2c_device import I2CDevice
 
@@ -33,9 +36,14 @@ from adafruit_register.i2c_struct import ROUnaryStruct, UnaryStruct
 from adafruit_register.i2c_bits import ROBits, RWBits
 from adafruit_register.i2c_bit import ROBit
 
+from .register_cache import CachedI2CDevice
+
 try:
     import typing  # pylint: disable=unused-import
-    from .busio import I2C
+    from typing import List, Optional
+
+    if typing.TYPE_CHECKING:
+        from .busio import I2C
 except ImportError:
     pass
 
@@ -81,6 +89,34 @@ class ADCResolution:
     ADCRES_12BIT_128S = 0x0F  # 12bit, 128 samples, 68.10ms
 
 
+# conversion time in seconds of every ADCResolution setting
+_CONVERSION_TIME = {
+    ADCResolution.ADCRES_9BIT_1S: 0.000084,
+    ADCResolution.ADCRES_10BIT_1S: 0.000148,
+    ADCResolution.ADCRES_11BIT_1S: 0.000276,
+    ADCResolution.ADCRES_12BIT_1S: 0.000532,
+    ADCResolution.ADCRES_12BIT_2S: 0.00106,
+    ADCResolution.ADCRES_12BIT_4S: 0.00213,
+    ADCResolution.ADCRES_12BIT_8S: 0.00426,
+    ADCResolution.ADCRES_12BIT_16S: 0.00851,
+    ADCResolution.ADCRES_12BIT_32S: 0.01702,
+    ADCResolution.ADCRES_12BIT_64S: 0.03405,
+    ADCResolution.ADCRES_12BIT_128S: 0.06810,
+}
+
+# ADCResolution setting for a number of averaged 12 bit samples
+_AVERAGING = {
+    1: ADCResolution.ADCRES_12BIT_1S,
+    2: ADCResolution.ADCRES_12BIT_2S,
+    4: ADCResolution.ADCRES_12BIT_4S,
+    8: ADCResolution.ADCRES_12BIT_8S,
+    16: ADCResolution.ADCRES_12BIT_16S,
+    32: ADCResolution.ADCRES_12BIT_32S,
+    64: ADCResolution.ADCRES_12BIT_64S,
+    128: ADCResolution.ADCRES_12BIT_128S,
+}
+
+
 class Mode:
     """Constants for ``mode``"""
 
@@ -110,6 +146,24 @@ _REG_CURRENT = const(0x04)
 _REG_CALIBRATION = const(0x05)
 # pylint: enable=too-few-public-methods
 
+_BUS_CNVR = const(0x02)
+_BUS_OVF = const(0x01)
+
+# registers of one sample in read order, power last as reading it clears CNVR
+_SAMPLE_REGISTERS = (_REG_BUSVOLTAGE, _REG_SHUNTVOLTAGE, _REG_CURRENT, _REG_POWER)
+
+
+def _conversion_time(resolution: int) -> float:
+    # without the averaging bit the upper bit is don't care, 0x08 is a single 12 bit sample
+    if not resolution & 0x08:
+        resolution &= 0x03
+    elif resolution == 0x08:
+        resolution = ADCResolution.ADCRES_12BIT_1S
+    return _CONVERSION_TIME[resolution]
+
+
+Sample = namedtuple("Sample", ["bus_voltage", "shunt_voltage", "current", "power", "overflow"])
+
 
 def _to_signed(num: int) -> int:
     if num > 0x7FFF:
@@ -151,14 +205,23 @@ class INA219:
     # raw_current                 RO : Current register (not scaled)
     # calibration                 RW : calibration register (note: value is cached)
 
-    def __init__(self, i2c_bus: I2C, addr: int = 0x40) -> None:
-        self.i2c_device = I2CDevice(i2c_bus, addr)
+    # Sampling API:
+    # read_sample(timeout)        Wait for a new conversion and read all results of it at once
+    # set_averaging(samples)      Average 1 to 128 conversions on the chip for both ADCs
+    # conversion_time             RO : seconds between two results with the current settings
+
+    def __init__(self, i2c_bus: "I2C", addr: int = 0x40) -> None:
+        # calibration stays uncached, it is rewritten to recover from resets
+        self.i2c_device = CachedI2CDevice(I2CDevice(i2c_bus, addr), (_REG_CONFIG,))
         self.i2c_addr = addr
 
         # Set chip to known config values to start
         self._cal_value = 0
         self._current_lsb = 0
         self._power_lsb = 0
+        self._config_value = 0
+        self._buf = bytearray(3)
+        self._sample_transfers = [(bytes([register]), bytearray(2)) for register in _SAMPLE_REGISTERS]
         self.set_calibration_32V_2A()
 
     # config register break-up
@@ -168,6 +231,7 @@ class INA219:
     bus_adc_resolution = RWBits(4, _REG_CONFIG, 7, 2, False)
     shunt_adc_resolution = RWBits(4, _REG_CONFIG, 3, 2, False)
     mode = RWBits(3, _REG_CONFIG, 0, 2, False)
+    _raw_config = UnaryStruct(_REG_CONFIG, ">H")
 
     # shunt voltage register
     raw_shunt_voltage = ROUnaryStruct(_REG_SHUNTVOLTAGE, ">h")
@@ -305,12 +369,14 @@ class INA219:
         # Set Calibration register to 'Cal' calculated above
         self._raw_calibration = self._cal_value
 
-        # Set Config register to take into account the settings above
-        self.bus_voltage_range = BusVoltageRange.RANGE_32V
-        self.gain = Gain.DIV_8_320MV
-        self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.mode = Mode.SANDBVOLT_CONTINUOUS
+        # Set Config register to take into account the settings above, written once
+        with self.i2c_device.deferred():
+            self.bus_voltage_range = BusVoltageRange.RANGE_32V
+            self.gain = Gain.DIV_8_320MV
+            self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.mode = Mode.SANDBVOLT_CONTINUOUS
+        self._config_value = self._raw_config
 
     def set_calibration_32V_1A(self) -> None:  # pylint: disable=invalid-name
         """Configures to INA219 to be able to measure up to 32V and 1A of current. Counter overflow
@@ -387,12 +453,14 @@ class INA219:
         # Set Calibration register to 'Cal' calculated above
         self._raw_calibration = self._cal_value
 
-        # Set Config register to take into account the settings above
-        self.bus_voltage_range = BusVoltageRange.RANGE_32V
-        self.gain = Gain.DIV_8_320MV
-        self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.mode = Mode.SANDBVOLT_CONTINUOUS
+        # Set Config register to take into account the settings above, written once
+        with self.i2c_device.deferred():
+            self.bus_voltage_range = BusVoltageRange.RANGE_32V
+            self.gain = Gain.DIV_8_320MV
+            self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.mode = Mode.SANDBVOLT_CONTINUOUS
+        self._config_value = self._raw_config
 
     def set_calibration_16V_400mA(self) -> None:  # pylint: disable=invalid-name
         """Configures to INA219 to be able to measure up to 16V and 400mA of current. Counter
@@ -470,12 +538,14 @@ class INA219:
         # Set Calibration register to 'Cal' calculated above
         self._raw_calibration = self._cal_value
 
-        # Set Config register to take into account the settings above
-        self.bus_voltage_range = BusVoltageRange.RANGE_16V
-        self.gain = Gain.DIV_1_40MV
-        self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.mode = Mode.SANDBVOLT_CONTINUOUS
+        # Set Config register to take into account the settings above, written once
+        with self.i2c_device.deferred():
+            self.bus_voltage_range = BusVoltageRange.RANGE_16V
+            self.gain = Gain.DIV_1_40MV
+            self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.mode = Mode.SANDBVOLT_CONTINUOUS
+        self._config_value = self._raw_config
 
     def set_calibration_16V_5A(self) -> None:  # pylint: disable=invalid-name
         """Configures to INA219 to be able to measure up to 16V and 5000mA of current. Counter
@@ -527,9 +597,88 @@ class INA219:
         # Set Calibration register to 'Cal' calcutated above
         self._raw_calibration = self._cal_value
 
-        # Set Config register to take into account the settings above
-        self.bus_voltage_range = BusVoltageRange.RANGE_16V
-        self.gain = Gain.DIV_4_160MV
-        self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
-        self.mode = Mode.SANDBVOLT_CONTINUOUS
+        # Set Config register to take into account the settings above, written once
+        with self.i2c_device.deferred():
+            self.bus_voltage_range = BusVoltageRange.RANGE_16V
+            self.gain = Gain.DIV_4_160MV
+            self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+            self.mode = Mode.SANDBVOLT_CONTINUOUS
+        self._config_value = self._raw_config
+
+    def set_averaging(self, samples: int) -> None:
+        """Average ``samples`` 12 bit conversions (1, 2, 4, ... 128) on the chip for both the
+        bus and the shunt ADC. Results get smoother and fewer reads are needed for the same
+        noise, at the cost of a longer :attr:`conversion_time`."""
+        if samples not in _AVERAGING:
+            raise ValueError("samples must be a power of two between 1 and 128")
+        resolution = _AVERAGING[samples]
+        config = self._config_value & ~0x07F8
+        config |= (resolution << 7) | (resolution << 3)
+        self._raw_config = config
+        self._config_value = config
+
+    @property
+    def conversion_time(self) -> float:
+        """Seconds needed for a new pair of bus and shunt results with the current settings"""
+        return _conversion_time((self._config_value >> 7) & 0x0F) + _conversion_time(
+            (self._config_value >> 3) & 0x0F
+        )
+
+    def _read_register(self, i2c: CachedI2CDevice, register: int) -> int:
+        self._buf[0] = register
+        i2c.write_then_readinto(self._buf, self._buf, out_end=1, in_start=1)
+        return (self._buf[1] << 8) | self._buf[2]
+
+    def _read_sample_registers(self, i2c: CachedI2CDevice) -> List[int]:
+        # a bus with combined transfers reads all four registers in one go
+        transfer_many = getattr(i2c.i2c, "transfer_many", None)
+        if transfer_many is None:
+            return [self._read_register(i2c, register) for register in _SAMPLE_REGISTERS]
+        transfer_many(i2c.device_address, self._sample_transfers)
+        return [(buf[0] << 8) | buf[1] for _, buf in self._sample_transfers]
+
+    def _recalibrate(self) -> None:
+        # a reset clears the calibration and restores the default config
+        self.i2c_device.invalidate()
+        self._raw_config = self._config_value
+        self._raw_calibration = self._cal_value
+
+    def read_sample(self, timeout: Optional[float] = None) -> Optional[Sample]:
+        """Wait for the conversion ready flag and read bus voltage, shunt voltage, current and
+        power of that conversion with the bus held. Returns None when no new conversion is
+        ready within ``timeout`` seconds (by default two conversion times).
+
+        Reading the power register clears the conversion ready flag, so two calls never return
+        the same conversion. Calibration is only rewritten when the chip reports an overflow or
+        lost it after a reset, current and power are then derived from the shunt voltage."""
+        if timeout is None:
+            timeout = 2 * self.conversion_time
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self.i2c_device as i2c:
+                bus, shunt, current, power = self._read_sample_registers(i2c)
+            if bus & _BUS_CNVR:
+                shunt = _to_signed(shunt)
+                current = _to_signed(current)
+                break
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.conversion_time / 4)
+
+        overflow = bool(bus & _BUS_OVF)
+        bus_raw = bus >> 3
+        if overflow or (current == 0 and shunt != 0):
+            self._recalibrate()
+            # Current = Shunt * Cal / 4096 and Power = Current * Bus / 5000 (datasheet 8.5.1)
+            current = int(shunt * self._cal_value / 4096)
+            power = int(abs(current) * bus_raw / 5000)
+
+        return Sample(
+            bus_voltage=bus_raw * 0.004,
+            shunt_voltage=shunt * 0.00001,
+            current=current * self._current_lsb,
+            power=power * self._power_lsb,
+            overflow=overflow,
+        )
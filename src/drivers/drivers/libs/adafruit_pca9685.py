@@ -40,10 +40,14 @@ from adafruit_register.i2c_struct import UnaryStruct
 from adafruit_register.i2c_struct_array import StructArray
 from adafruit_bus_device import i2c_device
 
+from .register_cache import CachedI2CDevice
+
 try:
-    from typing import Optional, Type
+    from typing import TYPE_CHECKING, Optional, Type
     from types import TracebackType
-    from .busio import I2C
+
+    if TYPE_CHECKING:
+        from .busio import I2C
 except ImportError:
     pass
 
@@ -142,12 +146,14 @@ class PCA9685:
 
     def __init__(
         self,
-        i2c_bus: I2C,
+        i2c_bus: "I2C",
         *,
         address: int = 0x40,
         reference_clock_speed: int = 25000000,
     ) -> None:
-        self.i2c_device = i2c_device.I2CDevice(i2c_bus, address)
+        # only the prescaler is cached, a brown-out restores the power-on outputs, so
+        # every duty cycle has to reach the chip
+        self.i2c_device = CachedI2CDevice(i2c_device.I2CDevice(i2c_bus, address), (0xFE,))
         self.channels = PCAChannels(self)
         """Sequence of 16 `PWMChannel` objects. One for each channel."""
         self.reference_clock_speed = reference_clock_speed
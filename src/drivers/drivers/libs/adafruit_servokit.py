@@ -32,13 +32,14 @@ Implementation Notes
 
 """
 
-from . import board
 from .adafruit_pca9685 import PCA9685
 
 try:
-    from typing import Optional
-    from .busio import I2C
-    from .adafruit_motor.servo import Servo, ContinuousServo
+    from typing import TYPE_CHECKING, Optional
+
+    if TYPE_CHECKING:
+        from .busio import I2C
+        from .adafruit_motor.servo import Servo, ContinuousServo
 except ImportError:
     pass
 
@@ -75,7 +76,7 @@ class ServoKit:
         self,
         *,
         channels: int,
-        i2c: Optional[I2C] = None,
+        i2c: Optional["I2C"] = None,
         address: int = 0x40,
         reference_clock_speed: int = 25000000,
         frequency: int = 50
@@ -85,6 +86,8 @@ class ServoKit:
         self._items = [None] * channels
         self._channels = channels
         if i2c is None:
+            from . import board  # pylint: disable=import-outside-toplevel
+
             i2c = board.I2C()
         self._pca = PCA9685(
             i2c, address=address, reference_clock_speed=reference_clock_speed
@@ -145,7 +148,7 @@ class _Servo:
     def __init__(self, kit: ServoKit) -> None:
         self.kit = kit
 
-    def __getitem__(self, servo_channel: int) -> Servo:
+    def __getitem__(self, servo_channel: int) -> "Servo":
         from .adafruit_motor import servo as adafruit_servo  # pylint: disable=import-outside-toplevel
 
         num_channels = self.kit._channels
@@ -169,7 +172,7 @@ class _ContinuousServo:
     def __init__(self, kit: ServoKit) -> None:
         self.kit = kit
 
-    def __getitem__(self, servo_channel: int) -> ContinuousServo:
+    def __getitem__(self, servo_channel: int) -> "ContinuousServo":
         from .adafruit_motor import servo as adafruit_servo  # pylint: disable=import-outside-toplevel
 
         num_channels = self.kit._channels
@@ -39,9 +39,13 @@ import time
 from adafruit_bus_device import i2c_device
 from micropython import const
 
+from .register_cache import CachedI2CDevice
+
 try:
-    from typing import Tuple
-    from .busio import I2C
+    from typing import TYPE_CHECKING, Tuple
+
+    if TYPE_CHECKING:
+        from .busio import I2C
 except ImportError:
     pass
 
@@ -71,6 +75,15 @@ _GAINS = (1, 4, 16, 60)
 _CYCLES = (0, 1, 2, 3, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60)
 _INTEGRATION_TIME_THRESHOLD_LOW = 2.4
 _INTEGRATION_TIME_THRESHOLD_HIGH = 614.4
+# registers only changed by the driver, served from the register cache
+_CONFIG_REGISTERS = (
+    _REGISTER_ENABLE,
+    _REGISTER_ATIME,
+    _REGISTER_AILT,
+    _REGISTER_AIHT,
+    _REGISTER_APERS,
+    _REGISTER_CONTROL,
+)
 
 
 class TCS34725:
@@ -113,8 +126,11 @@ class TCS34725:
     # thread safe!
     _BUFFER = bytearray(3)
 
-    def __init__(self, i2c: I2C, address: int = 0x29):
-        self._device = i2c_device.I2CDevice(i2c, address)
+    def __init__(self, i2c: "I2C", address: int = 0x29):
+        self._device = CachedI2CDevice(
+            i2c_device.I2CDevice(i2c, address),
+            [register | _COMMAND_BIT for register in _CONFIG_REGISTERS],
+        )
         self._active = False
         self.integration_time = 2.4
         self._glass_attenuation = None
@@ -28,16 +28,22 @@ Implementation Notes
   https://github.com/adafruit/circuitpython/releases
 * Adafruit's Bus Device library: https://github.com/adafruit/Adafruit_CircuitPython_BusDevice
 """
+import json
 import math
+import os
 import time
 
 from adafruit_bus_device import i2c_device
 from micropython import const
 
+from .register_cache import CachedI2CDevice
+
 try:
-    from typing import Optional, Tuple, Type
+    from typing import TYPE_CHECKING, Optional, Tuple, Type
     from types import TracebackType
-    from .busio import I2C
+
+    if TYPE_CHECKING:
+        from .busio import I2C
 except ImportError:
     pass
 
@@ -103,6 +109,19 @@ _POWER_MANAGEMENT_GO1_POWER_FORCE = const(0x80)
 _VHV_CONFIG_PAD_SCL_SDA__EXTSUP_HV = const(0x89)
 _ALGO_PHASECAL_LIM = const(0x30)
 _ALGO_PHASECAL_CONFIG_TIMEOUT = const(0x30)
+# registers only changed by the driver, served from the register cache
+_CONFIG_REGISTERS = (
+    _SYSTEM_SEQUENCE_CONFIG,
+    _SYSTEM_INTERRUPT_CONFIG_GPIO,
+    _GPIO_HV_MUX_ACTIVE_HIGH,
+    _MSRC_CONFIG_CONTROL,
+    _MSRC_CONFIG_TIMEOUT_MACROP,
+    _PRE_RANGE_CONFIG_VCSEL_PERIOD,
+    _PRE_RANGE_CONFIG_TIMEOUT_MACROP_HI,
+    _FINAL_RANGE_CONFIG_VCSEL_PERIOD,
+    _FINAL_RANGE_CONFIG_TIMEOUT_MACROP_HI,
+    _FINAL_RANGE_CONFIG_MIN_COUNT_RATE_RTN_LIMIT,
+)
 _VCSEL_PERIOD_PRE_RANGE = const(0)
 _VCSEL_PERIOD_FINAL_RANGE = const(1)
 
@@ -141,20 +160,41 @@ def _timeout_microseconds_to_mclks(
 
 
 class VL53L0X:
-    """Driver for the VL53L0X distance sensor."""
+    """Driver for the VL53L0X distance sensor.
+
+    :param int address: I2C address of the sensor
+    :param float io_timeout_s: seconds to wait for the sensor, 0 waits forever
+    :param str calibration_file: JSON file keeping the SPAD selection and reference
+        calibration per sensor address. A sensor found with the same NVM data as at
+        its last calibration is brought up from it instead of calibrating again.
+        Delete the file to calibrate again, e.g. after a large temperature change.
+    """
 
     # Class-level buffer for reading and writing data with the sensor.
     # This reduces memory allocations but means the code is not re-entrant or
     # thread safe!
     _BUFFER = bytearray(3)
+    _RANGE_BUFFER = bytearray(2)
+    _RANGE_TRANSFERS = (
+        (bytes([_RESULT_RANGE_STATUS + 10]), _RANGE_BUFFER),
+        (bytes([_SYSTEM_INTERRUPT_CLEAR, 0x01]), None),
+    )
 
     # Is VL53L0X is currently continuous mode? (Needed by `range` property)
     _continuous_mode = False
 
-    def __init__(self, i2c: I2C, address: int = 41, io_timeout_s: float = 0) -> None:
+    def __init__(
+        self,
+        i2c: "I2C",
+        address: int = 41,
+        io_timeout_s: float = 0,
+        calibration_file: Optional[str] = None,
+    ) -> None:
         # pylint: disable=too-many-statements
         self._i2c = i2c
-        self._device = i2c_device.I2CDevice(i2c, address)
+        self._calibration_file = calibration_file
+        self._calibration_key = f"{address:#04x}"
+        self._device = self._cached_device(address)
         self.io_timeout_s = io_timeout_s
         self._data_ready = False
         # Check identification registers for expected values.
@@ -183,7 +223,6 @@ class VL53L0X:
         # second)
         self.signal_rate_limit = 0.25
         self._write_u8(_SYSTEM_SEQUENCE_CONFIG, 0xFF)
-        spad_count, spad_is_aperture = self._get_spad_info()
         # The SPAD map (RefGoodSpadMap) is read by
         # VL53L0X_get_info_from_device() in the API, but the same data seems to
         # be more easily readable from GLOBAL_CONFIG_SPAD_ENABLES_REF_0 through
@@ -193,6 +232,13 @@ class VL53L0X:
         with self._device:
             self._device.write(ref_spad_map, end=1)
             self._device.readinto(ref_spad_map, start=1)
+        good_spad_map = bytes(ref_spad_map[1:])
+        # a warm start reuses the SPAD selection and reference calibration
+        # of the last cold start of this sensor
+        calibration = self._load_calibration(good_spad_map)
+        self.warm_start = calibration is not None
+        if not self.warm_start:
+            spad_count, spad_is_aperture = self._get_spad_info()
 
         for pair in (
             (0xFF, 0x01),
@@ -203,101 +249,106 @@ class VL53L0X:
         ):
             self._write_u8(pair[0], pair[1])
 
-        first_spad_to_enable = 12 if spad_is_aperture else 0
-        spads_enabled = 0
-        for i in range(48):
-            if i < first_spad_to_enable or spads_enabled == spad_count:
-                # This bit is lower than the first one that should be enabled,
-                # or (reference_spad_count) bits have already been enabled, so
-                # zero this bit.
-                ref_spad_map[1 + (i // 8)] &= ~(1 << (i % 8))
-            elif (ref_spad_map[1 + (i // 8)] >> (i % 8)) & 0x1 > 0:
-                spads_enabled += 1
+        if self.warm_start:
+            ref_spad_map[1:] = bytes.fromhex(calibration["ref_spad_map"])
+        else:
+            first_spad_to_enable = 12 if spad_is_aperture else 0
+            spads_enabled = 0
+            for i in range(48):
+                if i < first_spad_to_enable or spads_enabled == spad_count:
+                    # This bit is lower than the first one that should be enabled,
+                    # or (reference_spad_count) bits have already been enabled, so
+                    # zero this bit.
+                    ref_spad_map[1 + (i // 8)] &= ~(1 << (i % 8))
+                elif (ref_spad_map[1 + (i // 8)] >> (i % 8)) & 0x1 > 0:
+                    spads_enabled += 1
         with self._device:
             self._device.write(ref_spad_map)
-        for pair in (
-            (0xFF, 0x01),
-            (0x00, 0x00),
-            (0xFF, 0x00),
-            (0x09, 0x00),
-            (0x10, 0x00),
-            (0x11, 0x00),
-            (0x24, 0x01),
-            (0x25, 0xFF),
-            (0x75, 0x00),
-            (0xFF, 0x01),
-            (0x4E, 0x2C),
-            (0x48, 0x00),
-            (0x30, 0x20),
-            (0xFF, 0x00),
-            (0x30, 0x09),
-            (0x54, 0x00),
-            (0x31, 0x04),
-            (0x32, 0x03),
-            (0x40, 0x83),
-            (0x46, 0x25),
-            (0x60, 0x00),
-            (0x27, 0x00),
-            (0x50, 0x06),
-            (0x51, 0x00),
-            (0x52, 0x96),
-            (0x56, 0x08),
-            (0x57, 0x30),
-            (0x61, 0x00),
-            (0x62, 0x00),
-            (0x64, 0x00),
-            (0x65, 0x00),
-            (0x66, 0xA0),
-            (0xFF, 0x01),
-            (0x22, 0x32),
-            (0x47, 0x14),
-            (0x49, 0xFF),
-            (0x4A, 0x00),
-            (0xFF, 0x00),
-            (0x7A, 0x0A),
-            (0x7B, 0x00),
-            (0x78, 0x21),
-            (0xFF, 0x01),
-            (0x23, 0x34),
-            (0x42, 0x00),
-            (0x44, 0xFF),
-            (0x45, 0x26),
-            (0x46, 0x05),
-            (0x40, 0x40),
-            (0x0E, 0x06),
-            (0x20, 0x1A),
-            (0x43, 0x40),
-            (0xFF, 0x00),
-            (0x34, 0x03),
-            (0x35, 0x44),
-            (0xFF, 0x01),
-            (0x31, 0x04),
-            (0x4B, 0x09),
-            (0x4C, 0x05),
-            (0x4D, 0x04),
-            (0xFF, 0x00),
-            (0x44, 0x00),
-            (0x45, 0x20),
-            (0x47, 0x08),
-            (0x48, 0x28),
-            (0x67, 0x00),
-            (0x70, 0x04),
-            (0x71, 0x01),
-            (0x72, 0xFE),
-            (0x76, 0x00),
-            (0x77, 0x00),
-            (0xFF, 0x01),
-            (0x0D, 0x01),
-            (0xFF, 0x00),
-            (0x80, 0x01),
-            (0x01, 0xF8),
-            (0xFF, 0x01),
-            (0x8E, 0x01),
-            (0x00, 0x01),
-            (0xFF, 0x00),
-            (0x80, 0x00),
-        ):
-            self._write_u8(pair[0], pair[1])
+        # tuning settings, sent in one burst when the bus supports it
+        self._device.write_registers(
+            (
+                (0xFF, 0x01),
+                (0x00, 0x00),
+                (0xFF, 0x00),
+                (0x09, 0x00),
+                (0x10, 0x00),
+                (0x11, 0x00),
+                (0x24, 0x01),
+                (0x25, 0xFF),
+                (0x75, 0x00),
+                (0xFF, 0x01),
+                (0x4E, 0x2C),
+                (0x48, 0x00),
+                (0x30, 0x20),
+                (0xFF, 0x00),
+                (0x30, 0x09),
+                (0x54, 0x00),
+                (0x31, 0x04),
+                (0x32, 0x03),
+                (0x40, 0x83),
+                (0x46, 0x25),
+                (0x60, 0x00),
+                (0x27, 0x00),
+                (0x50, 0x06),
+                (0x51, 0x00),
+                (0x52, 0x96),
+                (0x56, 0x08),
+                (0x57, 0x30),
+                (0x61, 0x00),
+                (0x62, 0x00),
+                (0x64, 0x00),
+                (0x65, 0x00),
+                (0x66, 0xA0),
+                (0xFF, 0x01),
+                (0x22, 0x32),
+                (0x47, 0x14),
+                (0x49, 0xFF),
+                (0x4A, 0x00),
+                (0xFF, 0x00),
+                (0x7A, 0x0A),
+                (0x7B, 0x00),
+                (0x78, 0x21),
+                (0xFF, 0x01),
+                (0x23, 0x34),
+                (0x42, 0x00),
+                (0x44, 0xFF),
+                (0x45, 0x26),
+                (0x46, 0x05),
+                (0x40, 0x40),
+                (0x0E, 0x06),
+                (0x20, 0x1A),
+                (0x43, 0x40),
+                (0xFF, 0x00),
+                (0x34, 0x03),
+                (0x35, 0x44),
+                (0xFF, 0x01),
+                (0x31, 0x04),
+                (0x4B, 0x09),
+                (0x4C, 0x05),
+                (0x4D, 0x04),
+                (0xFF, 0x00),
+                (0x44, 0x00),
+                (0x45, 0x20),
+                (0x47, 0x08),
+                (0x48, 0x28),
+                (0x67, 0x00),
+                (0x70, 0x04),
+                (0x71, 0x01),
+                (0x72, 0xFE),
+                (0x76, 0x00),
+                (0x77, 0x00),
+                (0xFF, 0x01),
+                (0x0D, 0x01),
+                (0xFF, 0x00),
+                (0x80, 0x01),
+                (0x01, 0xF8),
+                (0xFF, 0x01),
+                (0x8E, 0x01),
+                (0x00, 0x01),
+                (0xFF, 0x00),
+                (0x80, 0x00),
+            )
+        )
 
         self._write_u8(_SYSTEM_INTERRUPT_CONFIG_GPIO, 0x04)
         gpio_hv_mux_active_high = self._read_u8(_GPIO_HV_MUX_ACTIVE_HIGH)
@@ -308,13 +359,26 @@ class VL53L0X:
         self._measurement_timing_budget_us = self.measurement_timing_budget
         self._write_u8(_SYSTEM_SEQUENCE_CONFIG, 0xE8)
         self.measurement_timing_budget = self._measurement_timing_budget_us
-        self._write_u8(_SYSTEM_SEQUENCE_CONFIG, 0x01)
-        self._perform_single_ref_calibration(0x40)
-        self._write_u8(_SYSTEM_SEQUENCE_CONFIG, 0x02)
-        self._perform_single_ref_calibration(0x00)
+        if self.warm_start:
+            self._write_ref_calibration(calibration["vhv"], calibration["phase_cal"])
+        else:
+            self._write_u8(_SYSTEM_SEQUENCE_CONFIG, 0x01)
+            self._perform_single_ref_calibration(0x40)
+            self._write_u8(_SYSTEM_SEQUENCE_CONFIG, 0x02)
+            self._perform_single_ref_calibration(0x00)
+            vhv, phase_cal = self._read_ref_calibration()
+            self._save_calibration(good_spad_map, bytes(ref_spad_map[1:]), vhv, phase_cal)
         # "restore the previous Sequence Config"
         self._write_u8(_SYSTEM_SEQUENCE_CONFIG, 0xE8)
 
+    def _cached_device(self, address: int) -> CachedI2CDevice:
+        # 0xFF selects the register page, the cached registers are on page 0
+        return CachedI2CDevice(
+            i2c_device.I2CDevice(self._i2c, address),
+            _CONFIG_REGISTERS,
+            bank_register=0xFF,
+        )
+
     def _read_u8(self, address: int) -> int:
         # Read an 8-bit unsigned value from the specified 8-bit address.
         with self._device:
@@ -328,7 +392,7 @@ class VL53L0X:
         with self._device:
             self._BUFFER[0] = address & 0xFF
             self._device.write(self._BUFFER, end=1)
-            self._device.readinto(self._BUFFER)
+            self._device.readinto(self._BUFFER, end=2)
         return (self._BUFFER[0] << 8) | self._BUFFER[1]
 
     def _write_u8(self, address: int, val: int) -> None:
@@ -392,6 +456,73 @@ class VL53L0X:
         self._write_u8(_SYSTEM_INTERRUPT_CLEAR, 0x01)
         self._write_u8(_SYSRANGE_START, 0x00)
 
+    def _read_ref_calibration(self) -> Tuple[int, int]:
+        # VHV and phase calibration results, see VL53L0X_ref_calibration_io() in the ST API
+        for pair in ((0xFF, 0x01), (0x00, 0x00), (0xFF, 0x00)):
+            self._write_u8(pair[0], pair[1])
+        vhv = self._read_u8(0xCB)
+        phase_cal = self._read_u8(0xEE)
+        for pair in ((0xFF, 0x01), (0x00, 0x01), (0xFF, 0x00)):
+            self._write_u8(pair[0], pair[1])
+        return vhv, phase_cal
+
+    def _write_ref_calibration(self, vhv: int, phase_cal: int) -> None:
+        self._device.write_registers(
+            (
+                (0xFF, 0x01),
+                (0x00, 0x00),
+                (0xFF, 0x00),
+                (0xCB, vhv),
+                (0xEE, phase_cal),
+                (0xFF, 0x01),
+                (0x00, 0x01),
+                (0xFF, 0x00),
+            )
+        )
+
+    def _load_calibration(self, good_spad_map: bytes) -> Optional[dict]:
+        # the stored calibration of this address, if it belongs to the connected sensor
+        if self._calibration_file is None:
+            return None
+        try:
+            with open(self._calibration_file, "r") as file:
+                calibration = json.load(file)[self._calibration_key]
+        except (OSError, ValueError, KeyError):
+            return None
+        # the SPAD map reads back as the NVM one after a power cycle and as the
+        # applied one when the sensor kept running
+        if calibration.get("stop_variable") != self._stop_variable or good_spad_map.hex() not in (
+            calibration.get("good_spad_map"),
+            calibration.get("ref_spad_map"),
+        ):
+            return None
+        return calibration
+
+    def _save_calibration(self, good_spad_map: bytes, ref_spad_map: bytes, vhv: int, phase_cal: int) -> None:
+        if self._calibration_file is None:
+            return
+        try:
+            with open(self._calibration_file, "r") as file:
+                calibrations = json.load(file)
+        except (OSError, ValueError):
+            calibrations = {}
+        calibrations[self._calibration_key] = {
+            "stop_variable": self._stop_variable,
+            "good_spad_map": good_spad_map.hex(),
+            "ref_spad_map": ref_spad_map.hex(),
+            "vhv": vhv,
+            "phase_cal": phase_cal,
+        }
+        # a cache that can not be written only costs the next start its warm start
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self._calibration_file)), exist_ok=True)
+            tmp_file = self._calibration_file + ".tmp"
+            with open(tmp_file, "w") as file:
+                json.dump(calibrations, file, indent=2)
+            os.replace(tmp_file, self._calibration_file)
+        except OSError:
+            pass
+
     def _get_vcsel_pulse_period(self, vcsel_period_type: int) -> int:
         # pylint: disable=no-else-return
         # Disable should be removed when refactor can be tested
@@ -593,8 +724,15 @@ class VL53L0X:
                 raise RuntimeError("Timeout waiting for VL53L0X!")
         # assumptions: Linearity Corrective Gain is 1000 (default)
         # fractional ranging is not enabled
-        range_mm = self._read_u16(_RESULT_RANGE_STATUS + 10)
-        self._write_u8(_SYSTEM_INTERRUPT_CLEAR, 0x01)
+        transfer_many = getattr(self._i2c, "transfer_many", None)
+        if transfer_many is None:
+            range_mm = self._read_u16(_RESULT_RANGE_STATUS + 10)
+            self._write_u8(_SYSTEM_INTERRUPT_CLEAR, 0x01)
+        else:
+            # read the range and clear the interrupt in one bus transaction
+            with self._device:
+                transfer_many(self._device.device_address, self._RANGE_TRANSFERS)
+            range_mm = (self._RANGE_BUFFER[0] << 8) | self._RANGE_BUFFER[1]
         self._data_ready = False
         return range_mm
 
@@ -680,4 +818,4 @@ class VL53L0X:
             "SHDN" pin is pulled HIGH again the default I2C address is ``0x29``.
         """
         self._write_u8(_I2C_SLAVE_DEVICE_ADDRESS, new_address & 0x7F)
-        self._device = i2c_device.I2CDevice(self._i2c, new_address)
+        self._device = self._cached_device(new_address)
@@ -12,11 +12,10 @@ try:
 except ImportError:
     threading = None
 
-# pylint: disable=unused-import
-import adafruit_platformdetect.constants.boards as ap_board
-import adafruit_platformdetect.constants.chips as ap_chip
-from adafruit_blinka import Enum, Lockable, agnostic
-from adafruit_blinka.agnostic import board_id, detector
+from adafruit_blinka import Enum, Lockable
+
+# board and platform detection (adafruit_blinka.agnostic) is imported where it
+# is needed, an I2C bus opened by number never runs it
 
 # pylint: disable=import-outside-toplevel,too-many-branches,too-many-statements
 # pylint: disable=too-many-arguments,too-many-function-args,too-many-return-statements
@@ -26,14 +25,28 @@ class I2C(Lockable):
     """
     Busio I2C Class for CircuitPython Compatibility. Used
     for both MicroPython and Linux.
+
+    Given a ``bus`` number, the Linux adapter ``/dev/i2c-<bus>`` is opened
+    directly, without board detection, and ``scl``, ``sda`` and ``frequency``
+    are ignored.
     """
 
-    def __init__(self, scl, sda, frequency=100000):
-        self.init(scl, sda, frequency)
+    def __init__(self, scl=None, sda=None, frequency=100000, *, bus=None):
+        self.init(scl, sda, frequency, bus)
 
-    def init(self, scl, sda, frequency):
+    def init(self, scl, sda, frequency, bus=None):
         """Initialization"""
         self.deinit()
+        if bus is not None:
+            from .i2c_dev import I2CDev
+
+            self._i2c = I2CDev(bus)
+            if threading is not None:
+                self._lock = threading.RLock()
+            return
+        from adafruit_blinka.agnostic import detector
+        import adafruit_platformdetect.constants.chips as ap_chip
+
         if detector.board.ftdi_ft232h:
             from adafruit_blinka.microcontroller.ftdi_mpsse.mpsse.i2c import I2C as _I2C
 
@@ -128,9 +141,13 @@ class I2C(Lockable):
     def deinit(self):
         """Deinitialization"""
         try:
-            del self._i2c
+            i2c = self._i2c
         except AttributeError:
-            pass
+            return
+        # close the backend, an i2c-dev adapter otherwise keeps its fd open
+        if hasattr(i2c, "deinit"):
+            i2c.deinit()
+        del self._i2c
 
     def __enter__(self):
         if threading is not None:
@@ -191,6 +208,21 @@ class I2C(Lockable):
             stop=stop,
         )
 
+    def transfer_many(self, address, transfers):
+        """Run a sequence of ``(buffer_out, buffer_in)`` transfers with the device
+        at specified address. Each writes buffer_out and then reads into buffer_in
+        with a repeated start, a buffer_in of None only writes. The i2c-dev
+        backend passes all of them to the kernel in one call.
+        """
+        if hasattr(self._i2c, "transfer_many"):
+            return self._i2c.transfer_many(address, transfers)
+        for buffer_out, buffer_in in transfers:
+            if buffer_in is None:
+                self._i2c.writeto(address, buffer_out, stop=True)
+            else:
+                self.writeto_then_readfrom(address, buffer_out, buffer_in)
+        return None
+
 
 class SPI(Lockable):
     """
@@ -200,6 +232,9 @@ class SPI(Lockable):
 
     def __init__(self, clock, MOSI=None, MISO=None):
         self.deinit()
+        from adafruit_blinka.agnostic import detector
+        import adafruit_platformdetect.constants.chips as ap_chip
+
         if detector.board.ftdi_ft232h:
             from adafruit_blinka.microcontroller.ftdi_mpsse.mpsse.spi import SPI as _SPI
             from adafruit_blinka.microcontroller.ftdi_mpsse.ft232h.pin import (
@@ -295,6 +330,9 @@ class SPI(Lockable):
 
     def configure(self, baudrate=100000, polarity=0, phase=0, bits=8):
         """Update the configuration"""
+        from adafruit_blinka.agnostic import detector
+        import adafruit_platformdetect.constants.chips as ap_chip
+
         if detector.board.any_nanopi and detector.chip.id == ap_chip.SUN8I:
             from adafruit_blinka.microcontroller.generic_linux.spi import SPI as _SPI
         elif detector.board.ftdi_ft232h:
@@ -406,6 +444,10 @@ class UART(Lockable):
         receiver_buffer_size=64,
         flow=None,
     ):
+        from adafruit_blinka import agnostic
+        from adafruit_blinka.agnostic import detector
+        import adafruit_platformdetect.constants.chips as ap_chip
+
         if detector.board.any_embedded_linux:
             raise RuntimeError(
                 "busio.UART not supported on this platform. Please use pyserial instead."
@@ -470,6 +512,8 @@ class UART(Lockable):
 
     def deinit(self):
         """Deinitialization"""
+        from adafruit_blinka.agnostic import detector
+
         if detector.board.binho_nova:
             self._uart.deinit()
         self._uart = None
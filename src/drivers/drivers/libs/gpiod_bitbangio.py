@@ -0,0 +1,313 @@
+"""
+`gpiod_bitbangio`
+================================================================================
+
+Bit-banged I2C on top of the Linux GPIO character device (libgpiod v2 bindings).
+
+Unlike :mod:`adafruit_bitbangio`, which flips every bit through
+``DigitalInOut.switch_to_output/switch_to_input``, both lines are requested once
+as open drain outputs and driven together with ``set_values``. The kernel
+releases an open drain line for a high level (emulating it on chips without
+open drain support), so no direction changes are needed and the bus level is
+read back with ``get_values``.
+
+The pin states of every byte are computed once, so sending a byte only plays
+back a prepared list of ``set_values`` arguments. The half period is only
+waited for when the GPIO calls themselves are faster than it, and devices may
+stretch the clock at byte boundaries and whenever the master samples SDA.
+
+**Software and Dependencies:**
+
+* libgpiod python bindings 2.x: https://pypi.org/project/gpiod/
+"""
+
+import time
+
+try:
+    from typing import List, Optional, Sequence, Tuple, Type
+    from types import TracebackType
+    from circuitpython_typing import WriteableBuffer, ReadableBuffer
+except ImportError:
+    pass
+
+try:
+    from gpiod.line import Value
+
+    HIGH = Value.ACTIVE
+    LOW = Value.INACTIVE
+except ImportError:
+    # only simulated lines can be used without the bindings
+    HIGH = 1
+    LOW = 0
+
+# actions taken after a state was set
+_NONE = 0
+_CHECK_SCL = 1  # wait while a device stretches the clock
+_SAMPLE = 2  # wait for SCL, then shift SDA into the result
+_WAIT = 4  # SCL changed, hold the level for half a period
+
+# shorter waits spin, longer ones sleep
+_SPIN_LIMIT = 0.0002
+
+
+def _offset(pin) -> int:
+    # accept plain line offsets as well as pin objects carrying one as id
+    return int(getattr(pin, "id", pin))
+
+
+def _request_lines(chip: str, scl: int, sda: int):
+    import gpiod  # pylint: disable=import-outside-toplevel
+    from gpiod.line import Direction, Drive  # pylint: disable=import-outside-toplevel
+
+    settings = gpiod.LineSettings(direction=Direction.OUTPUT, drive=Drive.OPEN_DRAIN, output_value=HIGH)
+    return gpiod.request_lines(chip, consumer="bitbang-i2c", config={(scl, sda): settings})
+
+
+class I2C:
+    """Software I2C over two lines of a GPIO chip.
+
+    :param scl: line offset of the clock on ``chip``, or a pin with the offset as ``id``
+    :param sda: line offset of the data line on ``chip``, or a pin with the offset as ``id``
+    :param int frequency: target clock frequency in Hz
+    :param float timeout: seconds a device may stretch the clock
+    :param str chip: GPIO character device holding both lines
+    :param request: already requested line request driving both lines as open drain,
+        used instead of requesting them from ``chip`` (e.g. a simulated chip)
+    """
+
+    def __init__(
+        self,
+        scl,
+        sda,
+        *,
+        frequency: int = 400000,
+        timeout: float = 1,
+        chip: str = "/dev/gpiochip0",
+        request=None,
+    ) -> None:
+        self._locked = False
+        self._scl = _offset(scl)
+        self._sda = _offset(sda)
+        self._lines = [self._scl, self._sda]
+        self._timeout = timeout
+        self._request = request if request is not None else _request_lines(chip, self._scl, self._sda)
+
+        # set_values arguments for every (scl, sda) level pair
+        self._states = {
+            (clock, data): {self._scl: HIGH if clock else LOW, self._sda: HIGH if data else LOW}
+            for clock in (0, 1)
+            for data in (0, 1)
+        }
+        self._start_sequence = self._sequence([(0, 1, _NONE), (1, 1, _CHECK_SCL), (1, 0, _NONE), (0, 0, _NONE)])
+        self._stop_sequence = self._sequence([(0, 0, _NONE), (1, 0, _CHECK_SCL), (1, 1, _NONE)])
+        self._write_sequences = [self._write_byte_sequence(byte) for byte in range(256)]
+        self._read_sequences = [self._read_byte_sequence(ack) for ack in (False, True)]
+
+        self._request.set_values(self._states[(1, 1)])
+        self._delay = self._wait_time(0.5 / frequency)
+
+    def _sequence(self, steps: "Sequence[Tuple[int, int, int]]") -> "List[Tuple[dict, int]]":
+        # only clock edges set the pace, SDA changes while SCL is low need no extra wait
+        sequence = []
+        previous = (None, None)
+        for clock, data, action in steps:
+            if (clock, data) == previous and not action:
+                continue  # nothing changes on the bus
+            if clock != previous[0]:
+                action |= _WAIT
+            sequence.append((self._states[(clock, data)], action))
+            previous = (clock, data)
+        return sequence
+
+    def _write_byte_sequence(self, byte: int) -> "List[Tuple[dict, int]]":
+        # starts and ends with SCL low, the ACK bit is the only sample
+        steps = []
+        for position in range(8):
+            bit = (byte >> (7 - position)) & 1
+            steps.append((0, bit, _NONE))
+            # devices stretch the clock between bytes, check on the first rising edge
+            steps.append((1, bit, _CHECK_SCL if position == 0 else _NONE))
+            steps.append((0, bit, _NONE))
+        steps += [(0, 1, _NONE), (1, 1, _SAMPLE), (0, 1, _NONE)]
+        return self._sequence(steps)
+
+    def _read_byte_sequence(self, ack: bool) -> "List[Tuple[dict, int]]":
+        steps = [(0, 1, _NONE)]
+        for _ in range(8):
+            steps += [(1, 1, _SAMPLE), (0, 1, _NONE)]
+        ack_level = 0 if ack else 1
+        steps += [(0, ack_level, _NONE), (1, ack_level, _CHECK_SCL), (0, ack_level, _NONE), (0, 1, _NONE)]
+        return self._sequence(steps)
+
+    def _wait_time(self, half_period: float, calls: int = 32) -> float:
+        # a GPIO call already takes a few microseconds, only wait for what is left
+        idle = self._states[(1, 1)]
+        start = time.perf_counter()
+        for _ in range(calls):
+            self._request.set_values(idle)
+        call_time = (time.perf_counter() - start) / calls
+        return max(0.0, half_period - call_time)
+
+    def _wait(self) -> None:
+        if self._delay >= _SPIN_LIMIT:
+            time.sleep(self._delay)
+            return
+        end = time.perf_counter() + self._delay
+        while time.perf_counter() < end:
+            pass
+
+    def _clock_high(self) -> int:
+        """Wait until SCL is released by every device, returns the SDA level"""
+        scl, sda = self._request.get_values(self._lines)
+        if scl == HIGH:
+            return 1 if sda == HIGH else 0
+        deadline = time.monotonic() + self._timeout
+        while time.monotonic() < deadline:
+            scl, sda = self._request.get_values(self._lines)
+            if scl == HIGH:
+                return 1 if sda == HIGH else 0
+        raise RuntimeError("Clock stretched for too long")
+
+    def _play(self, sequence: "List[Tuple[dict, int]]") -> int:
+        """Set every state of `sequence`, returns the sampled SDA bits"""
+        set_values = self._request.set_values
+        wait = self._delay > 0
+        result = 0
+        for state, action in sequence:
+            set_values(state)
+            if action & (_CHECK_SCL | _SAMPLE):
+                data = self._clock_high()
+                if action & _SAMPLE:
+                    result = (result << 1) | data
+            if wait and action & _WAIT:
+                self._wait()
+        return result
+
+    def _write_byte(self, byte: int) -> bool:
+        # the sampled ACK bit is low when the device acknowledged
+        return not self._play(self._write_sequences[byte])
+
+    def _read_byte(self, ack: bool) -> int:
+        return self._play(self._read_sequences[ack])
+
+    def _address(self, address: int, read: bool) -> None:
+        self._play(self._start_sequence)
+        if not self._write_byte(address << 1 | read):
+            self._play(self._stop_sequence)
+            raise RuntimeError(f"Device not responding at 0x{address:02X}")
+
+    def _write(self, address: int, buffer: "ReadableBuffer", transmit_stop: bool) -> None:
+        self._address(address, False)
+        for byte in buffer:
+            self._write_byte(byte)
+        if transmit_stop:
+            self._play(self._stop_sequence)
+
+    def _read(self, address: int, buffer: "WriteableBuffer", start: int, end: int) -> None:
+        self._address(address, True)
+        for i in range(start, end):
+            buffer[i] = self._read_byte(ack=i != end - 1)
+        self._play(self._stop_sequence)
+
+    def _probe(self, address: int) -> bool:
+        self._play(self._start_sequence)
+        ok = self._write_byte(address << 1)
+        self._play(self._stop_sequence)
+        return ok
+
+    # busio.I2C compatible interface
+
+    def try_lock(self) -> bool:
+        """Attempt to grab the lock. Return True on success, False if the lock is already taken."""
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self) -> None:
+        """Release the lock so others may use the resource."""
+        if self._locked:
+            self._locked = False
+        else:
+            raise ValueError("Not locked")
+
+    def _check_lock(self) -> bool:
+        if not self._locked:
+            raise RuntimeError("First call try_lock()")
+        return True
+
+    def __enter__(self) -> "I2C":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: "Optional[Type[BaseException]]",
+        exc_value: "Optional[BaseException]",
+        traceback: "Optional[TracebackType]",
+    ) -> None:
+        self.deinit()
+
+    def deinit(self) -> None:
+        """Release both lines"""
+        if self._request is not None:
+            self._request.release()
+            self._request = None
+
+    def scan(self) -> "List[int]":
+        """Perform an I2C Device Scan"""
+        found = []
+        if self._check_lock():
+            for address in range(0, 0x80):
+                if self._probe(address):
+                    found.append(address)
+        return found
+
+    def writeto(
+        self,
+        address: int,
+        buffer: "ReadableBuffer",
+        *,
+        start: int = 0,
+        end: "Optional[int]" = None,
+    ) -> None:
+        """Write data from the buffer to an address"""
+        if end is None:
+            end = len(buffer)
+        if self._check_lock():
+            self._write(address, memoryview(buffer)[start:end], True)
+
+    def readfrom_into(
+        self,
+        address: int,
+        buffer: "WriteableBuffer",
+        *,
+        start: int = 0,
+        end: "Optional[int]" = None,
+    ) -> None:
+        """Read data from an address and into the buffer"""
+        if end is None:
+            end = len(buffer)
+        if self._check_lock():
+            self._read(address, buffer, start, end)
+
+    def writeto_then_readfrom(
+        self,
+        address: int,
+        buffer_out: "ReadableBuffer",
+        buffer_in: "WriteableBuffer",
+        *,
+        out_start: int = 0,
+        out_end: "Optional[int]" = None,
+        in_start: int = 0,
+        in_end: "Optional[int]" = None,
+    ) -> None:
+        """Write data from buffer_out to an address and then
+        read data from an address and into buffer_in, with a repeated start in between
+        """
+        if out_end is None:
+            out_end = len(buffer_out)
+        if in_end is None:
+            in_end = len(buffer_in)
+        if self._check_lock():
+            self._write(address, memoryview(buffer_out)[out_start:out_end], False)
+            self._read(address, buffer_in, in_start, in_end)
@@ -1,41 +1,292 @@
-import Jetson.GPIO as GPIO
+"""
+`gy_tcs3200`
+================================================================================
+
+TCS3200 / GY-31 color sensor read by timing the edges of its output frequency.
+
+A background thread selects the red, green and blue photodiodes in turn and
+collects the timestamps of the following falling edges from an edge source.
+The frequency of a filter is the number of periods between the first and the
+last edge divided by their distance. The output settles within one period of
+the new frequency after a filter change (datasheet, "response time to output
+frequency scaling / photodiode select"), so the first edge after the change is
+dropped instead of sleeping.
+
+Edge sources:
+
+* `GpiodEdgeSource`: line events of the GPIO character device, timestamped by the kernel
+* `JetsonEdgeSource`: Jetson.GPIO event callbacks on BCM pins, timestamped in user space
+* `SimulatedEdgeSource`: edges of given frequencies, for tests without hardware
+"""
+
+import collections
+import random
+import threading
 import time
 from sys import argv
 
-class TCS3200:
-    NUM_CYCLES = 10
+try:
+    from typing import Dict, List, Optional, Tuple
+except ImportError:
+    pass
+
+# s2, s3 levels selecting the red, green and blue photodiodes
+RED = (False, False)
+GREEN = (True, True)
+BLUE = (False, True)
+FILTERS = (RED, GREEN, BLUE)
+
+_NS = 1_000_000_000
+
+
+class GpiodEdgeSource:
+    """Filter select outputs and falling edges of the output on one GPIO chip.
+
+    :param int s2: line offset of S2
+    :param int s3: line offset of S3
+    :param int signal: line offset of OUT
+    :param str chip: GPIO character device holding the lines
+    """
+
+    def __init__(self, s2: int, s3: int, signal: int, chip: str = "/dev/gpiochip0") -> None:
+        import gpiod  # pylint: disable=import-outside-toplevel
+        from gpiod.line import Clock, Direction, Edge, Value  # pylint: disable=import-outside-toplevel
+
+        self._s2 = s2
+        self._s3 = s3
+        self._levels = {True: Value.ACTIVE, False: Value.INACTIVE}
+        self._request = gpiod.request_lines(
+            chip,
+            consumer="tcs3200",
+            config={
+                (s2, s3): gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE),
+                signal: gpiod.LineSettings(
+                    direction=Direction.INPUT, edge_detection=Edge.FALLING, event_clock=Clock.MONOTONIC
+                ),
+            },
+        )
+
+    def select(self, s2: bool, s3: bool) -> int:
+        """Select a photodiode, returns the CLOCK_MONOTONIC time of the change in ns"""
+        self._request.set_values({self._s2: self._levels[s2], self._s3: self._levels[s3]})
+        return time.monotonic_ns()
+
+    def edges(self, since: int, count: int, timeout: float) -> "List[int]":
+        """Timestamps in ns of the first `count` falling edges after `since`"""
+        timestamps = []
+        deadline = time.monotonic() + timeout
+        while len(timestamps) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._request.wait_edge_events(remaining):
+                raise TimeoutError("No output from the TCS3200")
+            for event in self._request.read_edge_events():
+                if event.timestamp_ns > since:
+                    timestamps.append(event.timestamp_ns)
+        return timestamps[:count]
+
+    def close(self) -> None:
+        if self._request is not None:
+            self._request.release()
+            self._request = None
+
+
+class JetsonEdgeSource:
+    """Filter select outputs and falling edges of the output through Jetson.GPIO.
+
+    The edges are timestamped when Jetson.GPIO runs its callback, so the result
+    jitters with the scheduling of its event thread and high output frequencies
+    lose edges. Prefer `GpiodEdgeSource` where the line offsets are known.
+
+    :param int s2: BCM pin of S2
+    :param int s3: BCM pin of S3
+    :param int signal: BCM pin of OUT
+    """
+
+    def __init__(self, s2: int, s3: int, signal: int) -> None:
+        import Jetson.GPIO as GPIO  # pylint: disable=import-outside-toplevel
 
-    def __init__(self, s2, s3, signal):
-        self.s2 = s2
-        self.s3 = s3 
-        self.signal = signal 
+        self._gpio = GPIO
+        self._pins = (s2, s3, signal)
+        self._timestamps = collections.deque(maxlen=1024)
+        self._edge = threading.Condition()
 
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(signal, GPIO.IN)
         GPIO.setup(s2, GPIO.OUT)
         GPIO.setup(s3, GPIO.OUT)
+        GPIO.add_event_detect(signal, GPIO.FALLING, callback=self._on_edge)
+
+    def _on_edge(self, _channel) -> None:
+        with self._edge:
+            self._timestamps.append(time.monotonic_ns())
+            self._edge.notify()
+
+    def select(self, s2: bool, s3: bool) -> int:
+        """Select a photodiode, returns the CLOCK_MONOTONIC time of the change in ns"""
+        GPIO = self._gpio
+        GPIO.output(self._pins[0], GPIO.HIGH if s2 else GPIO.LOW)
+        GPIO.output(self._pins[1], GPIO.HIGH if s3 else GPIO.LOW)
+        return time.monotonic_ns()
+
+    def edges(self, since: int, count: int, timeout: float) -> "List[int]":
+        """Timestamps in ns of the first `count` falling edges after `since`"""
+        deadline = time.monotonic() + timeout
+        with self._edge:
+            while True:
+                while self._timestamps and self._timestamps[0] <= since:
+                    self._timestamps.popleft()
+                if len(self._timestamps) >= count:
+                    return [self._timestamps.popleft() for _ in range(count)]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._edge.wait(remaining):
+                    raise TimeoutError("No output from the TCS3200")
+
+    def close(self) -> None:
+        if self._gpio is not None:
+            self._gpio.remove_event_detect(self._pins[2])
+            self._gpio.cleanup(list(self._pins))
+            self._gpio = None
+
+
+class SimulatedEdgeSource:
+    """Edges of a sensor with a fixed output frequency per photodiode.
+
+    The output keeps its phase across filter changes and the new frequency
+    starts with the period running at the change, like the real sensor. Edges
+    are returned when they would have happened.
+
+    :param frequencies: output frequency in Hz for every (s2, s3) selection
+    :param float jitter: standard deviation of every edge time in seconds
+    """
+
+    def __init__(self, frequencies: "Dict[Tuple[bool, bool], float]", jitter: float = 0.0) -> None:
+        self.frequencies = dict(frequencies)
+        self._jitter = jitter
+        self._selected = RED
+        self._next_edge = time.monotonic_ns()
+
+    def select(self, s2: bool, s3: bool) -> int:
+        """Select a photodiode, returns the CLOCK_MONOTONIC time of the change in ns"""
+        now = time.monotonic_ns()
+        self._advance(now)
+        self._selected = (s2, s3)
+        return now
+
+    def _period(self) -> int:
+        return int(_NS / self.frequencies[self._selected])
+
+    def _advance(self, now: int) -> None:
+        # skip the edges of the old filter that nobody waited for
+        period = self._period()
+        if self._next_edge <= now:
+            self._next_edge += ((now - self._next_edge) // period + 1) * period
+
+    def edges(self, since: int, count: int, timeout: float) -> "List[int]":
+        """Timestamps in ns of the first `count` falling edges after `since`"""
+        self._advance(max(since, time.monotonic_ns()))
+        period = self._period()
+        timestamps = []
+        for _ in range(count):
+            timestamps.append(self._next_edge + int(random.gauss(0.0, self._jitter) * _NS))
+            self._next_edge += period
+        wait = (timestamps[-1] - time.monotonic_ns()) / _NS
+        if wait > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("No output from the TCS3200")
+        if wait > 0:
+            time.sleep(wait)
+        return timestamps
+
+    def close(self) -> None:
+        pass
+
+
+class TCS3200:
+    """Continuously measured TCS3200 output frequencies of red, green and blue.
+
+    Without a `source` the pins are BCM numbers driven through Jetson.GPIO.
+
+    :param int s2: S2 pin
+    :param int s3: S3 pin
+    :param int signal: OUT pin
+    :param source: edge source to use instead of Jetson.GPIO
+    :param int cycles: output periods measured per filter
+    :param float timeout: seconds to wait for the edges of one filter
+    """
+
+    NUM_CYCLES = 10
+
+    def __init__(
+        self,
+        s2: "Optional[int]" = None,
+        s3: "Optional[int]" = None,
+        signal: "Optional[int]" = None,
+        *,
+        source=None,
+        cycles: int = NUM_CYCLES,
+        timeout: float = 0.5,
+    ) -> None:
+        self.source = source if source is not None else JetsonEdgeSource(s2, s3, signal)
+        self.cycles = cycles
+        self.timeout = timeout
+        self.measurements = 0
 
-    def read(self):
+        self._rgb = None
+        self._error = None
+        self._returned = 0
+        self._new_sample = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tcs3200", daemon=True)
+        self._thread.start()
 
-        rgb = []
-        for signal_s2, signal_s3 in [(GPIO.LOW, GPIO.LOW), (GPIO.HIGH, GPIO.HIGH),  (GPIO.LOW, GPIO.HIGH)]:
+    def _frequency(self, color: "Tuple[bool, bool]") -> float:
+        changed = self.source.select(*color)
+        # the period running at the change mixes both filters, start at the edge ending it
+        timestamps = self.source.edges(changed, self.cycles + 2, self.timeout)[1:]
+        return (len(timestamps) - 1) * _NS / (timestamps[-1] - timestamps[0])
 
-            GPIO.output(self.s2, signal_s2)
-            GPIO.output(self.s3, signal_s3)
-            time.sleep(0.3)
-            start = time.time()
+    def measure(self) -> "List[float]":
+        """Measure the output frequency in Hz of every filter once, as [r, g, b]"""
+        return [self._frequency(color) for color in FILTERS]
 
-            for _ in range(self.NUM_CYCLES):
-                GPIO.wait_for_edge(self.signal, GPIO.FALLING)
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                rgb = self.measure()
+            except Exception as e:  # pylint: disable=broad-except
+                with self._new_sample:
+                    self._error = e
+                    self._new_sample.notify_all()
+                return
+            with self._new_sample:
+                self._rgb = rgb
+                self.measurements += 1
+                self._new_sample.notify_all()
 
-            duration = time.time() - start 
-            color  = self.NUM_CYCLES / duration
-            rgb.append(color)
+    def read(self, timeout: "Optional[float]" = None) -> "Optional[List[float]]":
+        """The newest [r, g, b] frequencies not returned before. Waits up to `timeout`
+        seconds (forever for None) for one, returns None if there was none.
+        Raises the error that stopped the measurements."""
+        with self._new_sample:
+            if not self._new_sample.wait_for(
+                lambda: self.measurements > self._returned or self._error is not None, timeout
+            ):
+                return None
+            if self._error is not None:
+                raise self._error
+            self._returned = self.measurements
+            return self._rgb
 
-        return rgb
+    def close(self) -> None:
+        """Stop measuring and release the pins"""
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(self.timeout * (len(FILTERS) + 1))
+        self.source.close()
 
     def __del__(self):
-        GPIO.cleanup()
+        if getattr(self, "source", None) is not None:
+            self.close()
 
 if __name__=='__main__':
     #tcs32 = TCS3200(int(argv[1]), int(argv[2]), int(argv[3]))
@@ -44,4 +295,4 @@ if __name__=='__main__':
     while 1:
         rgb = tcs32.read()
         print(rgb)
-        time.sleep(5)
\ No newline at end of file
+        time.sleep(5)
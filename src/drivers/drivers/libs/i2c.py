@@ -1,21 +1,50 @@
-import board
-
-# SCL, SDA
+# SCL, SDA as pin names on board
+# hardware buses ("default": True) are opened through their i2c-dev adapter /dev/i2c-<device>,
+# so neither board nor Blinka's platform detection is loaded for them
+# the devices are the adapters of these pins on the Jetson Nano, other boards number their
+# adapters differently and set them with i2c.devices in config.yaml
+# software buses ("default": False) may also give the line offsets of SCL and SDA on a
+# GPIO chip as "lines": (scl, sda) and "chip", those use the gpiod bitbang engine
 BUSES = [
-    {"sda": board.SDA_1, "scl": board.SCL_1, "default": True,},
-    {"sda": board.SDA, "scl": board.SCL, "default": True,},
-] 
+    {"sda": "SDA_1", "scl": "SCL_1", "default": True, "device": 0,},
+    {"sda": "SDA", "scl": "SCL", "default": True, "device": 1,},
+]
+
+def _pins(bus):
+    # board runs Blinka's platform detection on import, so it is only loaded
+    # once a bus is opened by its pins
+    import board
+
+    return getattr(board, bus["scl"]), getattr(board, bus["sda"])
+
+def _device(bus_id, bus):
+    # adapter of a hardware bus, config.yaml overrides the Jetson Nano default
+    from ..config import load_config
+
+    try:
+        devices = load_config().get("i2c", {}).get("devices")
+    except OSError:
+        devices = None
+    if devices is None:
+        return bus["device"]
+    return int(devices[bus_id])
 
 def I2C(bus_id=1, frequency=100000):
     """
     I2C factory function to return an I2C object based on the bus number.
+    The frequency of hardware buses is set by the kernel.
     """
 
     bus = BUSES[bus_id]
 
     if bus["default"]:
         from .busio import I2C
-        return I2C(scl=bus["scl"], sda=bus["sda"], frequency=frequency)
+        return I2C(bus=_device(bus_id, bus))
+    elif "lines" in bus:
+        from .gpiod_bitbangio import I2C
+        scl, sda = bus["lines"]
+        return I2C(scl, sda, frequency=frequency, chip=bus.get("chip", "/dev/gpiochip0"))
     else:
         from .adafruit_bitbangio import I2C
-        return I2C(scl=bus["scl"], sda=bus["sda"], frequency=frequency)
\ No newline at end of file
+        scl, sda = _pins(bus)
+        return I2C(scl=scl, sda=sda, frequency=frequency)
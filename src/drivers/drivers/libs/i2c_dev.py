@@ -0,0 +1,174 @@
+"""
+`i2c_dev`
+================================================================================
+
+I2C master on a Linux i2c-dev adapter (``/dev/i2c-N``) using the ``I2C_RDWR`` ioctl.
+
+This is the backend :class:`busio.I2C` uses when it is given a bus number, so no
+board or platform detection runs. Every transfer is handed to the kernel as a
+list of ``i2c_msg`` structures taken from an array that is allocated once, which
+makes a register read (write the register, repeated start, read) a single ioctl
+and lets :meth:`I2CDev.transfer_many` read several registers with one ioctl.
+
+The clock frequency is set by the adapter's device tree node, i2c-dev can not
+change it.
+"""
+
+import ctypes
+import fcntl
+import os
+
+try:
+    from typing import List, Optional, Sequence, Tuple
+    from circuitpython_typing import WriteableBuffer, ReadableBuffer
+except ImportError:
+    pass
+
+# linux/i2c-dev.h, linux/i2c.h
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+I2C_RDWR_IOCTL_MAX_MSGS = 42
+
+
+class i2c_msg(ctypes.Structure):  # pylint: disable=invalid-name,too-few-public-methods
+    """struct i2c_msg"""
+
+    _fields_ = [
+        ("addr", ctypes.c_uint16),
+        ("flags", ctypes.c_uint16),
+        ("len", ctypes.c_uint16),
+        ("buf", ctypes.c_void_p),
+    ]
+
+
+class i2c_rdwr_ioctl_data(ctypes.Structure):  # pylint: disable=invalid-name,too-few-public-methods
+    """struct i2c_rdwr_ioctl_data"""
+
+    _fields_ = [
+        ("msgs", ctypes.POINTER(i2c_msg)),
+        ("nmsgs", ctypes.c_uint32),
+    ]
+
+
+def _slice(buffer, start: int, end: "Optional[int]"):
+    if start == 0 and (end is None or end == len(buffer)):
+        return buffer
+    return memoryview(buffer)[start:end]
+
+
+class I2CDev:
+    """I2C adapter ``/dev/i2c-<bus>``.
+
+    :param int bus: adapter number
+    """
+
+    def __init__(self, bus: int) -> None:
+        self._fd = None
+        self._fd = os.open(f"/dev/i2c-{bus}", os.O_RDWR)
+        self._msgs = (i2c_msg * I2C_RDWR_IOCTL_MAX_MSGS)()
+        self._rdwr = i2c_rdwr_ioctl_data(self._msgs, 0)
+        # ctypes views of the buffers of the pending messages, kept alive until the ioctl returned
+        self._views = []
+        self._probe = bytearray(1)
+
+    def deinit(self) -> None:
+        """Close the adapter"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "I2CDev":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.deinit()
+
+    def __del__(self) -> None:
+        # a bus dropped without deinit, e.g. by a failed sensor init, still gives back its fd
+        self.deinit()
+
+    def _add(self, count: int, address: int, buffer, read: bool) -> int:
+        # fill the next message, buffers are passed to the kernel without copying if writable
+        length = len(buffer)
+        if not length:
+            address_of = None
+        else:
+            if memoryview(buffer).readonly:
+                buffer = bytearray(buffer)
+            view = ctypes.c_char.from_buffer(buffer)
+            self._views.append(view)
+            address_of = ctypes.addressof(view)
+        msg = self._msgs[count]
+        msg.addr = address
+        msg.flags = I2C_M_RD if read else 0
+        msg.len = length
+        msg.buf = address_of
+        return count + 1
+
+    def _transfer(self, count: int) -> None:
+        self._rdwr.nmsgs = count
+        try:
+            fcntl.ioctl(self._fd, I2C_RDWR, self._rdwr)
+        finally:
+            self._views.clear()
+
+    def scan(self) -> "List[int]":
+        """Addresses of the devices answering a one byte read"""
+        found = []
+        for address in range(0x80):
+            try:
+                self.readfrom_into(address, self._probe)
+            except OSError:
+                continue
+            found.append(address)
+        return found
+
+    def readfrom_into(self, address: int, buffer: "WriteableBuffer", *, stop: bool = True) -> None:
+        """Read from the device at `address` into `buffer`"""
+        # pylint: disable=unused-argument
+        self._transfer(self._add(0, address, buffer, True))
+
+    def writeto(self, address: int, buffer: "ReadableBuffer", *, stop: bool = True) -> None:
+        """Write `buffer` to the device at `address`"""
+        # pylint: disable=unused-argument
+        self._transfer(self._add(0, address, buffer, False))
+
+    def writeto_then_readfrom(
+        self,
+        address: int,
+        buffer_out: "ReadableBuffer",
+        buffer_in: "WriteableBuffer",
+        *,
+        out_start: int = 0,
+        out_end: "Optional[int]" = None,
+        in_start: int = 0,
+        in_end: "Optional[int]" = None,
+        stop: bool = False,
+    ) -> None:
+        """Write `buffer_out` to the device at `address`, then read into `buffer_in`
+        after a repeated start, in one ioctl"""
+        # pylint: disable=unused-argument
+        count = self._add(0, address, _slice(buffer_out, out_start, out_end), False)
+        count = self._add(count, address, _slice(buffer_in, in_start, in_end), True)
+        self._transfer(count)
+
+    def transfer_many(
+        self,
+        address: int,
+        transfers: "Sequence[Tuple[ReadableBuffer, Optional[WriteableBuffer]]]",
+    ) -> None:
+        """Run several transfers with the device at `address` using as few ioctls as possible.
+
+        Every transfer is a ``(buffer_out, buffer_in)`` pair: `buffer_out` is written, then
+        `buffer_in` is read after a repeated start. A `buffer_in` of None only writes.
+        """
+        count = 0
+        for buffer_out, buffer_in in transfers:
+            if count + 2 > I2C_RDWR_IOCTL_MAX_MSGS:
+                self._transfer(count)
+                count = 0
+            count = self._add(count, address, buffer_out, False)
+            if buffer_in is not None:
+                count = self._add(count, address, buffer_in, True)
+        if count:
+            self._transfer(count)
@@ -0,0 +1,267 @@
+"""
+`register_cache`
+================================================================================
+
+Register cache for drivers built on :class:`adafruit_bus_device.i2c_device.I2CDevice`.
+
+:class:`CachedI2CDevice` wraps an ``I2CDevice`` and follows the usual register
+protocol: the first written byte selects a register, the rest of the write or
+the following read is its content. Registers declared non-volatile, i.e.
+configuration the chip never changes on its own, are answered from the cache
+once they were read or written, and writes that would not change them are
+dropped. Inside :meth:`CachedI2CDevice.deferred` writes to them are collected
+and sent once per register when the block ends. Everything else, results and
+status registers, goes to the bus unchanged.
+
+A register is cached as the bytes last transferred at its address, so declare
+multi-byte registers by the address they are always accessed at.
+"""
+
+from contextlib import contextmanager
+
+try:
+    from typing import Iterable, Iterator, Optional, Tuple
+    from circuitpython_typing import ReadableBuffer, WriteableBuffer
+    from adafruit_bus_device.i2c_device import I2CDevice
+except ImportError:
+    pass
+
+
+class CachedI2CDevice:
+    """``I2CDevice`` with a cache of its non-volatile registers.
+
+    :param I2CDevice device: the device to wrap
+    :param non_volatile: addresses of the registers that may be cached
+    :param int bank_register: register selecting a bank of registers, only bank 0 is cached
+
+    ``hits`` counts the transfers answered or dropped without using the bus,
+    ``misses`` the transfers of cached registers that had to use it and
+    ``bypassed`` the transfers of all other registers.
+    """
+
+    def __init__(
+        self,
+        device: "I2CDevice",
+        non_volatile: "Iterable[int]",
+        *,
+        bank_register: "Optional[int]" = None,
+    ) -> None:
+        self.device = device
+        self._non_volatile = frozenset(non_volatile)
+        self._bank_register = bank_register
+        self._bank = 0
+        self._values = {}
+        # writes collected by deferred(), in the order of the first write to each register
+        self._dirty = {}
+        self._deferring = 0
+        # register selected by a write without data, only sent when a read needs it
+        self._pointer = None
+        self._select = bytearray(1)
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def device_address(self) -> int:
+        """Address of the wrapped device"""
+        return self.device.device_address
+
+    @property
+    def i2c(self):
+        """Bus of the wrapped device"""
+        return self.device.i2c
+
+    def __enter__(self) -> "CachedI2CDevice":
+        self.device.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, traceback) -> bool:
+        try:
+            self._send_pointer()
+        finally:
+            self.device.__exit__(exc_type, exc_val, traceback)
+        return False
+
+    def _cacheable(self, register: int) -> bool:
+        return self._bank == 0 and register in self._non_volatile
+
+    def _send_pointer(self) -> None:
+        if self._pointer is not None:
+            self._select[0] = self._pointer
+            self._pointer = None
+            self.bypassed += 1
+            self.device.write(self._select)
+
+    def _send(self, register: int, data: bytes) -> None:
+        self.device.write(bytes((register,)) + data)
+
+    def _overwritten(self, register: int, length: int) -> None:
+        # drop the other cached values a write of `length` bytes at `register` reaches
+        # into on an auto-incrementing chip
+        for address in range(max(0, register - 3), register + length):
+            cached = self._values.get(address)
+            if address != register and cached is not None and address + len(cached) > register:
+                del self._values[address]
+
+    def _send_dirty(self, register: int) -> None:
+        # a read longer than the pending value has to see it on the chip
+        data = self._dirty.pop(register, None)
+        if data is not None:
+            self._send(register, data)
+
+    def _lookup(self, register: int, buf: "WriteableBuffer", start: int, end: int) -> bool:
+        cached = self._values.get(register)
+        if cached is None or len(cached) < end - start:
+            self.misses += 1
+            return False
+        buf[start:end] = cached[: end - start]
+        self.hits += 1
+        return True
+
+    def _store(self, register: int, data: bytes) -> None:
+        if self._values.get(register) == data:
+            self.hits += 1
+            return
+        self._values[register] = data
+        if not self._deferring:
+            self.misses += 1
+            self._send(register, data)
+        elif register in self._dirty:
+            self.hits += 1
+            self._dirty[register] = data
+        else:
+            self.misses += 1
+            self._dirty[register] = data
+
+    def readinto(self, buf: "WriteableBuffer", *, start: int = 0, end: "Optional[int]" = None) -> None:
+        """Read into ``buf`` from the register selected by the last write"""
+        if end is None:
+            end = len(buf)
+        register = self._pointer
+        if register is not None and self._cacheable(register):
+            self._pointer = None
+            if self._lookup(register, buf, start, end):
+                return
+            self._send_dirty(register)
+            self._select[0] = register
+            self.device.write(self._select)
+            self.device.readinto(buf, start=start, end=end)
+            self._values[register] = bytes(buf[start:end])
+            return
+        self._send_pointer()
+        self.bypassed += 1
+        self.device.readinto(buf, start=start, end=end)
+
+    def write(self, buf: "ReadableBuffer", *, start: int = 0, end: "Optional[int]" = None) -> None:
+        """Write ``buf``, a register address followed by its content"""
+        if end is None:
+            end = len(buf)
+        self._send_pointer()
+        if end - start == 1:
+            self._pointer = buf[start]
+            return
+        register = buf[start]
+        if register == self._bank_register:
+            self._bank = buf[start + 1]
+        elif self._bank == 0:
+            self._overwritten(register, end - start - 1)
+        if not self._cacheable(register):
+            self.bypassed += 1
+            self.device.write(buf, start=start, end=end)
+            return
+        self._store(register, bytes(buf[start + 1 : end]))
+
+    def write_then_readinto(
+        self,
+        out_buffer: "ReadableBuffer",
+        in_buffer: "WriteableBuffer",
+        *,
+        out_start: int = 0,
+        out_end: "Optional[int]" = None,
+        in_start: int = 0,
+        in_end: "Optional[int]" = None,
+    ) -> None:
+        """Select the register in ``out_buffer`` and read it into ``in_buffer``"""
+        if out_end is None:
+            out_end = len(out_buffer)
+        if in_end is None:
+            in_end = len(in_buffer)
+        self._send_pointer()
+        register = out_buffer[out_start] if out_end - out_start == 1 else None
+        if register is not None and self._cacheable(register):
+            if self._lookup(register, in_buffer, in_start, in_end):
+                return
+            self._send_dirty(register)
+        else:
+            register = None
+            self.bypassed += 1
+        self.device.write_then_readinto(
+            out_buffer,
+            in_buffer,
+            out_start=out_start,
+            out_end=out_end,
+            in_start=in_start,
+            in_end=in_end,
+        )
+        if register is not None:
+            self._values[register] = bytes(in_buffer[in_start:in_end])
+
+    def write_registers(self, pairs: "Iterable[Tuple[int, int]]") -> None:
+        """Write a sequence of ``(register, value)`` byte pairs in order. Unchanged cached
+        registers are skipped and a bus with ``transfer_many`` sends the rest at once."""
+        transfers = []
+        for register, value in pairs:
+            if register == self._bank_register:
+                self._bank = value
+                self.bypassed += 1
+                transfers.append((bytes((register, value)), None))
+                continue
+            if self._bank == 0:
+                self._overwritten(register, 1)
+            if self._cacheable(register):
+                data = bytes((value,))
+                if self._values.get(register) == data:
+                    self.hits += 1
+                    continue
+                self._values[register] = data
+                self.misses += 1
+            else:
+                self.bypassed += 1
+            transfers.append((bytes((register, value)), None))
+
+        with self.device:
+            transfer_many = getattr(self.device.i2c, "transfer_many", None)
+            if transfer_many is not None:
+                transfer_many(self.device.device_address, transfers)
+                return
+            for buffer_out, _ in transfers:
+                self.device.write(buffer_out)
+
+    @contextmanager
+    def deferred(self) -> "Iterator[CachedI2CDevice]":
+        """Collect the writes to cached registers and send them when the block ends.
+
+        Writes to other registers are still sent right away, so the block must not
+        depend on their order. Must not be entered while holding the device."""
+        self._deferring += 1
+        try:
+            yield self
+        finally:
+            self._deferring -= 1
+            if not self._deferring:
+                self.flush()
+
+    def flush(self) -> None:
+        """Send the writes collected by :meth:`deferred`"""
+        dirty, self._dirty = self._dirty, {}
+        if dirty:
+            with self.device:
+                for register, data in dirty.items():
+                    self._send(register, data)
+
+    def invalidate(self, register: "Optional[int]" = None) -> None:
+        """Forget the cached value of ``register``, or of every register after a reset"""
+        if register is None:
+            self._values.clear()
+        else:
+            self._values.pop(register, None)
@@ -0,0 +1,164 @@
+"""
+High rate power capture with the INA219.
+
+A background thread reads every conversion of the INA219 into a preallocated
+ring buffer. The node takes the samples gathered since its last call as a
+window and publishes only their minimum, maximum, mean and RMS, computed with
+NumPy over the whole window at once. A current above a trigger level
+additionally keeps the raw samples around it as a burst.
+"""
+
+import collections
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from drivers.timestamping import monotonic_raw
+
+# columns of the ring buffer
+TIME, BUS_VOLTAGE, SHUNT_VOLTAGE, CURRENT, POWER = range(5)
+
+# min, max, mean and rms of every quantity in a window
+Window = collections.namedtuple(
+    "Window", ["start", "end", "samples", "bus_voltage", "shunt_voltage", "current", "power", "charge"]
+)
+
+# raw samples around a trigger, rows as in the ring buffer
+Burst = collections.namedtuple("Burst", ["time", "samples"])
+
+
+class PowerCapture:
+    """Reads an INA219 as fast as it converts into a ring buffer.
+
+    Configure the conversion time of `ina219` before, a single 12 bit sample per
+    ADC gives a new result about every millisecond.
+
+    :param INA219 ina219: the sensor to read
+    :param int size: samples kept in the ring buffer
+    :param float trigger: current in mA that starts a burst, None for no bursts
+    :param int pre: samples of a burst before the trigger
+    :param int post: samples of a burst from the trigger on
+    """
+
+    def __init__(self, ina219, size: int = 16384, trigger: float = None, pre: int = 128, post: int = 384):
+        if pre + post > size:
+            raise ValueError("a burst must fit into the ring buffer")
+        self.ina219 = ina219
+        self.size = size
+        self.trigger = trigger
+        self.pre = pre
+        self.post = post
+        self.count = 0  # samples written
+        self.dropped = 0  # samples overwritten before a window took them
+        self.missed = 0  # reads without a new conversion
+
+        self._ring = np.zeros((size, 5))
+        self._read = 0
+        self._last = None  # last sample of the previous window, to integrate across windows
+        self._triggered = None  # index of the sample that started the pending burst
+        self._armed = True
+        self._bursts = collections.deque(maxlen=8)
+        self._lock = threading.Lock()
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ina219_capture", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        ina219 = self.ina219
+        ring = self._ring
+        # results are averaged over the last conversion, which itself finished on
+        # average half a conversion before the read started
+        compensation = ina219.conversion_time
+        while not self._stop.is_set():
+            try:
+                start = monotonic_raw()
+                sample = ina219.read_sample()
+            except Exception as e:  # pylint: disable=broad-except
+                self._error = e
+                return
+            if sample is None:
+                self.missed += 1
+                continue
+
+            with self._lock:
+                ring[self.count % self.size] = (
+                    start - compensation,
+                    sample.bus_voltage,
+                    sample.shunt_voltage,
+                    sample.current,
+                    sample.power,
+                )
+                self.count += 1
+
+            if self.trigger is None:
+                continue
+            if sample.current < self.trigger:
+                self._armed = True
+            elif self._armed and self._triggered is None:
+                # a burst per crossing, not one after another while the current stays high
+                self._armed = False
+                self._triggered = self.count - 1
+            if self._triggered is not None and self.count - self._triggered >= self.post:
+                self._keep_burst()
+
+    def _keep_burst(self) -> None:
+        # only this thread writes, so the burst can be copied without the lock
+        first = max(self._triggered - self.pre, self.count - self.size)
+        samples = self._ring[np.arange(first, self.count) % self.size]
+        self._bursts.append(Burst(time=self._ring[self._triggered % self.size, TIME], samples=samples))
+        self._triggered = None
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def window(self) -> "Optional[Window]":
+        """Statistics of the samples since the last call, None if there were none.
+        Raises the error that stopped the capture."""
+        self._check()
+        with self._lock:
+            end = self.count
+            start = max(self._read, end - self.size)
+            rows = self._ring[np.arange(start, end) % self.size]
+        self.dropped += start - self._read
+        self._read = end
+        if not len(rows):
+            return None
+
+        values = rows[:, BUS_VOLTAGE:]
+        stats = np.stack(
+            (values.min(axis=0), values.max(axis=0), values.mean(axis=0), np.sqrt((values ** 2).mean(axis=0))),
+            axis=1,
+        )
+        # charge in mAh drawn since the last sample of the previous window, trapezoid rule
+        integrated = rows if self._last is None else np.vstack((self._last, rows))
+        current = integrated[:, CURRENT]
+        charge = np.sum((current[1:] + current[:-1]) * np.diff(integrated[:, TIME])) / 2 / 3600
+        self._last = rows[-1]
+
+        return Window(
+            start=integrated[0, TIME],
+            end=rows[-1, TIME],
+            samples=len(rows),
+            bus_voltage=stats[0],
+            shunt_voltage=stats[1],
+            current=stats[2],
+            power=stats[3],
+            charge=charge,
+        )
+
+    def bursts(self) -> "List[Burst]":
+        """Bursts completed since the last call"""
+        self._check()
+        bursts = []
+        while self._bursts:
+            bursts.append(self._bursts.popleft())
+        return bursts
+
+    def close(self) -> None:
+        """Stop reading the sensor"""
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
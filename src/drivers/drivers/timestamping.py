@@ -0,0 +1,119 @@
+"""
+Timestamping for sensor reads.
+
+Sensor reads are timed with CLOCK_MONOTONIC_RAW, which is not slewed by NTP,
+and the times are mapped to the node's ROS clock afterwards. This keeps bus
+latency and executor delay out of the published stamps.
+"""
+
+import time
+
+from rclpy.time import Time
+from std_msgs.msg import Float64
+
+_NS = 1_000_000_000
+
+
+def monotonic_raw() -> float:
+    """Current CLOCK_MONOTONIC_RAW time in seconds"""
+    return time.clock_gettime_ns(time.CLOCK_MONOTONIC_RAW) / _NS
+
+
+class ClockMapper:
+    """Maps CLOCK_MONOTONIC_RAW times to the ROS clock of a node.
+
+    The offset between both clocks is measured by reading the ROS clock between two
+    raw reads and keeping the tightest bracket. It is measured again every
+    `resync_period` seconds to follow the drift of the system clock.
+    """
+
+    def __init__(self, clock, resync_period: float = 1.0, samples: int = 5):
+        self._clock = clock
+        self._resync_period = resync_period
+        self._samples = samples
+        self._offset_ns = 0
+        self._synced_at = None
+
+    def sync(self) -> None:
+        """Measure the offset between the ROS clock and the raw monotonic clock"""
+        best_width = None
+        for _ in range(self._samples):
+            before = time.clock_gettime_ns(time.CLOCK_MONOTONIC_RAW)
+            ros_ns = self._clock.now().nanoseconds
+            after = time.clock_gettime_ns(time.CLOCK_MONOTONIC_RAW)
+            width = after - before
+            if best_width is None or width < best_width:
+                best_width = width
+                self._offset_ns = ros_ns - (before + width // 2)
+        self._synced_at = after / _NS
+
+    def to_ros(self, raw_time: float) -> Time:
+        """Convert a raw monotonic time in seconds to a ROS time"""
+        if self._synced_at is None or monotonic_raw() - self._synced_at > self._resync_period:
+            self.sync()
+        return Time(nanoseconds=int(raw_time * _NS) + self._offset_ns, clock_type=self._clock.clock_type)
+
+
+class ReadStamper:
+    """Times a sensor transaction and derives the sample time from it.
+
+    Use as a context manager around the bus read. The sample time is placed at
+    `fraction` of the transaction (0 is the start, 1 the end) minus a fixed
+    `compensation` in seconds for delays known to happen before the read, such as
+    the sensor's own conversion time.
+
+    :param ClockMapper mapper: mapper used to convert the sample time to ROS time
+    :param float fraction: position of the sample inside the transaction
+    :param float compensation: seconds subtracted from the sample time
+    :param float alpha: smoothing factor of the mean latency
+    """
+
+    def __init__(self, mapper: ClockMapper, fraction: float = 0.0, compensation: float = 0.0, alpha: float = 0.05):
+        self.mapper = mapper
+        self.fraction = fraction
+        self.compensation = compensation
+        self._alpha = alpha
+        self.start = 0.0
+        self.end = 0.0
+        self.latency = 0.0
+        self.latency_mean = None
+        self.latency_max = 0.0
+
+    def __enter__(self) -> "ReadStamper":
+        self.start = monotonic_raw()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.end = monotonic_raw()
+        if exc_type is not None:
+            return
+        self.latency = self.end - self.start
+        if self.latency_mean is None:
+            self.latency_mean = self.latency
+        else:
+            self.latency_mean += self._alpha * (self.latency - self.latency_mean)
+        self.latency_max = max(self.latency_max, self.latency)
+
+    @property
+    def sample_time(self) -> float:
+        """Raw monotonic time of the last sample in seconds"""
+        return self.start + self.fraction * (self.end - self.start) - self.compensation
+
+    def stamp(self, raw_time: float = None):
+        """ROS stamp message for `raw_time`, or for the last sample if not given"""
+        if raw_time is None:
+            raw_time = self.sample_time
+        return self.mapper.to_ros(raw_time).to_msg()
+
+
+def create_latency_publisher(node, topic: str, stamper: ReadStamper, period: float = 1.0):
+    """Publish the mean read latency of `stamper` (in seconds) on `topic` every
+    `period` seconds. Returns the timer driving the publisher."""
+    publisher = node.create_publisher(Float64, topic, 10)
+
+    def publish_latency():
+        if stamper.latency_mean is None:
+            return
+        publisher.publish(Float64(data=stamper.latency_mean))
+
+    return node.create_timer(period, publish_latency)
@@ -1,20 +1,46 @@
 #!/usr/bin/env python3
+import math
+import os
 import rclpy
 from rclpy.node import Node
-import yaml
+from rclpy.qos import DurabilityPolicy, QoSProfile
 # from sensor_msgs.msg import Imu
 from custom_msgs.msg import Imu
-import board
+from std_msgs.msg import UInt8
 from drivers.libs.i2c import I2C
 from drivers.libs.adafruit_bno08x import (
     BNO_REPORT_ACCELEROMETER,
+    BNO_REPORT_GAME_ROTATION_VECTOR,
+    BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR,
     BNO_REPORT_GYROSCOPE,
     BNO_REPORT_MAGNETOMETER,
     BNO_REPORT_ROTATION_VECTOR,
+    REPORT_ACCURACY_STATUS,
 )
 from drivers.libs.adafruit_bno08x.i2c import BNO08X_I2C
-from time import sleep
-import cv2
+from drivers.bringup import BringUp
+from drivers.config import node_config
+from drivers.imu_calibration import DcdManager
+from drivers.timestamping import ClockMapper, ReadStamper, create_latency_publisher
+
+# on-chip fused orientations:
+# game: gyro and accelerometer, heading drifts slowly but never jumps
+# rotation: gyro, accelerometer and magnetometer
+# geomagnetic: accelerometer and magnetometer only, for a low power budget
+ORIENTATION_REPORTS = {
+    "game": BNO_REPORT_GAME_ROTATION_VECTOR,
+    "rotation": BNO_REPORT_ROTATION_VECTOR,
+    "geomagnetic": BNO_REPORT_GEOMAGNETIC_ROTATION_VECTOR,
+}
+# names of the reports in the rates of the config
+RATE_NAMES = {
+    "gyroscope": BNO_REPORT_GYROSCOPE,
+    "accelerometer": BNO_REPORT_ACCELEROMETER,
+    "magnetometer": BNO_REPORT_MAGNETOMETER,
+}
+# standard deviation in radians of each axis by the status accuracy of the report,
+# the BNO08X datasheet gives 2 to 3.5 degrees for a calibrated sensor
+ORIENTATION_STDDEV = (math.pi, math.radians(20), math.radians(6), math.radians(3.5))
 
 class BnoPublisher(Node):
 
@@ -24,75 +50,151 @@ class BnoPublisher(Node):
         self.logger.info('Initializing imu sensor node...')
 
         # load config
-        fs = cv2.FileStorage("/home/user/ws/src/config/config.yaml", cv2.FileStorage_READ)
-        imu_config = fs.getNode("sensors").getNode("imu")
-        topic = imu_config.getNode("topic").string()
-        sample_rate = int(imu_config.getNode("sample_rate").real())
-        i2c_bus = int(imu_config.getNode("bus").real())
-        fs.release()
-
-        # sensor initialization
-        self.bno = None
-        timeout = 5
-        while self.bno is None:
-            self.logger.info('Initializing sensor BNO008x...')
-            try:
-                i2c = I2C(i2c_bus, 400000)
-                self.bno = BNO08X_I2C(i2c, address=0x4b)  # BNO080 (0x4b) BNO085 (0x4a)
-                self.bno.initialize()
-                self.bno.enable_feature(BNO_REPORT_ACCELEROMETER)
-                self.bno.enable_feature(BNO_REPORT_GYROSCOPE)
-                self.bno.enable_feature(BNO_REPORT_ROTATION_VECTOR)
-                self.bno.enable_feature(BNO_REPORT_MAGNETOMETER)
-            except Exception as e:
-                self.bno = None
-                self.logger.error(f"Failed to initialize BNO008x: {e}")
-                self.logger.error(f"Retrying in {timeout} seconds...")
-                sleep(timeout)
-                timeout *= 2
-        sleep(0.5)  # ensure IMU is initialized
+        imu_config = node_config(self, "sensors", "imu")
+        topic = imu_config.topic
+        sample_rate = float(imu_config.sample_rate)
+        self.i2c_bus = int(imu_config.bus)
+        calibration_dir = os.path.expanduser(imu_config.get("calibration_dir", "~/.cache/bedman"))
+        self.dcd_file = os.path.join(calibration_dir, f"bno08x_bus{self.i2c_bus}.json")
+        self.dcd = None
+        orientation = str(imu_config.get("orientation", "none")).lower()
+        if orientation != "none" and orientation not in ORIENTATION_REPORTS:
+            self.logger.error(f"Unsupported orientation: {orientation}, publishing none")
+        self.orientation_report = ORIENTATION_REPORTS.get(orientation)
+
+        # every report comes at its own rate, the others at sample_rate
+        rates = imu_config.get("rates", {})
+        self.reports = [BNO_REPORT_GYROSCOPE, BNO_REPORT_ACCELEROMETER, BNO_REPORT_MAGNETOMETER]
+        if self.orientation_report is not None:
+            self.reports.append(self.orientation_report)
+        report_rates = {report: sample_rate for report in self.reports}
+        for name, rate in rates.items():
+            report = self.orientation_report if name == "orientation" else RATE_NAMES.get(name)
+            if report is None:
+                self.logger.warning(f"Ignoring the rate of unknown report {name}")
+                continue
+            report_rates[report] = float(rate)
+        self.intervals = {report: int(1e6 / rate) for report, rate in report_rates.items()}
+        # sensor time of the last published reading of each report
+        self.published = {}
+
+        # sensor initialization, runs in the background
+        self.bringup = BringUp(self)
+        self.i2c = None
+        self.bno = self.bringup.add("BNO008x", self.init_bno)
+
+        # stamps come from the sensor's own timebase, see BNO08X.report_timestamp
+        self.stamper = ReadStamper(ClockMapper(self.get_clock()))
 
         # init publishers
         self.imu_pub = self.create_publisher(Imu, topic, 10)
-        self.timer = self.create_timer(1/sample_rate, self.timer_callback)
+        # a message per new gyroscope or accelerometer reading, slower ones are filled in when new
+        self.timer = self.create_timer(1/max(report_rates.values()), self.timer_callback)
+        self.latency_timer = create_latency_publisher(self, topic + "/read_latency", self.stamper)
+        # late subscribers, like a restarted tracker, get the last status right away
+        self.calibration_pub = self.create_publisher(
+            UInt8, topic + "/calibration", QoSProfile(depth=1, durability=DurabilityPolicy.TRANSIENT_LOCAL)
+        )
+        self.calibration_timer = self.create_timer(1.0, self.calibration_callback)
 
         self.logger.info('Imu node launched.')
 
+    def init_bno(self):
+        # a retry opens a new bus, the one of the previous attempt is closed
+        if self.i2c is not None:
+            self.i2c.deinit()
+        self.i2c = I2C(self.i2c_bus, 400000)
+        # the constructor already resets the sensor, which loads the DCD from its flash
+        bno = BNO08X_I2C(self.i2c, address=0x4b)  # BNO080 (0x4b) BNO085 (0x4a)
+        bno.enable_features(self.reports, self.intervals)
+        self.published = {}
+        self.dcd = DcdManager(bno, self.dcd_file)
+        return bno
+
+    def calibration_callback(self):
+        bno = self.bno.value
+        if bno is None:
+            return
+
+        try:
+            saved = self.dcd.update()
+        except Exception as e:
+            self.bno.fail(e)
+            return
+        if saved:
+            self.logger.info(f"BNO08x calibration saved ({REPORT_ACCURACY_STATUS[self.dcd.accuracy]})")
+
+        self.calibration_pub.publish(UInt8(data=self.dcd.accuracy))
 
     def timer_callback(self):
+        bno = self.bno.value
+        if bno is None:
+            return
         self.logger.info("Publishing IMU data...", once=True)
 
+        try:
+            with self.stamper:
+                bno.update()
+        except Exception as e:
+            self.bno.fail(e)
+            return
+
+        # a message per new gyroscope or accelerometer reading, the slower reports are
+        # only filled in when they changed since the last message
+        fresh = {}
+        for report in self.reports:
+            report_time = bno.report_timestamp(report)
+            if report_time is not None and report_time != self.published.get(report):
+                fresh[report] = bno.reading(report)
+                self.published[report] = report_time
+        if BNO_REPORT_GYROSCOPE not in fresh and BNO_REPORT_ACCELEROMETER not in fresh:
+            return
+
         imu_msg = Imu()
-        imu_msg.header.stamp = self.get_clock().now().to_msg()
+        stamp_report = BNO_REPORT_GYROSCOPE if BNO_REPORT_GYROSCOPE in fresh else BNO_REPORT_ACCELEROMETER
+        imu_msg.header.stamp = self.stamper.stamp(bno.report_timestamp(stamp_report))
         imu_msg.header.frame_id = "imu"
 
-        # quat_i, quat_j, quat_k, quat_real = self.bno.quaternion
-        # imu_msg.orientation.x = quat_i
-        # imu_msg.orientation.y = quat_j
-        # imu_msg.orientation.z = quat_k
-        # imu_msg.orientation.w = quat_real
-        # imu_msg.orientation_covariance[0] = -1
-
-        gyro_x, gyro_y, gyro_z = self.bno.gyro
-        imu_msg.angular_velocity.x = gyro_x
-        imu_msg.angular_velocity.y = gyro_y
-        imu_msg.angular_velocity.z = gyro_z
-        imu_msg.angular_velocity_covariance[0] = -1
-
-        accel_x, accel_y, accel_z = self.bno.acceleration
-        imu_msg.linear_acceleration.x = accel_x
-        imu_msg.linear_acceleration.y = accel_y
-        imu_msg.linear_acceleration.z = accel_z
-        imu_msg.linear_acceleration_covariance[0] = -1
-
-        mag_x, mag_y, mag_z = self.bno.magnetic
-        imu_msg.magnetic_field.x = mag_x
-        imu_msg.magnetic_field.y = mag_y
-        imu_msg.magnetic_field.z = mag_z
-        imu_msg.magnetic_field_covariance[0] = -1
-        
+        # covariance[0] is -1 for a missing reading, all zeros (unknown) otherwise. Consumers
+        # like VINS read gyroscope and accelerometer without looking at it, so those always
+        # carry their latest reading
+        self.fill_orientation(imu_msg, bno, fresh.get(self.orientation_report))
+        self.fill_vector(imu_msg.angular_velocity, imu_msg.angular_velocity_covariance, self.latest(bno, BNO_REPORT_GYROSCOPE))
+        self.fill_vector(imu_msg.linear_acceleration, imu_msg.linear_acceleration_covariance, self.latest(bno, BNO_REPORT_ACCELEROMETER))
+        self.fill_vector(imu_msg.magnetic_field, imu_msg.magnetic_field_covariance, fresh.get(BNO_REPORT_MAGNETOMETER))
+
         self.imu_pub.publish(imu_msg)
 
+    def latest(self, bno, report):
+        # last reading of `report` of this sensor, None before its first report
+        return bno.reading(report) if report in self.published else None
+
+    @staticmethod
+    def fill_vector(vector, covariance, reading):
+        if reading is None:
+            covariance[0] = -1
+            return
+        vector.x, vector.y, vector.z = reading
+
+    def fill_orientation(self, imu_msg, bno, quaternion):
+        # the reading is all zeros until the first report after enabling it
+        if quaternion is None or not any(quaternion):
+            imu_msg.orientation_covariance[0] = -1
+            return
+
+        quat_i, quat_j, quat_k, quat_real = quaternion
+        imu_msg.orientation.x = quat_i
+        imu_msg.orientation.y = quat_j
+        imu_msg.orientation.z = quat_k
+        imu_msg.orientation.w = quat_real
+
+        # roll, pitch and yaw variances, the rotation vectors also estimate their heading error
+        stddev = ORIENTATION_STDDEV[bno.report_accuracy(self.orientation_report) or 0]
+        heading = bno.heading_accuracy(self.orientation_report)
+        imu_msg.orientation_covariance[0] = stddev ** 2
+        imu_msg.orientation_covariance[4] = stddev ** 2
+        imu_msg.orientation_covariance[8] = heading ** 2 if heading else stddev ** 2
+
 
 if __name__ == '__main__':
     rclpy.init(args=None)
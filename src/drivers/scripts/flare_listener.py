@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import rclpy
 from rclpy.node import Node
-import cv2 
+from drivers.config import node_config
 
 from std_msgs.msg import Bool
 
@@ -14,11 +14,9 @@ class FlareListener(Node):
         self.get_logger().info('Starting LED listener...')
 
         # Parse parameters
-        fs = cv2.FileStorage("/home/user/ws/src/config/config.yaml", cv2.FileStorage_READ)
-        flare_config = fs.getNode("actuators").getNode("flare")
-        self.topic = flare_config.getNode("topic").string()
-        self.pin = int(flare_config.getNode("pin").real())
-        fs.release()
+        flare_config = node_config(self, "actuators", "flare")
+        self.topic = flare_config.topic
+        self.pin = int(flare_config.pin)
 
         # Start jetson GPIO
         GPIO.setmode(GPIO.BCM)
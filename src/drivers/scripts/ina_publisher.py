@@ -3,49 +3,65 @@ import rclpy
 from rclpy.node import Node
 
 from sensor_msgs.msg import BatteryState
+from std_msgs.msg import Float64
+from custom_msgs.msg import PowerBurst, PowerSummary
 
-from time import sleep
 from drivers.libs.adafruit_ina219 import INA219
 from drivers.libs.i2c import I2C
-import cv2
+from drivers.battery import OCV_TABLES, SocEstimator
+from drivers.bringup import BringUp
+from drivers.config import node_config
+from drivers.power_capture import BUS_VOLTAGE, CURRENT, POWER, TIME, PowerCapture
+from drivers.timestamping import ClockMapper, ReadStamper, create_latency_publisher
 from functools import partial
 
+MEAN = 2  # index of the mean in the statistics of a capture window
+
 class BatteryPublisher(Node):
 
     class Battery:
-        def __init__(self, logger, battery_type, cells, capacity, i2c_bus):
+        def __init__(self, logger, bringup, battery_type, cells, capacity, i2c_bus, averaging, capture=None):
             self.battery_type = battery_type
             self.logger = logger
 
-            if battery_type == "LIPO":
-                self.cell_voltage = (3.8, 4.2)
-            elif battery_type == "LIHV":
-                self.cell_voltage = (3.8, 4.35)
-            else: 
+            if battery_type not in OCV_TABLES:
                 self.logger.error(f"Unsupported battery type: {battery_type}")
 
-            self.voltage = (self.cell_voltage[0] * cells, self.cell_voltage[1] * cells)
             self.cells = cells
             self.capacity = capacity
             self.i2c_bus = i2c_bus
-
-            self.delta_voltage = self.voltage[1] - self.voltage[0]
-
-            ina219 = None
-            timeout = 5
-            while ina219 is None:
-                self.logger.info('Initializing sensor INA219...')
-                try:
-                    i2c = I2C(self.i2c_bus, 5*1000)
-                    ina219 = INA219(i2c)
-                    ina219.set_calibration_16V_5A()
-                    self.sensor = ina219
-                except Exception as e:
-                    ina219 = None
-                    self.logger.error(f"Failed to initialize INA219 at bus {self.i2c_bus}: {e}")
-                    self.logger.error(f"Retrying in {timeout} seconds...")
-                    sleep(timeout)
-                    timeout *= 2
+            self.averaging = averaging
+            self.capture = capture
+            self.window = None  # latest window of the capture
+
+            # capacity is configured in mAh, the estimator works in A and Ah
+            self.estimator = SocEstimator(battery_type, cells, capacity / 1000)
+
+            self.i2c = None
+            # each sensor comes up on its own, a missing one does not hold back the others
+            self.sensor = bringup.add(f"INA219 at bus {self.i2c_bus}", self.init_sensor)
+
+        def init_sensor(self):
+            # a retry opens a new bus, the one of the previous attempt is closed
+            if self.i2c is not None:
+                self.i2c.deinit()
+            self.i2c = I2C(self.i2c_bus)
+            ina219 = INA219(self.i2c)
+            ina219.set_calibration_16V_5A()
+            if self.capture is None:
+                ina219.set_averaging(self.averaging)
+                return ina219
+
+            # a single conversion per result gives a new one about every millisecond
+            ina219.set_averaging(1)
+            pre, post = self.capture.get("burst", [128, 384])
+            return PowerCapture(
+                ina219,
+                size=int(self.capture.get("buffer", 16384)),
+                trigger=float(self.capture.get("trigger", 0)) or None,
+                pre=int(pre),
+                post=int(post),
+            )
 
     def __init__(self):
         super().__init__('ina_publisher')
@@ -53,27 +69,49 @@ class BatteryPublisher(Node):
         self.logger.info('Initializing battery sensor node...')
 
         # load config
-        fs = cv2.FileStorage("/home/user/ws/src/config/config.yaml", cv2.FileStorage_READ)
-        battery_config = fs.getNode("sensors").getNode("battery")
-        sample_rate = int(battery_config.getNode("sample_rate").real())
-        sensors_num = battery_config.getNode("topic").size()
+        battery_config = node_config(self, "sensors", "battery")
+        sample_rate = float(battery_config.sample_rate)
+        averaging = int(battery_config.get("averaging", 1))
+        sensors_num = len(battery_config.topic)
         self.sensors_num = sensors_num
-        topics = [battery_config.getNode("topic").at(i).string() for i in range(sensors_num)]
-        battery_types = [battery_config.getNode("type").at(i).string() for i in range(sensors_num)]
-        cells = [int(battery_config.getNode("cells").at(i).real()) for i in range(sensors_num)]
-        capacities = [battery_config.getNode("capacity").at(i).real() for i in range(sensors_num)]
-        i2c_buses = [int(battery_config.getNode("bus").at(i).real()) for i in range(sensors_num)]
-        fs.release()
-
-        # init battery sensors
-        self.batteries = [self.Battery(self.logger, battery_types[i], cells[i], capacities[i], i2c_buses[i]) for i in range(sensors_num)]
+        topics = list(battery_config.topic)
+        battery_types = list(battery_config.type)
+        cells = [int(c) for c in battery_config.cells]
+        capacities = [float(c) for c in battery_config.capacity]
+        i2c_buses = [int(b) for b in battery_config.bus]
+        capture_config = battery_config.get("capture")
+        captured = [int(i) for i in capture_config.get("batteries", [])] if capture_config else []
+
+        # init battery sensors, runs in the background
+        self.bringup = BringUp(self)
+        self.batteries = [
+            self.Battery(self.logger, self.bringup, battery_types[i], cells[i], capacities[i], i2c_buses[i], averaging,
+                         capture_config if i in captured else None)
+            for i in range(sensors_num)
+        ]
+
+        # the compensation is set from the sensor's conversion time once it is up
+        clock_mapper = ClockMapper(self.get_clock())
+        self.stampers = [ReadStamper(clock_mapper) for _ in range(sensors_num)]
 
         # init publishers
         self.bat_publishers = []
+        self.runtime_publishers = []
         self.bat_timers = []
         for i in range(sensors_num):
             self.bat_publishers.append(self.create_publisher(BatteryState, topics[i], 10))
-            
+            self.runtime_publishers.append(self.create_publisher(Float64, topics[i] + "/runtime", 10))
+            self.bat_timers.append(create_latency_publisher(self, topics[i] + "/read_latency", self.stampers[i]))
+
+        # captured sensors publish summaries of their samples instead of being read by the timer
+        self.power_publishers = {}
+        self.burst_publishers = {}
+        self.power_timers = []
+        for i in captured:
+            self.power_publishers[i] = self.create_publisher(PowerSummary, topics[i] + "/power", 10)
+            self.burst_publishers[i] = self.create_publisher(PowerBurst, topics[i] + "/power_burst", 10)
+            self.power_timers.append(self.create_timer(1/float(capture_config.get("rate", 10)), partial(self.power_callback, i)))
+
         self.bat_timer = self.create_timer(1/sample_rate, self.timer_callback)
 
         self.logger.info('Battery sensor node launched.')
@@ -83,35 +121,112 @@ class BatteryPublisher(Node):
 
         for idx in range(self.sensors_num):
             battery = self.batteries[idx]
-            
-            bus_voltage = battery.sensor.bus_voltage
-            # shunt_voltage = ina219.shunt_voltage
-            current = battery.sensor.current
-            # power = ina219.power
-            percentage = (bus_voltage - battery.voltage[0]) / battery.delta_voltage
-
-            msg = BatteryState()
-            msg.header.stamp = self.get_clock().now().to_msg()
-            msg.voltage = bus_voltage
-            msg.current = current
-            msg.charge = percentage * battery.capacity
-            msg.capacity = battery.capacity
-            msg.design_capacity = battery.capacity
-            msg.percentage = percentage
-
-            msg.power_supply_status = BatteryState.POWER_SUPPLY_STATUS_DISCHARGING
-            msg.power_supply_health = BatteryState.POWER_SUPPLY_HEALTH_GOOD
-            
-            if battery.battery_type == "LIPO":
-                msg.power_supply_technology = BatteryState.POWER_SUPPLY_TECHNOLOGY_LIPO
-            elif battery.battery_type == "LIHV":
-                msg.power_supply_technology = BatteryState.POWER_SUPPLY_TECHNOLOGY_LIPO
-            else:
-                msg.power_supply_technology = BatteryState.POWER_SUPPLY_TECHNOLOGY_UNKNOWN
-
-            msg.present = True
-
-            self.bat_publishers[idx].publish(msg)
+            stamper = self.stampers[idx]
+            if battery.capture is not None:
+                # the charge is counted from the captured samples, only the state is published here
+                window = battery.window
+                if window is not None:
+                    self.publish_state(idx, window.bus_voltage[MEAN], window.current[MEAN], stamper.stamp(window.end))
+                continue
+
+            ina219 = battery.sensor.value
+            if ina219 is None:
+                continue
+
+            try:
+                with stamper:
+                    sample = ina219.read_sample()
+            except Exception as e:
+                battery.sensor.fail(e)
+                continue
+            if sample is None:
+                self.logger.warning(f"No new conversion from INA219 at bus {battery.i2c_bus}")
+                continue
+            if sample.overflow:
+                self.logger.warning(f"INA219 at bus {battery.i2c_bus} overflowed, recalibrated")
+
+            # results are averaged over the last conversion, which itself finished on
+            # average half a conversion before the read started
+            stamper.compensation = ina219.conversion_time
+            # the bus voltage is measured behind the shunt, the pack sees both drops
+            battery.estimator.update(sample.bus_voltage + sample.shunt_voltage, sample.current / 1000, stamper.sample_time)
+            self.publish_state(idx, sample.bus_voltage, sample.current, stamper.stamp())
+
+    def power_callback(self, idx):
+        self.logger.info("Publishing power summaries...", once=True)
+
+        battery = self.batteries[idx]
+        capture = battery.sensor.value
+        if capture is None:
+            return
+
+        try:
+            window = capture.window()
+            bursts = capture.bursts()
+        except Exception as e:
+            capture.close()
+            battery.sensor.fail(e)
+            return
+        if window is None:
+            return
+
+        stamper = self.stampers[idx]
+        battery.window = window
+        battery.estimator.update(
+            window.bus_voltage[MEAN] + window.shunt_voltage[MEAN],
+            window.current[MEAN] / 1000,
+            window.end,
+            charge=window.charge / 1000,
+        )
+
+        msg = PowerSummary()
+        msg.header.stamp = stamper.stamp(window.end)
+        msg.duration = window.end - window.start
+        msg.samples = window.samples
+        msg.dropped = capture.dropped
+        msg.bus_voltage = window.bus_voltage.tolist()
+        msg.shunt_voltage = window.shunt_voltage.tolist()
+        msg.current = window.current.tolist()
+        msg.power = window.power.tolist()
+        msg.charge = window.charge
+        self.power_publishers[idx].publish(msg)
+
+        for burst in bursts:
+            msg = PowerBurst()
+            msg.header.stamp = stamper.stamp(burst.time)
+            msg.time = (burst.samples[:, TIME] - burst.time).tolist()
+            msg.bus_voltage = burst.samples[:, BUS_VOLTAGE].tolist()
+            msg.current = burst.samples[:, CURRENT].tolist()
+            msg.power = burst.samples[:, POWER].tolist()
+            self.burst_publishers[idx].publish(msg)
+
+    def publish_state(self, idx, bus_voltage, current, stamp):
+        battery = self.batteries[idx]
+
+        msg = BatteryState()
+        msg.header.stamp = stamp
+        msg.voltage = bus_voltage
+        msg.current = current
+        msg.charge = battery.estimator.charge * 1000
+        msg.capacity = battery.capacity
+        msg.design_capacity = battery.capacity
+        msg.percentage = battery.estimator.soc
+
+        msg.power_supply_status = BatteryState.POWER_SUPPLY_STATUS_DISCHARGING
+        msg.power_supply_health = BatteryState.POWER_SUPPLY_HEALTH_GOOD
+
+        if battery.battery_type == "LIPO":
+            msg.power_supply_technology = BatteryState.POWER_SUPPLY_TECHNOLOGY_LIPO
+        elif battery.battery_type == "LIHV":
+            msg.power_supply_technology = BatteryState.POWER_SUPPLY_TECHNOLOGY_LIPO
+        else:
+            msg.power_supply_technology = BatteryState.POWER_SUPPLY_TECHNOLOGY_UNKNOWN
+
+        msg.present = True
+
+        self.bat_publishers[idx].publish(msg)
+        # seconds left at the average current of the last half minute
+        self.runtime_publishers[idx].publish(Float64(data=battery.estimator.runtime))
 
 if __name__ == "__main__":
     rclpy.init(args=None)
@@ -120,4 +235,4 @@ if __name__ == "__main__":
 
     rclpy.spin(battery_publisher)
     battery_publisher.destroy_node()
-    rclpy.shutdown()
\ No newline at end of file
+    rclpy.shutdown()
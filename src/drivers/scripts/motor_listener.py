@@ -6,7 +6,8 @@ from geometry_msgs.msg import Twist
 from std_msgs.msg import Bool
 
 from drivers.libs.adafruit_servokit import ServoKit
-import cv2
+from drivers.bringup import BringUp
+from drivers.config import node_config
 from time import sleep
 
 RAD_TO_DEG = 180 / 3.14159265358979323846
@@ -19,36 +20,21 @@ class MotorsListener(Node):
         self.logger.info('Initializing motor listener node...')
 
         # Load config
-        fs = cv2.FileStorage("/home/user/ws/src/config/config.yaml", cv2.FileStorage_READ)
-        motors_config = fs.getNode("actuators").getNode("motors")
-        topic = motors_config.getNode("topic").string()
-        brake_topic = motors_config.getNode("brake_topic").string()
-        self.use_brake = bool(motors_config.getNode("use_brake").real())
-        self.servo_channel = int(motors_config.getNode("servo_channel").real())
-        self.esc_channel = int(motors_config.getNode("esc_channel").real())
-        self.max_speed = int(motors_config.getNode("max_speed").real()) / 100
-        self.speed_step = motors_config.getNode("speed_step").real()
-        self.angle_step = int(motors_config.getNode("angle_step").real())
+        motors_config = node_config(self, "actuators", "motors")
+        topic = motors_config.topic
+        brake_topic = motors_config.brake_topic
+        self.use_brake = bool(motors_config.use_brake)
+        self.servo_channel = int(motors_config.servo_channel)
+        self.esc_channel = int(motors_config.esc_channel)
+        self.max_speed = int(motors_config.max_speed) / 100
+        self.speed_step = float(motors_config.speed_step)
+        self.angle_step = int(motors_config.angle_step)
         
         self.brake = False
-        fs.release()
-
-        # Init servo kit 
-        self.kit = None
-        timeout = 5
-        while self.kit is None:
-            self.logger.info('Initializing motors with PCA9685...')
-            try:
-                self.kit = ServoKit(channels=16)
-                self.kit.servo[self.servo_channel].angle = 90
-                self.kit.continuous_servo[self.esc_channel].throttle = 0
-            except Exception as e:
-                self.kit = None
-                self.logger.error(f"Failed to initialize motors: {e}")
-                self.logger.error(f"Retrying in {timeout} seconds...")
-                sleep(timeout)
-                timeout *= 2
-        sleep(0.5)  # ensure IMU is initialized
+
+        # Init servo kit, runs in the background
+        self.bringup = BringUp(self)
+        self.kit = self.bringup.add("PCA9685", self.init_kit)
 
         self.current_angle = 90
         self.target_angle = 90
@@ -62,6 +48,19 @@ class MotorsListener(Node):
 
         self.logger.info('Motor listener node launched.')
 
+    def init_kit(self):
+        kit = ServoKit(channels=16)
+        kit.servo[self.servo_channel].angle = 90
+        kit.continuous_servo[self.esc_channel].throttle = 0
+        return kit
+
+    def stop_motors(self):
+        kit = self.kit.value
+        if kit is None:
+            return
+        kit.continuous_servo[self.esc_channel].throttle = 0
+        kit.servo[self.servo_channel].angle = 90
+
     def motors_callback(self, msg: Twist):
         self.logger.info("Received motor data...", once=True)
 
@@ -82,8 +81,7 @@ class MotorsListener(Node):
 
         if msg.data:
             self.logger.info("Braking...")
-            self.kit.continuous_servo[self.esc_channel].throttle = 0
-            self.kit.servo[self.servo_channel].angle = 90
+            self.stop_motors()
             self.current_speed = 0
             self.current_angle = 90
 
@@ -99,27 +97,33 @@ class MotorsListener(Node):
 
         try: 
             while not self.brake and rclpy.ok():
+                kit = self.kit.value
+                if kit is None:
+                    # motors are not up yet, keep serving callbacks
+                    rclpy.spin_once(self, timeout_sec=0.05)
+                    continue
+
                 print("speed")
                 self.current_speed = self.make_simple_profile(self.target_speed, self.current_speed, self.speed_step)
-                self.kit.continuous_servo[self.esc_channel].throttle = self.current_speed 
-
                 print("angle")
                 self.current_angle = self.make_simple_profile(self.target_angle, self.current_angle, self.angle_step)
-                self.kit.servo[self.servo_channel].angle = min(self.current_angle + 15, 180)
+                try:
+                    kit.continuous_servo[self.esc_channel].throttle = self.current_speed 
+                    kit.servo[self.servo_channel].angle = min(self.current_angle + 15, 180)
+                except Exception as e:
+                    self.kit.fail(e)
                 
                 print(self.current_angle, self.current_speed)
 
                 sleep(0.001)
                 rclpy.spin_once(self, timeout_sec=0.05)
         except KeyboardInterrupt:
-            self.kit.servo[self.servo_channel].angle = 90
-            self.kit.continuous_servo[self.esc_channel].throttle = 0
+            self.stop_motors()
             print("Keyboard interrupt detected.")
             return
 
     def __del__(self):
-        self.kit.continuous_servo[self.esc_channel].throttle = 0
-        self.kit.servo[self.servo_channel].angle = 90
+        self.stop_motors()
 
 if __name__ == "__main__":
     rclpy.init(args=None)
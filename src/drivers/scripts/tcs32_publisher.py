@@ -3,10 +3,10 @@ import rclpy
 from rclpy.node import Node
 
 from std_msgs.msg import ColorRGBA
-from drivers.libs.gy_tcs3200 import TCS3200
-
-import cv2
-from time import sleep
+from drivers.libs.gy_tcs3200 import TCS3200, GpiodEdgeSource
+from drivers.bringup import BringUp
+from drivers.config import node_config
+from drivers.timestamping import ClockMapper, ReadStamper, create_latency_publisher
 
 class Tcs32Publisher(Node):
 
@@ -16,39 +16,53 @@ class Tcs32Publisher(Node):
         self.logger.info('Initializing color sensor node...')
 
         # load config
-        fs = cv2.FileStorage("/home/user/ws/src/config/config.yaml", cv2.FileStorage_READ)
-        color_config = fs.getNode("sensors").getNode("color")
-        topic = color_config.getNode("topic").string()
-        sample_rate = int(color_config.getNode("sample_rate").real())
-        pin_s2 = int(color_config.getNode("pins").getNode("s2").real())
-        pin_s3 = int(color_config.getNode("pins").getNode("s3").real())
-        pin_signal = int(color_config.getNode("pins").getNode("signal").real())
+        color_config = node_config(self, "sensors", "color")
+        topic = color_config.topic
+        sample_rate = int(color_config.sample_rate)
+        self.pins = color_config.pins
+        # line offsets on a GPIO chip select kernel timestamped edges over Jetson.GPIO
+        self.chip = color_config.get("chip")
+        self.lines = color_config.get("lines")
+
+        # sensor initialization, runs in the background
+        self.bringup = BringUp(self)
+        self.tcs = self.bringup.add("TCS3200", self.init_tcs)
 
-        # sensor initialization
-        self.tcs = None
-        timeout = 5
-        while self.tcs is None:
-            self.logger.info('Initializing sensor TCS3200...')
-            try:
-                self.tcs = TCS3200(pin_s2, pin_s3, pin_signal)
-            except Exception as e:
-                self.tcs = None
-                self.logger.error(f"Failed to initialize TCS3200: {e}")
-                self.logger.error(f"Retrying in {timeout} seconds...")
-                sleep(timeout)
-                timeout *= 2
+        # ColorRGBA has no header, the stamper only measures the read latency
+        self.stamper = ReadStamper(ClockMapper(self.get_clock()))
 
         # init publishers
         self.publisher = self.create_publisher(ColorRGBA, topic, 10)
         self.timer = self.create_timer(1/sample_rate, self.timer_callback)
+        self.latency_timer = create_latency_publisher(self, topic + "/read_latency", self.stamper)
 
         self.logger.info('Distance node launched.')
 
+    def init_tcs(self):
+        if self.lines is not None:
+            lines = self.lines
+            source = GpiodEdgeSource(int(lines.s2), int(lines.s3), int(lines.signal), chip=self.chip or "/dev/gpiochip0")
+            return TCS3200(source=source)
+        pins = self.pins
+        return TCS3200(int(pins.s2), int(pins.s3), int(pins.signal))
+
     def timer_callback(self):
+        tcs = self.tcs.value
+        if tcs is None:
+            return
         self.logger.info("Publishing color sensor data...", once=True)
 
-        rgb = self.tcs.read()
-        
+        # measurements run in the background, only publish new ones
+        try:
+            with self.stamper:
+                rgb = tcs.read(timeout=0)
+        except Exception as e:
+            tcs.close()
+            self.tcs.fail(e)
+            return
+        if rgb is None:
+            return
+
         msg = ColorRGBA()
         msg.r = (rgb[0])
         msg.g = (rgb[1])
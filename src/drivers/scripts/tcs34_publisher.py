@@ -5,9 +5,9 @@ from rclpy.node import Node
 from std_msgs.msg import ColorRGBA
 from drivers.libs.adafruit_tcs34725 import TCS34725
 from drivers.libs.i2c import I2C
-
-import cv2
-from time import sleep
+from drivers.bringup import BringUp
+from drivers.config import node_config
+from drivers.timestamping import ClockMapper, ReadStamper, create_latency_publisher
 
 class Tcs34Publisher(Node):
 
@@ -17,43 +17,53 @@ class Tcs34Publisher(Node):
         self.logger.info('Initializing color sensor node....')
 
         # load config
-        fs = cv2.FileStorage("/home/user/ws/src/config/config.yaml", cv2.FileStorage_READ)
-        color_config = fs.getNode("sensors").getNode("color")
-        topic = color_config.getNode("topic").string()
-        sample_rate = int(color_config.getNode("sample_rate").real())
-        i2c_bus = int(color_config.getNode("i2c_bus").real())
-        gain = int(color_config.getNode("gain").real())
-        integration_time = int(color_config.getNode("integration_time").real())
+        color_config = node_config(self, "sensors", "color")
+        topic = color_config.topic
+        sample_rate = int(color_config.sample_rate)
+        # the TCS3200 section has no TCS34725 settings, fall back to the sensor defaults
+        self.i2c_bus = int(color_config.get("i2c_bus", 1))
+        self.i2c_frequency = sample_rate*1000
+        self.gain = int(color_config.get("gain", 1))
+        self.integration_time = float(color_config.get("integration_time", 2.4))
+
+        # sensor initialization, runs in the background
+        self.bringup = BringUp(self)
+        self.i2c = None
+        self.tcs = self.bringup.add("TCS34725", self.init_tcs)
 
-        # sensor initialization
-        self.tcs = None
-        timeout = 5
-        while self.tcs is None:
-            self.logger.info('Initializing sensor TCS34725...')
-            try:
-                i2c = I2C(i2c_bus, sample_rate*1000)
-                self.tcs = TCS34725(i2c, address=0x29)
-                self.tcs.gain = gain
-                self.tcs.integration_time = integration_time
-            except Exception as e:
-                self.tcs = None
-                self.logger.error(f"Failed to initialize TCS34725: {e}")
-                self.logger.error(f"Retrying in {timeout} seconds...")
-                sleep(timeout)
-                timeout *= 2
+        # ColorRGBA has no header, the stamper only measures the read latency
+        self.stamper = ReadStamper(ClockMapper(self.get_clock()))
 
         # init publishers
         self.publisher = self.create_publisher(ColorRGBA, topic, 10)
         self.timer = self.create_timer(1/sample_rate, self.timer_callback)
+        self.latency_timer = create_latency_publisher(self, topic + "/read_latency", self.stamper)
 
         self.logger.info('Distance node launched.')
 
+    def init_tcs(self):
+        # a retry opens a new bus, the one of the previous attempt is closed
+        if self.i2c is not None:
+            self.i2c.deinit()
+        self.i2c = I2C(self.i2c_bus, self.i2c_frequency)
+        tcs = TCS34725(self.i2c, address=0x29)
+        tcs.gain = self.gain
+        tcs.integration_time = self.integration_time
+        return tcs
+
     def timer_callback(self):
+        tcs = self.tcs.value
+        if tcs is None:
+            return
         self.logger.info("Publishing color sensor data...", once=True)
 
-        rgb = self.tcs.read()
-        
-        color_bytes = tcs.color_rgb_bytes
+        try:
+            with self.stamper:
+                color_bytes = tcs.color_rgb_bytes
+        except Exception as e:
+            self.tcs.fail(e)
+            return
+
         msg = ColorRGBA()
         msg.r = float(color_bytes[0])
         msg.g = float(color_bytes[1])
@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import os
+
 import rclpy
 from rclpy.node import Node
 
@@ -6,8 +8,9 @@ from sensor_msgs.msg import Range
 
 from drivers.libs.adafruit_vl53l0x import VL53L0X
 from drivers.libs.i2c import I2C
-import cv2
-from time import sleep
+from drivers.bringup import BringUp
+from drivers.config import node_config
+from drivers.timestamping import ClockMapper, ReadStamper, create_latency_publisher
 
 class Vl5Publisher(Node):
 
@@ -17,40 +20,54 @@ class Vl5Publisher(Node):
         self.logger.info('Initializing infrared distance sensor node...')
 
         # load config
-        fs = cv2.FileStorage("/home/user/ws/src/config/config.yaml", cv2.FileStorage_READ)
-        dist_config = fs.getNode("sensors").getNode("distance")
-        topic = dist_config.getNode("topic").string()
-        sample_rate = int(dist_config.getNode("sample_rate").real())
-        i2c_bus = int(dist_config.getNode("bus").real())
-        fs.release()
-
-        # sensor initialization
-        self.vl5 = None
-        timeout = 5
-        while self.vl5 is None:
-            self.logger.info('Initializing sensor VL53L0X...')
-            try:
-                i2c = I2C(i2c_bus, 400000)
-                self.vl5 = VL53L0X(i2c, address=0x29)
-            except Exception as e:
-                self.vl5 = None
-                self.logger.error(f"Failed to initialize VL53L0X: {e}")
-                self.logger.error(f"Retrying in {timeout} seconds...")
-                sleep(timeout)
-                timeout *= 2
+        dist_config = node_config(self, "sensors", "distance")
+        topic = dist_config.topic
+        sample_rate = int(dist_config.sample_rate)
+        self.i2c_bus = int(dist_config.bus)
+        calibration_dir = os.path.expanduser(dist_config.get("calibration_dir", "~/.cache/bedman"))
+        self.calibration_file = os.path.join(calibration_dir, f"vl53l0x_bus{self.i2c_bus}.json")
+
+        # sensor initialization, runs in the background
+        self.bringup = BringUp(self)
+        self.i2c = None
+        self.vl5 = self.bringup.add("VL53L0X", self.init_vl5)
+
+        # a single shot ranging happens inside the read, stamp its middle
+        self.stamper = ReadStamper(ClockMapper(self.get_clock()), fraction=0.5)
 
         # init publishers
         self.publisher = self.create_publisher(Range, topic, 10)
         self.timer = self.create_timer(1/sample_rate, self.timer_callback)
+        self.latency_timer = create_latency_publisher(self, topic + "/read_latency", self.stamper)
 
         self.logger.info('Distance node launched.')
 
+    def init_vl5(self):
+        # a retry opens a new bus, the one of the previous attempt is closed
+        if self.i2c is not None:
+            self.i2c.deinit()
+        self.i2c = I2C(self.i2c_bus, 400000)
+        vl5 = VL53L0X(self.i2c, address=0x29, calibration_file=self.calibration_file)
+        if vl5.warm_start:
+            self.logger.info(f"VL53L0X calibration restored from {self.calibration_file}")
+        return vl5
+
     def timer_callback(self):
+        vl5 = self.vl5.value
+        if vl5 is None:
+            return
         self.logger.info("Publishing IR sensor data...", once=True)
 
+        try:
+            with self.stamper:
+                dist = vl5.range
+        except Exception as e:
+            self.vl5.fail(e)
+            return
+
         msg = Range()
-        msg.header.stamp = self.get_clock().now().to_msg()
-        msg.range = self.vl5.range
+        msg.header.stamp = self.stamper.stamp()
+        msg.range = dist
 
         self.publisher.publish(msg)
 
@@ -1,12 +1,41 @@
 #include "rclcpp/rclcpp.hpp"
 #include "nav_msgs/msg/odometry.hpp"
 
+#include <cmath>
+#include <cstdint>
+#include <cstring>
+#include <ctime>
+#include <filesystem>
 #include <fstream>
 #include <string>
 #include <iostream>
+#include <vector>
 
 #include <opencv2/opencv.hpp>
 
+// Binary pose log, read by utils/pose_log.py. A 32 byte header, then fixed-width
+// records appended in chunks, all little endian like the boards we run on.
+struct PoseLogHeader
+{
+    char magic[4] = {'P', 'L', 'O', 'G'};
+    uint16_t version = 1;
+    uint16_t record_size = 32;
+    double created = 0.0; // unix seconds
+    uint32_t skip_poses = 0;
+    uint8_t reserved[12] = {0};
+} __attribute__((packed));
+
+struct PoseRecord
+{
+    double stamp; // s
+    double x;
+    double y;
+    double yaw; // rad
+};
+
+static_assert(sizeof(PoseLogHeader) == 32, "pose log header must be 32 bytes");
+static_assert(sizeof(PoseRecord) == 32, "pose log records must be 32 bytes");
+
 class PoseLogger : public rclcpp::Node
 {
 public:
@@ -15,41 +44,122 @@ public:
         RCLCPP_INFO(this->get_logger(), "Starting pose logger...");
 
         // Parse parameters
-        std::string pose_topic, output_path;
+        std::string pose_topic, output_path, log_path;
         cv::FileStorage fs;
         fs.open("/home/user/ws/src/config/config.yaml", cv::FileStorage::READ);
         fs["pose_logger"]["pose_topic"] >> pose_topic;
         fs["pose_logger"]["output_file"] >> output_path;
+        fs["pose_logger"]["log_file"] >> log_path;
         fs["pose_logger"]["skip_poses"] >> this->skip_poses;
+        this->flush_poses = 50;
+        if (!fs["pose_logger"]["flush_poses"].empty()) {
+            fs["pose_logger"]["flush_poses"] >> this->flush_poses;
+        }
 
         pose_subscriber_ = this->create_subscription<nav_msgs::msg::Odometry>(
             pose_topic, 10, std::bind(&PoseLogger::pose_callback, this, std::placeholders::_1));
 
-        this->output_file = std::ofstream(output_path, std::ios_base::app);
-        if (!this->output_file.is_open()) {
-            RCLCPP_ERROR(this->get_logger(), "Could not open output file %s", output_path.c_str());
-            exit(1);
+        // an empty path turns a log off
+        if (!output_path.empty()) {
+            this->output_file = std::ofstream(output_path, std::ios_base::app);
+            if (!this->output_file.is_open()) {
+                RCLCPP_ERROR(this->get_logger(), "Could not open output file %s", output_path.c_str());
+                exit(1);
+            }
+        }
+        if (!log_path.empty()) {
+            this->open_log(log_path);
         }
+        this->records.reserve(this->flush_poses);
 
         this->pose_counter = -1;
 
         RCLCPP_INFO(this->get_logger(), "Pose logger has been started.");
     }
 
+    ~PoseLogger()
+    {
+        this->flush();
+    }
+
 private:
+    void open_log(const std::string &log_path)
+    {
+        // a log that already exists is continued, its header must match ours
+        PoseLogHeader header;
+        std::ifstream existing(log_path, std::ios_base::binary);
+        if (existing.is_open() && existing.peek() != std::ifstream::traits_type::eof()) {
+            PoseLogHeader found;
+            existing.read(reinterpret_cast<char *>(&found), sizeof(found));
+            if (!existing || std::memcmp(found.magic, header.magic, 4) != 0 ||
+                found.version != header.version || found.record_size != header.record_size) {
+                RCLCPP_ERROR(this->get_logger(), "%s is not a pose log of this version", log_path.c_str());
+                exit(1);
+            }
+            existing.close();
+            // a record cut by a crash is dropped, appending after it would misalign the rest
+            const auto size = std::filesystem::file_size(log_path);
+            const auto whole = sizeof(PoseLogHeader) + (size - sizeof(PoseLogHeader)) / sizeof(PoseRecord) * sizeof(PoseRecord);
+            if (whole != size) {
+                RCLCPP_WARN(this->get_logger(), "Dropping %zu bytes of a torn record at the end of %s",
+                            static_cast<size_t>(size - whole), log_path.c_str());
+                std::filesystem::resize_file(log_path, whole);
+            }
+            this->log_file = std::ofstream(log_path, std::ios_base::app | std::ios_base::binary);
+        } else {
+            this->log_file = std::ofstream(log_path, std::ios_base::binary);
+            header.created = static_cast<double>(std::time(nullptr));
+            header.skip_poses = static_cast<uint32_t>(this->skip_poses);
+            this->log_file.write(reinterpret_cast<const char *>(&header), sizeof(header));
+        }
+        if (!this->log_file.is_open()) {
+            RCLCPP_ERROR(this->get_logger(), "Could not open log file %s", log_path.c_str());
+            exit(1);
+        }
+    }
+
     void pose_callback(const nav_msgs::msg::Odometry::SharedPtr msg)
     {
         if ((++this->pose_counter % this->skip_poses) != 0) {
             return;
         }
 
-        this->output_file << msg->pose.pose.position.x << " "
-                          << msg->pose.pose.position.y << std::endl;
+        const auto &pose = msg->pose.pose;
+        if (this->output_file.is_open()) {
+            // no std::endl, the stream is flushed with the chunk of binary records
+            this->output_file << pose.position.x << " " << pose.position.y << "\n";
+        }
+
+        const auto &q = pose.orientation;
+        PoseRecord record;
+        record.stamp = msg->header.stamp.sec + msg->header.stamp.nanosec * 1e-9;
+        record.x = pose.position.x;
+        record.y = pose.position.y;
+        record.yaw = std::atan2(2.0 * (q.w * q.z + q.x * q.y), 1.0 - 2.0 * (q.y * q.y + q.z * q.z));
+        this->records.push_back(record);
+
+        if (static_cast<int>(this->records.size()) >= this->flush_poses) {
+            this->flush();
+        }
+    }
+
+    void flush(void)
+    {
+        if (this->log_file.is_open() && !this->records.empty()) {
+            this->log_file.write(reinterpret_cast<const char *>(this->records.data()),
+                                 this->records.size() * sizeof(PoseRecord));
+            this->log_file.flush();
+        }
+        this->records.clear();
+        if (this->output_file.is_open()) {
+            this->output_file.flush();
+        }
     }
 
     rclcpp::Subscription<nav_msgs::msg::Odometry>::SharedPtr pose_subscriber_;
-    int skip_poses, pose_counter;
-    std::ofstream output_file;
+    int skip_poses, pose_counter, flush_poses;
+    std::ofstream output_file, log_file;
+    std::vector<PoseRecord> records;
 };
 
 int main(int argc, char * argv[])
@@ -0,0 +1,206 @@
+# Compares the throughput of the bit-banged I2C implementations on a simulated GPIO chip.
+# The simulated chip models an open drain bus with a register based device on it, so both
+# implementations run real transactions without hardware. adafruit_bitbangio drives it
+# through DigitalInOut style pins, gpiod_bitbangio through a libgpiod style line request.
+# Every GPIO call counts as one kernel call (a direction change plus a value write as two)
+# and can be given a latency in microseconds to model the ioctl cost of the target board.
+import time
+from sys import argv
+
+from drivers.libs import gpiod_bitbangio
+from drivers.libs.gpiod_bitbangio import HIGH, LOW
+
+TRANSACTIONS = int(argv[1]) if len(argv) > 1 else 200
+FREQUENCY = int(argv[2]) if len(argv) > 2 else 400000
+CALL_LATENCY = float(argv[3]) / 1e6 if len(argv) > 3 else 0.0
+ADDRESS = 0x29
+SCL, SDA = 27, 22
+
+class SimBus:
+    """Open drain SCL/SDA pair with a register based I2C device: the first written byte
+    selects the register, further writes store into it and reads auto increment."""
+
+    def __init__(self):
+        self.registers = bytearray(range(256))
+        self.master = {SCL: 1, SDA: 1}
+        self.device_sda = 1
+        self.transitions = 0
+        self.calls = 0
+        self._mode = None
+        self._bit = 0
+        self._shift = 0
+        self._acking = False
+        self._first = False
+        self._next_mode = None
+        self._pointer = 0
+        self._out = 0
+        self._master_ack = False
+
+    def syscall(self, count=1):
+        self.calls += count
+        if CALL_LATENCY:
+            end = time.perf_counter() + count * CALL_LATENCY
+            while time.perf_counter() < end:
+                pass
+
+    def level(self, line):
+        if line == SDA:
+            return self.master[SDA] & self.device_sda
+        return self.master[SCL]
+
+    def drive(self, line, value):
+        if self.master[line] == value:
+            return
+        self.transitions += 1
+        scl, sda = self.level(SCL), self.level(SDA)
+        self.master[line] = value
+        if line == SDA and scl:
+            if self.level(SDA) == 0 and sda:
+                self._start()
+            elif self.level(SDA) and not sda:
+                self._mode = None
+        elif line == SCL:
+            if value:
+                self._rising()
+            else:
+                self._falling()
+
+    def _start(self):
+        self._mode, self._bit, self._shift, self._acking = "address", 0, 0, False
+        self.device_sda = 1
+
+    def _rising(self):
+        if self._mode in ("address", "write") and self._bit < 8:
+            self._shift = (self._shift << 1) | self.level(SDA)
+            self._bit += 1
+        elif self._mode == "read":
+            if self._bit < 8:
+                self._bit += 1
+            else:
+                self._master_ack = self.level(SDA) == 0
+
+    def _falling(self):
+        if self._mode in ("address", "write"):
+            if self._acking:
+                # the ACK clock is over, release SDA
+                self._acking = False
+                self.device_sda = 1
+                self._bit, self._shift = 0, 0
+                self._mode = self._next_mode
+                if self._mode == "read":
+                    self._load()
+            elif self._bit == 8:
+                self._receive(self._shift)
+        elif self._mode == "read":
+            if self._bit < 8:
+                self.device_sda = (self._out >> (7 - self._bit)) & 1
+            elif not self._acking:
+                # release SDA for the master's ACK
+                self.device_sda = 1
+                self._acking = True
+            elif self._master_ack:
+                self._load()
+            else:
+                self._mode = None
+
+    def _receive(self, byte):
+        if self._mode == "address":
+            if byte >> 1 != ADDRESS:
+                self._mode = None
+                return
+            self._first = True
+            self._next_mode = "read" if byte & 1 else "write"
+        elif self._first:
+            self._pointer = byte
+            self._first = False
+        else:
+            self.registers[self._pointer] = byte
+            self._pointer = (self._pointer + 1) & 0xFF
+        self.device_sda = 0
+        self._acking = True
+
+    def _load(self):
+        self._out = self.registers[self._pointer]
+        self._pointer = (self._pointer + 1) & 0xFF
+        self._bit = 0
+        self._acking = False
+        self.device_sda = (self._out >> 7) & 1
+
+class SimRequest:
+    """libgpiod v2 style line request on the simulated bus"""
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def set_values(self, values):
+        self.bus.syscall()
+        for line, value in values.items():
+            self.bus.drive(line, 1 if value == HIGH else 0)
+
+    def get_values(self, lines):
+        self.bus.syscall()
+        return [HIGH if self.bus.level(line) else LOW for line in lines]
+
+    def release(self):
+        pass
+
+class SimPin:
+    """DigitalInOut style pin on the simulated bus, output low or released input"""
+
+    def __init__(self, bus, line):
+        self.bus = bus
+        self.line = line
+
+    def switch_to_output(self, value=False, **kwargs):
+        self.bus.syscall(2)
+        self.bus.drive(self.line, 1 if value else 0)
+
+    def switch_to_input(self, **kwargs):
+        self.bus.syscall()
+        self.bus.drive(self.line, 1)
+
+    @property
+    def value(self):
+        self.bus.syscall()
+        return bool(self.bus.level(self.line))
+
+    def deinit(self):
+        pass
+
+def run(name, i2c, bus):
+    out, data = bytearray([0x10]), bytearray(6)
+    while not i2c.try_lock():
+        pass
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(TRANSACTIONS):
+        i2c.writeto_then_readfrom(ADDRESS, out, data)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    i2c.unlock()
+
+    if bytes(data) != bytes(range(0x10, 0x16)):
+        print(f"{name:<20}read back wrong data {bytes(data).hex()}")
+        return
+    # address + register, address + 6 data bytes, 9 clocks each
+    bits = TRANSACTIONS * 9 * 9
+    print(f"{name:<20}{TRANSACTIONS / wall:>12.0f}{bits / wall / 1000:>12.1f}"
+          f"{bus.calls / TRANSACTIONS:>14.0f}{cpu / wall:>10.0%}")
+
+def main():
+    print(f"{'implementation':<20}{'trans/s':>12}{'kbit/s':>12}{'calls/trans':>14}{'cpu load':>10}")
+
+    bus = SimBus()
+    try:
+        from drivers.libs import adafruit_bitbangio
+    except (ImportError, NotImplementedError) as e:
+        # needs Blinka on a supported board
+        print(f"{'adafruit_bitbangio':<20}skipped, {e}")
+    else:
+        # run the existing implementation on simulated pins instead of Blinka's DigitalInOut
+        adafruit_bitbangio.DigitalInOut = lambda pin: pin
+        run("adafruit_bitbangio", adafruit_bitbangio.I2C(SimPin(bus, SCL), SimPin(bus, SDA), frequency=FREQUENCY), bus)
+
+    bus = SimBus()
+    run("gpiod_bitbangio", gpiod_bitbangio.I2C(SCL, SDA, frequency=FREQUENCY, request=SimRequest(bus)), bus)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Measures how long the BNO08x takes to come up and how much CPU is burned meanwhile.
+# Compares enabling the publisher features one by one against a single batch.
+import time
+from sys import argv
+
+from drivers.libs.i2c import I2C
+from drivers.libs.adafruit_bno08x import (
+    BNO_REPORT_ACCELEROMETER,
+    BNO_REPORT_GYROSCOPE,
+    BNO_REPORT_MAGNETOMETER,
+    BNO_REPORT_ROTATION_VECTOR,
+)
+from drivers.libs.adafruit_bno08x.i2c import BNO08X_I2C
+
+I2C_BUS = int(argv[1]) if len(argv) > 1 else 1
+ADDRESS = 0x4b # BNO080 (0x4b) BNO085 (0x4a)
+RUNS = int(argv[2]) if len(argv) > 2 else 5
+
+FEATURES = [
+    BNO_REPORT_ACCELEROMETER,
+    BNO_REPORT_GYROSCOPE,
+    BNO_REPORT_ROTATION_VECTOR,
+    BNO_REPORT_MAGNETOMETER,
+]
+
+def measure(stage, results, func):
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    value = func()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    results.setdefault(stage, []).append((wall, cpu))
+    return value
+
+def enable_sequential(bno):
+    for feature in FEATURES:
+        bno.enable_feature(feature)
+
+def main():
+    i2c = I2C(I2C_BUS, 400000)
+    results = {}
+
+    for _ in range(RUNS):
+        bno = measure("construct", results, lambda: BNO08X_I2C(i2c, address=ADDRESS))
+        measure("enable sequential", results, lambda: enable_sequential(bno))
+
+        # start from an unconfigured sensor again before the batched run
+        measure("soft reset", results, bno.soft_reset)
+        bno._readings.clear()
+        measure("enable batch", results, lambda: bno.enable_features(FEATURES))
+
+    print(f"{'stage':<20}{'wall [ms]':>12}{'cpu [ms]':>12}{'cpu load':>10}")
+    for stage, samples in results.items():
+        wall = sum(s[0] for s in samples) / len(samples)
+        cpu = sum(s[1] for s in samples) / len(samples)
+        print(f"{stage:<20}{wall * 1000:>12.1f}{cpu * 1000:>12.1f}{cpu / wall:>10.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Measures the cold start import cost of every python node with `python -X importtime`.
+# Each node script runs in a fresh interpreter under a non-main name, so only its imports
+# execute. `cv2` is measured on its own as the cost the nodes paid to read config.yaml.
+import os
+import statistics
+import subprocess
+import sys
+from sys import argv
+
+RUNS = int(argv[1]) if len(argv) > 1 else 5
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src", "drivers", "scripts")
+
+NODES = [
+    "bno_publisher.py",
+    "ina_publisher.py",
+    "vl5_publisher.py",
+    "tcs32_publisher.py",
+    "tcs34_publisher.py",
+    "motor_listener.py",
+    "flare_listener.py",
+]
+
+def import_times(code):
+    """Returns the total import time in us and the cumulative time of each top level import"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented below the module importing them
+        if name.startswith("  "):
+            continue
+        modules[name.strip()] = int(cumulative)
+    return sum(modules.values()), modules
+
+def measure(code):
+    totals, modules = [], {}
+    for _ in range(RUNS):
+        total, run_modules = import_times(code)
+        totals.append(total)
+        for name, cumulative in run_modules.items():
+            modules.setdefault(name, []).append(cumulative)
+    heaviest = sorted(((statistics.median(t), n) for n, t in modules.items()), reverse=True)[:3]
+    return statistics.median(totals), heaviest
+
+def main():
+    targets = [("cv2 (reference)", "import cv2")]
+    for node in NODES:
+        path = os.path.abspath(os.path.join(SCRIPTS_DIR, node))
+        targets.append((node, f"import runpy; runpy.run_path({path!r}, run_name='import_time')"))
+
+    print(f"{'node':<22}{'import [ms]':>12}  heaviest top level imports")
+    for name, code in targets:
+        try:
+            total, heaviest = measure(code)
+        except RuntimeError as e:
+            print(f"{name:<22}{'failed':>12}  {e}")
+            continue
+        summary = ", ".join(f"{n} {t / 1000:.1f}" for t, n in heaviest)
+        print(f"{name:<22}{total / 1000:>12.1f}  {summary}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Measures the RGB sample rate and accuracy of the TCS3200 reader on a simulated sensor.
+# The simulated output runs at fixed frequencies per photodiode (with optional edge jitter),
+# so the previous read loop (0.3 s settle per filter, then 10 edges) and the background
+# measurement engine can be compared without hardware.
+import time
+from sys import argv
+
+from drivers.libs.gy_tcs3200 import BLUE, FILTERS, GREEN, RED, TCS3200, SimulatedEdgeSource
+
+DURATION = float(argv[1]) if len(argv) > 1 else 3.0
+JITTER = float(argv[2]) / 1e6 if len(argv) > 2 else 2.0 / 1e6
+FREQUENCIES = {RED: 12000.0, GREEN: 9000.0, BLUE: 15000.0}
+
+def legacy_read(source, cycles=10):
+    # the sleep and edge count of the previous TCS3200.read
+    rgb = []
+    for color in FILTERS:
+        changed = source.select(*color)
+        time.sleep(0.3)
+        start = time.monotonic_ns()
+        timestamps = source.edges(max(changed, start), cycles, 1.0)
+        rgb.append(cycles * 1e9 / (timestamps[-1] - start))
+    return rgb
+
+def error(rgb):
+    return max(abs(value / FREQUENCIES[color] - 1) for value, color in zip(rgb, FILTERS))
+
+def report(name, samples, wall):
+    worst = max(error(rgb) for rgb in samples)
+    print(f"{name:<12}{len(samples) / wall:>12.1f}{1000 * wall / len(samples):>14.1f}{worst:>12.2%}")
+
+def main():
+    print(f"{'reader':<12}{'samples/s':>12}{'ms/sample':>14}{'max error':>12}")
+
+    source = SimulatedEdgeSource(FREQUENCIES, jitter=JITTER)
+    samples, start = [], time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        samples.append(legacy_read(source))
+    report("legacy", samples, time.perf_counter() - start)
+
+    tcs = TCS3200(source=SimulatedEdgeSource(FREQUENCIES, jitter=JITTER))
+    samples, start = [], time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        samples.append(tcs.read())
+    report("background", samples, time.perf_counter() - start)
+    tcs.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Compares closest-segment queries of the track map grid with a brute force scan over every
+# segment, the way the steering node looks up the map. Takes a recorded track (pose_logger
+# output, text map or binary map) and the number of poses, or simulates a noisy loop of the
+# given number of points. Poses are scattered around the track like odometry while driving.
+import os
+import sys
+import time
+from sys import argv
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "utils"))
+from track_map import TrackMap
+
+TRACK = argv[1] if len(argv) > 1 else "5000"
+POSES = int(argv[2]) if len(argv) > 2 else 2000
+NOISE = 0.3  # spread of the poses around the track
+
+def simulated_track(points):
+    t = np.linspace(0, 2 * np.pi, points, endpoint=False)
+    radius = 10 + 2 * np.sin(3 * t)
+    return TrackMap(np.column_stack((radius * np.cos(t), 0.6 * radius * np.sin(t))), closed=True)
+
+def brute_force(track, points):
+    # distance to every segment, as the steering node's loop does one at a time
+    starts, directions = track.starts.astype(np.float64), track.ends.astype(np.float64) - track.starts
+    segments, distances = [], []
+    for p in points:
+        offset = p - starts
+        t = np.clip(np.einsum("ij,ij->i", offset, directions) / np.maximum(np.einsum("ij,ij->i", directions, directions), 1e-12), 0, 1)
+        d = np.hypot(*(offset - t[:, None] * directions).T)
+        segments.append(int(np.argmin(d)))
+        distances.append(d[segments[-1]])
+    return np.array(segments), np.array(distances)
+
+def report(name, wall, count):
+    print(f"{name:<14}{1e6 * wall / count:>12.1f}{count / wall:>14.0f}")
+
+def main():
+    track = simulated_track(int(TRACK)) if TRACK.isdigit() else TrackMap.load(TRACK)
+    rng = np.random.default_rng(0)
+    poses = track.point_at(rng.uniform(0, track.length, POSES)) + rng.normal(0, NOISE, (POSES, 2))
+    print(f"{len(track.starts)} segments, {track.columns}x{track.rows} grid, {POSES} poses")
+    print(f"{'query':<14}{'us/pose':>12}{'poses/s':>14}")
+
+    start = time.perf_counter()
+    _, expected = brute_force(track, poses)
+    report("brute force", time.perf_counter() - start, POSES)
+
+    start = time.perf_counter()
+    single = [track.closest(p).distance for p in poses]
+    report("grid single", time.perf_counter() - start, POSES)
+
+    start = time.perf_counter()
+    batch = track.closest(poses)
+    report("grid batch", time.perf_counter() - start, POSES)
+
+    start = time.perf_counter()
+    track.lookahead(poses, 2.0)
+    report("lookahead", time.perf_counter() - start, POSES)
+
+    error = max(np.abs(batch.distance - expected).max(), np.abs(np.array(single) - expected).max())
+    print(f"largest difference to brute force: {error:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -2,38 +2,28 @@ import cv2
 from sys import argv
 import numpy as np
 
+from controller.mark_detection import MarkDetector
+
 IMAGE_PATH = argv[1]
 LOWER_BOUND = np.array([20, 0, 0])
 UPPER_BOUND = np.array([45, 255, 255])
 
 image = cv2.imread(IMAGE_PATH)
 
-hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-mask = cv2.inRange(hsv_image, LOWER_BOUND, UPPER_BOUND)
-contours, hierarchy = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-
-bb_image = hsv_image.copy()
-if len(contours) > 0:
-    
-    largest_contour = contours[0]
-    bb = cv2.boundingRect(largest_contour)
-    largest_area = bb[2] * bb[3]
-    for contour in contours:
-        bb = cv2.boundingRect(contour)
-        area = bb[2] * bb[3]
-        if area > largest_area:
-            largest_contour = contour
-            largest_area = area
-
-    bb = cv2.boundingRect(largest_contour)
+# the whole image at full size, as the mark detector node sees its region
+detector = MarkDetector(LOWER_BOUND, UPPER_BOUND, scale=1.0)
+mark = detector.detect(image)
 
-    x, y, w, h = bb
-    cx, cy = x + w//2, y + h//2
-    height, width, _ = hsv_image.shape
+bb_image = image.copy()
+if mark is None:
+    print("No mark found")
+else:
+    print(f"Mark at ({mark.x:.0f}, {mark.y:.0f}), {mark.area:.0f} px")
 
-# draw bounding box
-cv2.rectangle(bb_image, (x, y), (x+w, y+h), (0, 255, 0), 2)      
-cv2.circle(bb_image, (cx, cy), 5, (0, 0, 255), -1)
-show_img = np.hstack((cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR), cv2.cvtColor(bb_image, cv2.COLOR_HSV2BGR)))
+    # draw bounding box
+    x, y = int(mark.left), int(mark.top)
+    cv2.rectangle(bb_image, (x, y), (x + int(mark.width), y + int(mark.height)), (0, 255, 0), 2)
+    cv2.circle(bb_image, (int(mark.x), int(mark.y)), 5, (0, 0, 255), -1)
+show_img = np.hstack((cv2.cvtColor(detector.mask, cv2.COLOR_GRAY2BGR), bb_image))
 cv2.imshow("out", show_img)
-cv2.waitKey(0)
\ No newline at end of file
+cv2.waitKey(0)
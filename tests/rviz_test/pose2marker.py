@@ -1,38 +1,103 @@
+import argparse
+from sys import argv
+
 import rclpy
-from visualization_msgs.msg import Marker
-from geometry_msgs.msg import PoseStamped
-from time import sleep
-
-global marker_pub
-
-def pose_callback(msg):
-    maker_msg = Marker()
-    maker_msg.header.stamp = msg.header.stamp
-    maker_msg.header.frame_id = msg.header.frame_id
-    maker_msg.pose = msg.pose
-    maker_msg.type = Marker.SPHERE
-    maker_msg.action = Marker.ADD
-    maker_msg.scale.x = 1.0
-    maker_msg.scale.y = 1.0
-    maker_msg.scale.z = 1.0
-    maker_msg.color.a = 1.0
-    maker_msg.color.r = 1.0
-    maker_msg.color.g = 0.0
-    maker_msg.color.b = 0.0
-    maker_msg.lifetime.sec = 1000
-
-    marker_pub.publish(maker_msg)
+from rclpy.node import Node
+from rclpy.utilities import remove_ros_args
+from visualization_msgs.msg import Marker, MarkerArray
+from geometry_msgs.msg import Point, PoseStamped
+
+POSE_TOPIC = '/dummy_pose'
+MARKER_TOPIC = '/dummy_marker'
+MIN_DISTANCE = 0.05 # m between drawn poses
+CHUNK = 500 # points per marker, only the newest marker is republished
+MAX_CHUNKS = 20 # markers kept, the oldest is deleted after that
+RATE = 10 # Hz, at most
+
+class PoseMarkers(Node):
+    """Draws poses as a trail of SPHERE_LIST or LINE_STRIP markers.
+
+    Poses closer than MIN_DISTANCE to the last drawn one are skipped. The trail is
+    split into markers of CHUNK points: a full marker is published once and left to
+    RViz, only the growing one is republished, so the cost of an update does not
+    grow with the trail. Past MAX_CHUNKS markers the oldest one is deleted.
+    """
+
+    def __init__(self, marker_type):
+        super().__init__('marker_node')
+        self.marker_type = marker_type
+        self.marker_pub = self.create_publisher(MarkerArray, MARKER_TOPIC, 10)
+        self.pose_sub = self.create_subscription(PoseStamped, POSE_TOPIC, self.pose_callback, 10)
+        self.timer = self.create_timer(1/RATE, self.timer_callback)
+
+        self.marker = self.new_marker(0)
+        self.last = None
+        self.changed = False
+        self.finished = [] # full markers not published yet
+        self.deleted = []
+
+    def new_marker(self, marker_id):
+        marker = Marker()
+        marker.ns = 'poses'
+        marker.id = marker_id
+        marker.type = self.marker_type
+        marker.action = Marker.ADD
+        marker.pose.orientation.w = 1.0
+        marker.scale.x = 0.1
+        marker.scale.y = 0.1
+        marker.scale.z = 0.1
+        marker.color.a = 1.0
+        marker.color.r = 1.0
+        marker.color.g = 0.0
+        marker.color.b = 0.0
+        return marker
+
+    def pose_callback(self, msg):
+        p = msg.pose.position
+        if self.last is not None and (p.x - self.last.x)**2 + (p.y - self.last.y)**2 + (p.z - self.last.z)**2 < MIN_DISTANCE**2:
+            return
+        self.last = Point(x=p.x, y=p.y, z=p.z)
+
+        self.marker.header = msg.header
+        self.marker.points.append(self.last)
+        self.changed = True
+        if len(self.marker.points) < CHUNK:
+            return
+
+        self.finished.append(self.marker)
+        marker_id = self.marker.id + 1
+        self.marker = self.new_marker(marker_id)
+        self.marker.header = msg.header
+        if self.marker_type == Marker.LINE_STRIP:
+            # the next strip starts where this one ends
+            self.marker.points.append(self.last)
+        if marker_id >= MAX_CHUNKS:
+            old = self.new_marker(marker_id - MAX_CHUNKS)
+            old.header = msg.header
+            old.action = Marker.DELETE
+            self.deleted.append(old)
+
+    def timer_callback(self):
+        if not self.changed:
+            return
+        msg = MarkerArray()
+        msg.markers = self.deleted + self.finished + [self.marker]
+        self.marker_pub.publish(msg)
+        self.deleted, self.finished = [], []
+        self.changed = False
 
 def main():
-    global marker_pub
+    parser = argparse.ArgumentParser(description="Draw poses as markers")
+    parser.add_argument('--lines', action='store_true', help='draw a line strip instead of spheres')
+    args = parser.parse_args(remove_ros_args(argv)[1:])
 
-    rclpy.init()
-    marker_node = rclpy.create_node('marker_node')
-    marker_pub = marker_node.create_publisher(Marker, '/dummy_marker', 10)
-    pose_sub = marker_node.create_subscription(PoseStamped, '/dummy_pose', pose_callback, 10)
+    rclpy.init(args=argv)
+    marker_node = PoseMarkers(Marker.LINE_STRIP if args.lines else Marker.SPHERE_LIST)
     rclpy.spin(marker_node)
-    
+
+    marker_node.destroy_node()
+    rclpy.shutdown()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
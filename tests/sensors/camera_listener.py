@@ -1,37 +1,39 @@
 import rclpy
-import yaml
 from sensor_msgs.msg import CompressedImage
-import numpy as np
 import cv2
 from sys import argv
+from threading import Thread
 
-def camera_callback(msg):
-    global node
-    np_arr = np.frombuffer(msg.data, np.uint8)
-    image_np = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-    cv2.imshow("frame", image_np)
-    cv2.waitKey(1)
+from drivers.image import FRAME_QOS, FrameStats, ImageDecoder, LatestFrame, stamp_latency
 
 def camera_pub():
-    
-    # load config
-    with open("/home/gab/projetos/yapira/bedman-trekker/src/config/config.yaml", "r") as file:
-        config = yaml.safe_load(file)
+
     # camera_topic = config["sensors"]["camera"]["topic"]
     camera_topic = argv[1]
 
     # ros2 initialization
     rclpy.init(args=None)
-    global node
     node = rclpy.create_node("camera_listener")
-    camera_sub = node.create_subscription(CompressedImage, camera_topic, camera_callback, 10)
-    rate = node.create_rate(10) # frequency in Hz
-    camera_sub, rate
+    latest = LatestFrame()
+    camera_sub = node.create_subscription(CompressedImage, camera_topic, latest.put, FRAME_QOS)
+    camera_sub
     logger = node.get_logger()
     logger.info('Camera listener node launched.')
 
-    rclpy.spin(node)
+    # frames are shown from this thread, stale ones are dropped while it draws
+    Thread(target=rclpy.spin, args=(node,), daemon=True).start()
+    decoder = ImageDecoder()
+    stats = FrameStats()
+    while rclpy.ok():
+        msg = latest.take()
+        if msg is None:
+            cv2.waitKey(10)
+            continue
+        image_np = decoder.decode(msg)
+        stats.update(stamp_latency(node, msg))
+        cv2.imshow("frame", stats.overlay(image_np, latest.dropped))
+        cv2.waitKey(1)
 
 
 if __name__ == "__main__":
-    camera_pub()
\ No newline at end of file
+    camera_pub()
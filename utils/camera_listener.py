@@ -1,30 +1,47 @@
+import time
+from threading import Thread
+
 import rclpy
 import cv2
-import cv_bridge
 
 from sensor_msgs.msg import Image
-import numpy as np
 
-from sys import argv 
+from drivers.image import FRAME_QOS, FrameStats, ImageDecoder, LatestFrame, stamp_latency
 
-bridge = cv_bridge.CvBridge()
+from sys import argv
 
-def image_callback(msg):
-    image_np = bridge.imgmsg_to_cv2(msg, desired_encoding='bgr8')
-    
-    cv2.imshow("Image window", image_np)
-    cv2.waitKey(1)
+FPS = 30 # largest display rate
 
 def main():
 
     topic_name = argv[1]
 
     rclpy.init()
-    global node 
     node = rclpy.create_node("camera_listener")
-    image_listener = node.create_subscription(Image, topic_name, image_callback, 10)
+    # the callback only keeps the newest frame, the display takes it when it is ready
+    latest = LatestFrame()
+    image_listener = node.create_subscription(Image, topic_name, latest.put, FRAME_QOS)
     image_listener  # prevent unused variable warning
-    rclpy.spin(node)
+    Thread(target=rclpy.spin, args=(node,), daemon=True).start()
+
+    decoder = ImageDecoder()
+    stats = FrameStats()
+    try:
+        while rclpy.ok():
+            msg = latest.take()
+            if msg is None:
+                cv2.waitKey(int(1000 / FPS))
+                continue
+
+            image = decoder.decode(msg)
+            stats.update(stamp_latency(node, msg))
+            cv2.imshow("Image window", stats.overlay(image, latest.dropped))
+            cv2.waitKey(1)
+    except KeyboardInterrupt:
+        pass
+
+    node.destroy_node()
+    rclpy.shutdown()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
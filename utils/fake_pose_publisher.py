@@ -16,7 +16,7 @@ class FakePosePublisher(Node):
         
         self.curr_pose = np.array([0.0, 0.0, 0.0]) # in 3D
 
-        self.publisher = self.create_publisher(PoseStamped, "/fake_pose", 10)
+        self.publisher = self.create_publisher(PoseStamped, TOPIC, 10)
         self.timer = self.create_timer(1/FREQUENCY, self.timer_callback)
 
         self.logger.info("Fake pose publisher started.")
@@ -47,6 +47,7 @@ class FakePosePublisher(Node):
         msg.pose.orientation.x = 0.0
         msg.pose.orientation.y = 0.0
         msg.pose.orientation.z = np.sin(self.curr_pose[2]/2)
+        msg.pose.orientation.w = np.cos(self.curr_pose[2]/2)
 
         self.publisher.publish(msg)
 
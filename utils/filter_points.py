@@ -1,55 +1,79 @@
+"""
+Builds a track map from a pose_logger output file.
+
+    python3 filter_points.py track.txt map
+
+writes map.txt, the text map for the steering node, map.map, the binary map with
+its spatial index, and map.png. Files of any size are streamed, binary pose logs
+(.plog) and NumPy .npy files of points are read too.
+"""
+import argparse
+
 import numpy as np
-from rdp import rdp
 import cv2
 
-POINTS_FILE = "points.npy"
-EPS = 0.5
-LINE_SEGMENTS = 1000
-SCALE_FACTOR = 10000
-MAP_SIZE = 4000
+from pose_log import log_points, read_pose_log
+from track_map import TrackMap, read_points, simplify
 
-raw_points = np.load(POINTS_FILE)
-pps = len(raw_points) // LINE_SEGMENTS
+EPS = 0.05  # largest distance of a logged point to the map
+CLOSE_DISTANCE = 0.5  # ends closer than this make the track a closed loop
+MAP_SIZE = 4000
+MARGIN = 100
 
-filtered = []
-for i in range(0, LINE_SEGMENTS-1):
-    line = rdp(raw_points[i*pps:(i+1)*pps], epsilon=EPS)
-    filtered.append(line[0])
-    filtered.append(line[1])
 
-filtered = np.array(filtered, dtype=np.float32)
-print(filtered.shape)
+def render(track: TrackMap) -> np.ndarray:
+    """Image of the map, scaled to fit, with y pointing up"""
+    points = track.points.astype(np.float64)
+    low, high = points.min(axis=0), points.max(axis=0)
+    scale = (MAP_SIZE - 2 * MARGIN) / max(float((high - low).max()), 1e-6)
 
-filtered = filtered*SCALE_FACTOR
-filtered[:, 0] += MAP_SIZE//2
-filtered[:, 1] = MAP_SIZE//2 - filtered[:, 1]
-filtered = filtered.astype(np.int64)
+    def pixels(p):
+        p = np.atleast_2d(p)
+        return np.column_stack((MARGIN + (p[:, 0] - low[0]) * scale, MAP_SIZE - MARGIN - (p[:, 1] - low[1]) * scale)).round().astype(np.int32)
 
+    # start rgb white image
+    map_img = np.full((MAP_SIZE, MAP_SIZE, 3), 255, dtype=np.uint8)
 
-np.save('map.npy', filtered)
+    # draw coordinate axis x and y where they are on the map
+    origin_x, origin_y = pixels((0.0, 0.0))[0]
+    if 0 <= origin_y < MAP_SIZE:
+        cv2.line(map_img, (0, int(origin_y)), (MAP_SIZE, int(origin_y)), (160, 160, 160), 2)
+        cv2.putText(map_img, "X", (MAP_SIZE - 100, int(origin_y) + 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (160, 160, 160), 2)
+    if 0 <= origin_x < MAP_SIZE:
+        cv2.line(map_img, (int(origin_x), 0), (int(origin_x), MAP_SIZE), (160, 160, 160), 2)
+        cv2.putText(map_img, "Y", (int(origin_x) - 100, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (160, 160, 160), 2)
 
-# start rgb white image
-map_img = np.zeros((MAP_SIZE, MAP_SIZE, 3), dtype=np.uint8)
-map_img.fill(255)
+    # the whole track in one call
+    track_pixels = pixels(points)
+    cv2.polylines(map_img, [track_pixels.reshape(-1, 1, 2)], track.closed, (0, 0, 0), 2, cv2.LINE_AA)
 
-# draw coordinate axis x and y
-cv2.line(map_img, (0, MAP_SIZE//2), (MAP_SIZE, MAP_SIZE//2), (0, 0, 0), 2)
-cv2.line(map_img, (MAP_SIZE//2, 0), (MAP_SIZE//2, MAP_SIZE), (0, 0, 0), 2)
-cv2.putText(map_img, "X", (MAP_SIZE - 100, (MAP_SIZE//2) + 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 2)
-cv2.putText(map_img, "Y", ((MAP_SIZE//2) - 100, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 2)
+    # write start and end points
+    start, end = track_pixels[0], track_pixels[-1]
+    cv2.circle(map_img, tuple(int(v) for v in start), 8, (255, 0, 0), 3)
+    cv2.circle(map_img, tuple(int(v) for v in end), 8, (0, 0, 255), 3)
+    cv2.putText(map_img, "start", (int(start[0]) + 10, int(start[1]) + 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+    cv2.putText(map_img, "end", (int(end[0]) + 10, int(end[1]) - 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    return map_img
 
-# fix y position to image
-print(filtered)
-for i in range(0, len(filtered) - 1):
-    cv2.line(map_img, filtered[i], filtered[i+1], (0, 0, 0), 2)
 
-for [x, y] in filtered:
-    cv2.circle(map_img, (x, y), 3, (0, 255, 0), 2)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a track map from a pose_logger output file")
+    parser.add_argument("points", help="pose_logger output, text map, pose log or .npy file of points")
+    parser.add_argument("output", nargs="?", default="map", help="output path without extension")
+    parser.add_argument("--eps", type=float, default=EPS, help="largest distance of a point to the map")
+    parser.add_argument("--close", type=float, default=CLOSE_DISTANCE,
+                        help="distance of the ends below which the track is a closed loop, 0 keeps it open")
+    parser.add_argument("--block", type=int, default=1 << 22, help="characters read at a time")
+    args = parser.parse_args()
 
-# write start and end points
-cv2.circle(map_img, (filtered[0][0], filtered[0][1]), 5, (255, 0, 0), 2)
-cv2.circle(map_img, (filtered[-1][0], filtered[-1][1]), 5, (0, 0, 255), 2)
-cv2.putText(map_img, "start", (filtered[0][0] + 10, filtered[0][1] + 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
-cv2.putText(map_img, "end", (filtered[-1][0] + 10, filtered[-1][1] - 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    if args.points.endswith(".plog"):
+        chunks = log_points(read_pose_log(args.points))
+    else:
+        chunks = read_points(args.points, args.block)
+    track = simplify(chunks, args.eps, args.close or None)
+    print(f"{len(track.points)} points, {'closed loop' if track.closed else 'open'}, "
+          f"{track.columns}x{track.rows} grid of {track.cell_size:.3f}")
 
-cv2.imwrite("map_img.png", map_img)
\ No newline at end of file
+    track.save_text(args.output + ".txt")
+    track.save(args.output + ".map")
+    cv2.imwrite(args.output + ".png", render(track))
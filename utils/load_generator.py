@@ -0,0 +1,224 @@
+"""
+Publishes synthetic sensor and command streams to find where their consumers saturate.
+
+    python3 load_generator.py imu=300 odom=150x10 twist=50@/cmd_vel --duty 2,1
+
+Every stream is `kind=rate[xburst][@topic]`: `rate` bursts a second of `burst`
+messages each, on the topic the robot uses unless one is given. Kinds: imu, range,
+battery, color, twist and odom. `--duty on,off` publishes for `on` seconds and
+pauses for `off`. Messages are allocated once and only their stamps and values are
+updated. All streams share one thread that wakes up for the next due burst, and the
+achieved rates are reported every `--report` seconds; a stream that falls behind
+its schedule skips the missed bursts and counts them.
+"""
+import argparse
+import heapq
+import math
+import random
+import re
+import time
+from sys import argv
+
+import rclpy
+from rclpy.utilities import remove_ros_args
+from custom_msgs.msg import Imu
+from geometry_msgs.msg import Twist
+from nav_msgs.msg import Odometry
+from sensor_msgs.msg import BatteryState, Range
+from std_msgs.msg import ColorRGBA
+
+GRAVITY = 9.80665
+
+class Stream:
+    """A preallocated message published on a schedule"""
+
+    msg_type = None
+    topic = None
+
+    def __init__(self, node, rate, burst=1, topic=None):
+        self.topic = topic or self.topic
+        self.rate = rate
+        self.burst = burst
+        self.publisher = node.create_publisher(self.msg_type, self.topic, 10)
+        self.msg = self.msg_type()
+        self.setup(self.msg)
+        self.sent = 0
+        self.missed = 0
+
+    def setup(self, msg):
+        pass
+
+    def update(self, msg, t):
+        pass
+
+    def publish(self, t):
+        msg = self.msg
+        if hasattr(msg, "header"):
+            sec, nanosec = divmod(time.time_ns(), 1_000_000_000)
+            msg.header.stamp.sec, msg.header.stamp.nanosec = sec, nanosec
+        self.update(msg, t)
+        for _ in range(self.burst):
+            self.publisher.publish(msg)
+        self.sent += self.burst
+
+class ImuStream(Stream):
+    msg_type = Imu
+    topic = "/sensors/bno08x/raw"
+
+    def setup(self, msg):
+        msg.header.frame_id = "imu"
+        # no fused orientation, consumers integrate the raw readings
+        msg.orientation.w = 1.0
+        msg.orientation_covariance[0] = -1.0
+
+    def update(self, msg, t):
+        gauss = random.gauss
+        msg.angular_velocity.x = gauss(0.0, 0.01)
+        msg.angular_velocity.y = gauss(0.0, 0.01)
+        msg.angular_velocity.z = 0.5 * math.sin(t) + gauss(0.0, 0.01)
+        msg.linear_acceleration.x = math.cos(t) + gauss(0.0, 0.05)
+        msg.linear_acceleration.y = gauss(0.0, 0.05)
+        msg.linear_acceleration.z = GRAVITY + gauss(0.0, 0.05)
+        msg.magnetic_field.x = 20.0 + gauss(0.0, 0.5)
+        msg.magnetic_field.y = gauss(0.0, 0.5)
+        msg.magnetic_field.z = -40.0 + gauss(0.0, 0.5)
+
+class RangeStream(Stream):
+    msg_type = Range
+    topic = "/sensors/vl53l0x/dist"
+
+    def setup(self, msg):
+        msg.header.frame_id = "vl53l0x"
+        msg.radiation_type = Range.INFRARED
+        msg.field_of_view = 0.44
+        msg.min_range, msg.max_range = 0.03, 2.0
+
+    def update(self, msg, t):
+        msg.range = 1.0 + 0.8 * math.sin(t) + random.gauss(0.0, 0.01)
+
+class BatteryStream(Stream):
+    msg_type = BatteryState
+    topic = "/sensors/ina219_0/state"
+
+    def setup(self, msg):
+        msg.capacity = msg.design_capacity = 2300.0
+        msg.power_supply_status = BatteryState.POWER_SUPPLY_STATUS_DISCHARGING
+        msg.power_supply_technology = BatteryState.POWER_SUPPLY_TECHNOLOGY_LIPO
+        msg.present = True
+
+    def update(self, msg, t):
+        msg.current = 1500.0 + 1000.0 * math.sin(t) + random.gauss(0.0, 50.0)
+        msg.voltage = 11.8 - msg.current * 1e-4
+        msg.percentage = 0.8
+
+class ColorStream(Stream):
+    msg_type = ColorRGBA
+    topic = "/sensors/tcs34725/color"
+
+    def update(self, msg, t):
+        msg.r = random.uniform(0.0, 4500.0)
+        msg.g = random.uniform(0.0, 4500.0)
+        msg.b = random.uniform(0.0, 4500.0)
+        msg.a = 1.0
+
+class TwistStream(Stream):
+    msg_type = Twist
+    topic = "/cmd_vel"
+
+    def update(self, msg, t):
+        msg.linear.x = 0.5 + 0.5 * math.sin(t)
+        msg.angular.z = 0.5 * math.sin(0.3 * t)
+
+class OdometryStream(Stream):
+    msg_type = Odometry
+    topic = "/imu_tracker/odom"
+
+    def setup(self, msg):
+        msg.header.frame_id = "world"
+        self.pose = [0.0, 0.0, 0.0]
+
+    def update(self, msg, t):
+        # the random walk of fake_pose_publisher
+        distance = random.uniform(0.0, 0.1)
+        self.pose[0] += distance * math.cos(self.pose[2])
+        self.pose[1] += distance * math.sin(self.pose[2])
+        self.pose[2] += random.uniform(-math.pi/6, math.pi/6)
+        msg.pose.pose.position.x, msg.pose.pose.position.y = self.pose[0], self.pose[1]
+        msg.pose.pose.orientation.z = math.sin(self.pose[2]/2)
+        msg.pose.pose.orientation.w = math.cos(self.pose[2]/2)
+
+STREAMS = {
+    "imu": ImuStream,
+    "range": RangeStream,
+    "battery": BatteryStream,
+    "color": ColorStream,
+    "twist": TwistStream,
+    "odom": OdometryStream,
+}
+
+def parse_stream(spec):
+    match = re.fullmatch(r"(\w+)=([0-9.]+)(?:x(\d+))?(?:@(\S+))?", spec)
+    if match is None or match.group(1) not in STREAMS:
+        raise argparse.ArgumentTypeError(f"expected kind=rate[xburst][@topic] with a kind of {', '.join(STREAMS)}")
+    kind, rate, burst, topic = match.groups()
+    return kind, float(rate), int(burst or 1), topic
+
+def run(node, streams, duration, duty, report):
+    start = time.monotonic()
+    # next burst of every stream, (due time, index)
+    schedule = [(start, i) for i in range(len(streams))]
+    heapq.heapify(schedule)
+    last_report, last_sent = start, [0] * len(streams)
+    on, off = duty
+
+    while rclpy.ok():
+        due, i = schedule[0]
+        now = time.monotonic()
+        if duration and now - start >= duration:
+            break
+        if due > now:
+            time.sleep(min(due - now, 0.01))
+            continue
+
+        stream = streams[i]
+        if off and (due - start) % (on + off) >= on:
+            pass  # paused by the duty cycle
+        else:
+            stream.publish(due - start)
+        # fixed schedule, bursts missed while the process was busy are skipped and counted
+        period = 1 / stream.rate
+        late = int((now - due) / period)
+        stream.missed += late
+        heapq.heapreplace(schedule, (due + (late + 1) * period, i))
+
+        if now - last_report >= report:
+            elapsed = now - last_report
+            for j, s in enumerate(streams):
+                node.get_logger().info(
+                    f"{s.topic}: {(s.sent - last_sent[j]) / elapsed:.1f} msg/s of {s.rate * s.burst:.1f}, {s.missed} bursts missed"
+                )
+                last_sent[j] = s.sent
+            last_report = now
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish synthetic sensor and command streams")
+    parser.add_argument("streams", nargs="+", type=parse_stream, help="kind=rate[xburst][@topic]")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to run, 0 runs until stopped")
+    parser.add_argument("--duty", default="0,0", help="seconds publishing and paused, 0,0 never pauses")
+    parser.add_argument("--report", type=float, default=1.0, help="seconds between rate reports")
+    args = parser.parse_args(remove_ros_args(argv)[1:])
+    duty = tuple(float(v) for v in args.duty.split(","))
+
+    rclpy.init(args=argv)
+    node = rclpy.create_node("load_generator")
+    streams = [STREAMS[kind](node, rate, burst, topic) for kind, rate, burst, topic in args.streams]
+    try:
+        run(node, streams, args.duration, duty, args.report)
+    except KeyboardInterrupt:
+        pass
+
+    node.destroy_node()
+    rclpy.shutdown()
+
+if __name__ == "__main__":
+    main()
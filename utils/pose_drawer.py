@@ -1,59 +1,162 @@
+"""
+Draws the odometry and the map of the steering node.
+
+    python3 pose_drawer.py <odometry topic> <map topic> [--headless track.png]
+
+The callbacks only queue the positions. The main thread takes them in batches at
+`--fps`, draws only the new segments with cv2.polylines and shows the image, while
+rclpy spins on its own thread. The view zooms out and recenters once the track
+leaves it. Headless, a PNG snapshot is written every `--period` seconds instead.
+"""
+import argparse
+import os
+import time
+from collections import deque
+from sys import argv
+from threading import Thread
+
 import rclpy
+from rclpy.utilities import remove_ros_args
 import cv2
 from nav_msgs.msg import Odometry
 import numpy as np
-from threading import Lock
-from sys import argv 
 
-OFFSET = 250
-SCALE = 1
+SIZE = 800
+MARGIN = 20
+FPS = 30
+PERIOD = 5.0
+MIN_SPAN = 2.0  # m shown at least
 
-track_image = cv2.zeros((500, 500, 3), np.uint8)
-cv2.line(track_image, (0, OFFSET), (OFFSET*2, OFFSET), (255, 255, 255)) # x-axis
-cv2.line(track_image, (OFFSET, 0), (OFFSET, OFFSET*2), (255, 255, 255)) # y-axis
+class Trace:
+    """Positions of one topic, queued by its callback and drawn by the renderer"""
 
-track_image_lock = Lock()
+    def __init__(self, color):
+        self.color = color
+        # appends and pops of a deque are atomic, the callbacks never wait on drawing
+        self.incoming = deque()
+        self.points = []
 
-prev_pos = (0,0)
-prev_map = (0,0)
+    def callback(self, msg):
+        self.incoming.append((msg.pose.pose.position.x, msg.pose.pose.position.y))
 
-def draw_line(start, end, color=(0, 255, 0)):
-    global track_image
-    global track_image_lock
+    def take(self):
+        new = []
+        try:
+            while True:
+                new.append(self.incoming.popleft())
+        except IndexError:
+            pass
+        return new
 
-    start = (int(start[0] * SCALE + OFFSET), int(start[1] * SCALE + OFFSET))
-    end = (int(end[0] * SCALE + OFFSET), int(end[1] * SCALE + OFFSET))
-    with track_image_lock:
-        cv2.line(track_image, start, end, color, 2)
+class TrackRenderer:
 
-    cv2.imshow("Track", track_image)
-    cv2.waitKey(1)
+    def __init__(self, traces, size=SIZE):
+        self.traces = traces
+        self.size = size
+        self.center = np.zeros(2)
+        self.scale = (size - 2*MARGIN) / MIN_SPAN
+        self.image = None
+        self.redraw()
 
-def pos_callback(msg):
-    x, y = msg.pose.pose.position.x, msg.pose.pose.position.y
-    global prev_pos
-    draw_line(prev_pos, (x, y), (0, 255, 0))
-    prev_pos = (x, y)
+    def pixels(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x = self.size/2 + (points[:, 0] - self.center[0]) * self.scale
+        y = self.size/2 - (points[:, 1] - self.center[1]) * self.scale
+        return np.column_stack((x, y)).round().astype(np.int32)
 
-def map_callback(msg):
-    x, y = msg.pose.pose.position.x, msg.pose.pose.position.y
-    global prev_map
-    draw_line(prev_map, (x, y), (0, 0, 255))
-    prev_map = (x, y)
+    def in_view(self, points):
+        p = self.pixels(points)
+        return bool(((p >= MARGIN) & (p < self.size - MARGIN)).all())
 
+    def fit(self):
+        # twice the extent of the track, so it can grow a while before the next fit
+        points = np.array([p for trace in self.traces for p in trace.points], dtype=np.float64)
+        low, high = points.min(axis=0), points.max(axis=0)
+        self.center = (low + high) / 2
+        self.scale = (self.size - 2*MARGIN) / max(2 * float((high - low).max()), MIN_SPAN)
 
-def main():
+    def redraw(self):
+        self.image = np.zeros((self.size, self.size, 3), np.uint8)
+        origin_x, origin_y = self.pixels((0.0, 0.0))[0]
+        cv2.line(self.image, (0, int(origin_y)), (self.size, int(origin_y)), (255, 255, 255)) # x-axis
+        cv2.line(self.image, (int(origin_x), 0), (int(origin_x), self.size), (255, 255, 255)) # y-axis
+        for trace in self.traces:
+            if len(trace.points) > 1:
+                cv2.polylines(self.image, [self.pixels(trace.points).reshape(-1, 1, 2)], False, trace.color, 2)
+
+    def update(self):
+        """Draws the queued positions, returns whether there were any"""
+        batches = [trace.take() for trace in self.traces]
+        if not any(batches):
+            return False
+
+        # the segment from the last drawn point joins a batch to the drawn trace
+        segments = [trace.points[-1:] + new for trace, new in zip(self.traces, batches)]
+        for trace, new in zip(self.traces, batches):
+            trace.points.extend(new)
+
+        if not all(self.in_view(new) for new in batches if new):
+            self.fit()
+            self.redraw()
+            return True
+        for trace, segment in zip(self.traces, segments):
+            if len(segment) > 1:
+                cv2.polylines(self.image, [self.pixels(segment).reshape(-1, 1, 2)], False, trace.color, 2)
+        return True
 
-    curr_pos_topic = argv[1]
-    map_topic = argv[2]
+def write_snapshot(path, image):
+    # written next to the snapshot first, a viewer never reads half an image
+    tmp_file = path + ".tmp.png"
+    cv2.imwrite(tmp_file, image)
+    os.replace(tmp_file, path)
 
-    rclpy.init()
-    global node 
+def main():
+    parser = argparse.ArgumentParser(description="Draw the odometry and the map of the steering node")
+    parser.add_argument("position_topic")
+    parser.add_argument("map_topic")
+    parser.add_argument("--size", type=int, default=SIZE, help="image size in pixels")
+    parser.add_argument("--fps", type=float, default=FPS, help="frames drawn per second")
+    parser.add_argument("--headless", metavar="PNG", help="write snapshots to this file instead of showing them")
+    parser.add_argument("--period", type=float, default=PERIOD, help="seconds between headless snapshots")
+    args = parser.parse_args(remove_ros_args(argv)[1:])
+
+    rclpy.init(args=argv)
     node = rclpy.create_node("track_drawer")
-    position_listener = node.create_subscription(Odometry, curr_pos_topic, pos_callback, 10)
-    map_listener = node.create_subscription(Odometry, map_topic, map_callback, 10)
+    position = Trace((0, 255, 0))
+    track_map = Trace((0, 0, 255))
+    position_listener = node.create_subscription(Odometry, args.position_topic, position.callback, 10)
+    map_listener = node.create_subscription(Odometry, args.map_topic, track_map.callback, 10)
     position_listener, map_listener
-    rclpy.spin(node)
+
+    # callbacks run on their own thread, the GUI stays on the main one
+    spinner = Thread(target=rclpy.spin, args=(node,), daemon=True)
+    spinner.start()
+
+    renderer = TrackRenderer([track_map, position], args.size)
+    frame_time = 1 / args.fps
+    last_snapshot = time.monotonic()
+    changed = False
+    try:
+        while rclpy.ok():
+            start = time.monotonic()
+            changed = renderer.update() or changed
+            if args.headless is None:
+                cv2.imshow("Track", renderer.image)
+                cv2.waitKey(max(1, int(1000 * (frame_time - (time.monotonic() - start)))))
+                continue
+
+            if changed and start - last_snapshot >= args.period:
+                write_snapshot(args.headless, renderer.image)
+                last_snapshot = start
+                changed = False
+            time.sleep(max(0.0, frame_time - (time.monotonic() - start)))
+    except KeyboardInterrupt:
+        pass
+
+    if args.headless is not None and changed:
+        write_snapshot(args.headless, renderer.image)
+    node.destroy_node()
+    rclpy.shutdown()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,111 @@
+"""
+Binary pose logs written by the pose_logger node.
+
+    python3 pose_log.py track.plog              summary of a log
+    python3 pose_log.py track.txt track.plog    convert a text map or text log
+
+A log is a 32 byte header followed by fixed-width records, all little endian:
+
+    header   4s magic "PLOG", u16 version, u16 record size, f64 creation time
+             (unix seconds), u32 skip_poses of the logger, 12 bytes reserved
+    records  f64 stamp (s), f64 x, f64 y, f64 yaw (rad), appended in chunks
+
+The logger only ever appends whole records, a record cut by a crash at the end is
+ignored. Logs are memory mapped, reading one costs no parsing and no copy.
+"""
+import struct
+import time
+from sys import argv
+from typing import Iterator, Optional
+
+import numpy as np
+
+from track_map import read_points
+
+MAGIC = b"PLOG"
+VERSION = 1
+HEADER = struct.Struct("<4sHHdI12x")
+HEADER_SIZE = 32
+RECORD = np.dtype([("stamp", "<f8"), ("x", "<f8"), ("y", "<f8"), ("yaw", "<f8")])
+
+
+def read_pose_log(path: str) -> np.ndarray:
+    """Records of the log at `path` as a read-only structured array mapped from the file"""
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+        file.seek(0, 2)
+        size = file.tell()
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{path} is too short for a pose log")
+    magic, version, record_size, _, _ = HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a pose log")
+    if version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"unsupported pose log version {version} in {path}")
+
+    count = (size - HEADER_SIZE) // RECORD.itemsize
+    if count == 0:
+        return np.empty(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def log_points(log: np.ndarray, rows: int = 1 << 18) -> Iterator[np.ndarray]:
+    """(n, 2) positions of the records of `log`, `rows` at a time, as the map builder takes them"""
+    for start in range(0, len(log), rows):
+        chunk = log[start : start + rows]
+        yield np.column_stack((chunk["x"], chunk["y"]))
+
+
+def write_pose_log(path: str, records: np.ndarray, skip_poses: int = 0, created: Optional[float] = None) -> None:
+    """Write `records` of dtype RECORD to a new log at `path`"""
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, time.time() if created is None else created, skip_poses))
+        file.write(np.ascontiguousarray(records, dtype=RECORD).tobytes())
+
+
+def convert_text(text_path: str, path: str) -> int:
+    """Convert a text map or text log of "x y" lines to a log, returns the number of poses.
+
+    Text logs have no stamps, they are left NaN, and the yaw is the direction of
+    travel to the next pose."""
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, RECORD.itemsize, time.time(), 0))
+        count = 0
+        previous = None
+        for points in read_points(text_path):
+            if previous is not None:
+                points = np.vstack((previous, points))
+            if len(points) < 2:
+                previous = points
+                continue
+            # the last pose waits for the next chunk to know its direction
+            records = np.empty(len(points) - 1, dtype=RECORD)
+            records["stamp"] = np.nan
+            records["x"], records["y"] = points[:-1, 0], points[:-1, 1]
+            step = np.diff(points, axis=0)
+            records["yaw"] = np.arctan2(step[:, 1], step[:, 0])
+            file.write(records.tobytes())
+            count += len(records)
+            previous = points[-1:]
+
+        if previous is not None:
+            last = np.zeros(1, dtype=RECORD)
+            last["stamp"] = np.nan
+            last["x"], last["y"] = previous[0]
+            # the direction it was reached in
+            last["yaw"] = records["yaw"][-1] if count else 0.0
+            file.write(last.tobytes())
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if len(argv) > 2:
+        print(f"{convert_text(argv[1], argv[2])} poses written to {argv[2]}")
+    else:
+        log = read_pose_log(argv[1])
+        print(f"{len(log)} poses")
+        if len(log):
+            distance = np.hypot(np.diff(log["x"]), np.diff(log["y"])).sum()
+            duration = log["stamp"][-1] - log["stamp"][0]
+            print(f"{distance:.1f} m" if np.isnan(duration) else f"{duration:.1f} s, {distance:.1f} m")
@@ -0,0 +1,428 @@
+"""
+Track maps: the driven path as a simplified polyline.
+
+A map is kept in two files next to each other: the text map read by the steering
+node, one "x y" line per point like the pose_logger output, and a compact binary
+map that also holds a uniform grid over the segments for closest-segment lookups.
+
+Binary layout, little endian:
+
+    header   4s magic "TMAP", u16 version, u16 flags (bit 0: closed loop),
+             u32 points, f32 cell size, f32 grid origin x and y,
+             u32 grid columns and rows, u32 grid entries
+    points   f32[points, 2]
+    cells    u32[columns * rows + 1], offset of the first entry of every cell
+    entries  u32[grid entries], indices of the segments touching each cell in turn
+
+Segment i runs from point i to point i + 1, on a closed loop the last one runs
+back to point 0.
+
+Closest-segment queries walk the grid in square rings of cells around the cell of
+the query, nearest first. A segment is listed in every cell its bounding box
+touches, so once the closest segment found is nearer than the inner edge of the
+next ring, no segment in a farther cell can beat it. On a track the first ring or
+two decide it, whatever the length of the track. The steering node can do the same
+in C++ with the cells and entries arrays as they are stored.
+"""
+
+import struct
+from collections import namedtuple
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+MAGIC = b"TMAP"
+VERSION = 1
+CLOSED = 0x1
+_HEADER = struct.Struct("<4sHHIfffIII")
+# upper bound of grid cells, the cell size grows for huge tracks
+_MAX_CELLS = 1 << 20
+
+# projections of query points on the track, arrays with one value per query:
+# closest segment, closest point on it, distance to it and distance along the track
+Projection = namedtuple("Projection", ["segment", "point", "distance", "progress"])
+
+
+def read_points(path: str, block_size: int = 1 << 22) -> Iterator[np.ndarray]:
+    """Stream the points of a pose_logger output or text map as (n, 2) arrays,
+    `block_size` characters at a time. NumPy .npy files are memory mapped."""
+    if path.endswith(".npy"):
+        points = np.load(path, mmap_mode="r")
+        rows = max(1, block_size // 16)
+        for start in range(0, len(points), rows):
+            yield np.asarray(points[start : start + rows, :2], dtype=np.float64)
+        return
+
+    with open(path, "r") as file:
+        rest = ""
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            # a line cut by the block end is finished by the next one
+            block = rest + block
+            cut = block.rfind("\n") + 1
+            block, rest = block[:cut], block[cut:]
+            if block.strip():
+                yield np.array(block.split(), dtype=np.float64).reshape(-1, 2)
+        if rest.strip():
+            yield np.array(rest.split(), dtype=np.float64).reshape(-1, 2)
+
+
+def _segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    # distances of `points` to the segment from `start` to `end`
+    direction = end - start
+    length2 = direction @ direction
+    if length2 == 0:
+        return np.hypot(*(points - start).T)
+    t = np.clip((points - start) @ direction / length2, 0.0, 1.0)
+    return np.hypot(*(points - start - t[:, None] * direction).T)
+
+
+def rdp_mask(points: np.ndarray, epsilon: float) -> np.ndarray:
+    """Ramer-Douglas-Peucker simplification of an open polyline, returns which points to
+    keep. Iterative, with the distances of every range computed in one go."""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(points[first + 1 : last], points[first], points[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > epsilon:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return keep
+
+
+def rdp(points: np.ndarray, epsilon: float, closed: bool = False) -> np.ndarray:
+    """Simplified copy of the polyline `points`. A closed loop is split at the point
+    farthest from the first one, so no segment of it is anchored arbitrarily."""
+    if len(points) < 3:
+        return points.copy()
+    if not closed:
+        return points[rdp_mask(points, epsilon)]
+    far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    if far == 0:
+        return points[:1].copy()
+    loop = np.vstack((points, points[:1]))
+    first = rdp_mask(loop[: far + 1], epsilon)
+    second = rdp_mask(loop[far:], epsilon)
+    return np.vstack((loop[: far + 1][first], loop[far:][second][1:-1]))
+
+
+def simplify(
+    chunks: Iterable[np.ndarray], epsilon: float, close_distance: Optional[float] = None, chunk_share: float = 0.25
+) -> "TrackMap":
+    """Map of the polyline given as consecutive chunks of points.
+
+    Every chunk is simplified with `chunk_share` of the tolerance as it arrives and the
+    joined result once more over the whole polyline with the rest of it, so memory
+    follows the simplified map and no point of the input is farther than `epsilon`
+    from it. The track is a closed loop if its ends are closer than `close_distance`."""
+    kept = []
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            # the last kept point starts the next chunk, so the polyline stays connected
+            chunk = np.vstack((carry, chunk))
+        if len(chunk) < 2:
+            carry = chunk
+            continue
+        simplified = chunk[rdp_mask(chunk, epsilon * chunk_share)]
+        kept.append(simplified[:-1])
+        carry = simplified[-1:]
+    if carry is not None:
+        kept.append(carry)
+    if not kept:
+        raise ValueError("no points to build a map from")
+    points = np.vstack(kept)
+
+    closed = (
+        close_distance is not None
+        and len(points) > 2
+        and np.hypot(*(points[-1] - points[0])) < close_distance
+    )
+    if closed:
+        # the loop closes with its last segment, the repeated start point is dropped
+        points = points[:-1]
+    return TrackMap(rdp(points, epsilon * (1 - chunk_share), closed), closed)
+
+
+class TrackMap:
+    """Polyline of a track with a uniform grid over its segments.
+
+    :param points: (n, 2) points of the polyline
+    :param bool closed: the last point connects back to the first one
+    :param float cell_size: grid cell size, by default about twice the median segment length
+    """
+
+    def __init__(self, points: np.ndarray, closed: bool = False, cell_size: Optional[float] = None):
+        self.points = np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 2)
+        self.closed = bool(closed)
+        self._build_grid(cell_size)
+        self._prepare()
+
+    @property
+    def starts(self) -> np.ndarray:
+        """Start points of the segments"""
+        return self.points if self.closed else self.points[:-1]
+
+    @property
+    def ends(self) -> np.ndarray:
+        """End points of the segments"""
+        return np.roll(self.points, -1, axis=0) if self.closed else self.points[1:]
+
+    def _build_grid(self, cell_size: Optional[float]) -> None:
+        starts, ends = self.starts.astype(np.float64), self.ends.astype(np.float64)
+        low = np.minimum(starts, ends)
+        high = np.maximum(starts, ends)
+        if len(starts):
+            origin = low.min(axis=0)
+            extent = np.maximum(high.max(axis=0) - origin, 1e-6)
+        else:
+            origin = self.points[0] if len(self.points) else np.zeros(2)
+            extent = np.ones(2)
+        if cell_size is None and len(starts):
+            lengths = np.hypot(*(ends - starts).T)
+            # cells about twice as long as the segments, but not many more cells than segments
+            cell_size = max(2 * float(np.median(lengths)), float(np.sqrt(extent[0] * extent[1] / len(lengths))))
+        if cell_size is None:
+            cell_size = float(extent.max())
+        cell_size = max(cell_size, float(np.sqrt(extent[0] * extent[1] / _MAX_CELLS)))
+
+        self.cell_size = float(cell_size)
+        self.origin = np.asarray(origin, dtype=np.float32)
+        self.columns, self.rows = (int(n) for n in np.floor(extent / cell_size).astype(np.int64) + 1)
+
+        # every segment is listed in the cells its bounding box touches
+        first = self._cell_coordinates(low)
+        last = self._cell_coordinates(high)
+        spans = last - first + 1
+        counts = spans[:, 0] * spans[:, 1]
+        segment = np.repeat(np.arange(len(starts), dtype=np.uint32), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        column = np.repeat(first[:, 0], counts) + offset % np.repeat(spans[:, 0], counts)
+        row = np.repeat(first[:, 1], counts) + offset // np.repeat(spans[:, 0], counts)
+        cell = row * self.columns + column
+
+        order = np.argsort(cell, kind="stable")
+        self.entries = segment[order]
+        self.cells = np.zeros(self.columns * self.rows + 1, dtype=np.uint32)
+        np.cumsum(np.bincount(cell, minlength=self.columns * self.rows), out=self.cells[1:])
+
+    def _prepare(self) -> None:
+        # segments and the distance along the track at their starts, for the queries
+        self._starts = self.starts.astype(np.float64)
+        self._directions = self.ends.astype(np.float64) - self._starts
+        self._lengths = np.hypot(*self._directions.T)
+        self._progress = np.concatenate(([0.0], np.cumsum(self._lengths)))
+        self._rings = {}
+
+    def _cell_coordinates(self, points: np.ndarray, clamp: bool = True) -> np.ndarray:
+        # column and row of the cells holding `points`, clamped to the grid
+        coordinates = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        if not clamp:
+            return coordinates
+        return np.clip(coordinates, 0, (self.columns - 1, self.rows - 1))
+
+    @property
+    def length(self) -> float:
+        """Length of the track, with the closing segment of a loop"""
+        return float(self._progress[-1])
+
+    def closest(self, points: np.ndarray) -> Projection:
+        """Closest points on the track to `points`, one (2,) point or (n, 2) points"""
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim == 1:
+            return self._closest_one(points)
+        count = len(points)
+        segment = np.full(count, -1, dtype=np.int64)
+        distance = np.full(count, np.inf)
+        t = np.zeros(count)
+
+        if len(self._starts):
+            cells = self._cell_coordinates(points, clamp=False)
+            # cells between a query off the grid and the grid are empty, its walk starts at the grid
+            outside = np.maximum(np.maximum(-cells, cells - (self.columns - 1, self.rows - 1)), 0).max(axis=1)
+            last_ring = outside + max(self.columns, self.rows)
+            ring = outside.copy()
+            active = np.arange(count)
+            while len(active):
+                for radius in np.unique(ring[active]):
+                    queries = active[ring[active] == radius]
+                    self._search_ring(points, cells, queries, int(radius), segment, distance, t)
+                # segments in the next ring are at least `ring` cells away
+                done = (distance[active] <= ring[active] * self.cell_size) | (ring[active] >= last_ring[active])
+                ring[active] += 1
+                active = active[~done]
+
+        # a track without segments has no closest point, its queries keep segment -1
+        found = segment >= 0
+        hit = segment[found]
+        closest = points.copy()
+        closest[found] = self._starts[hit] + t[found, None] * self._directions[hit]
+        progress = np.zeros(count)
+        progress[found] = self._progress[hit] + t[found] * self._lengths[hit]
+        return Projection(segment, closest, distance, progress)
+
+    def _closest_one(self, point: np.ndarray) -> Projection:
+        # the ring walk of `closest` for one query, without the bookkeeping of many
+        best, best_distance, best_t = -1, np.inf, 0.0
+        if len(self._starts):
+            column, row = (int(v) for v in self._cell_coordinates(point, clamp=False))
+            outside = max(-column, -row, column - self.columns + 1, row - self.rows + 1, 0)
+            for radius in range(outside, outside + max(self.columns, self.rows) + 1):
+                pieces = []
+                for dc, dr in self._ring_offsets(radius):
+                    c, r = column + dc, row + dr
+                    if 0 <= c < self.columns and 0 <= r < self.rows:
+                        index = r * self.columns + c
+                        pieces.append(self.entries[self.cells[index] : self.cells[index + 1]])
+                candidates = np.concatenate(pieces).astype(np.int64) if pieces else ()
+                if len(candidates):
+                    start, direction = self._starts[candidates], self._directions[candidates]
+                    offset = point - start
+                    length2 = np.einsum("ij,ij->i", direction, direction)
+                    along = np.clip(np.einsum("ij,ij->i", offset, direction) / np.where(length2 > 0, length2, 1.0), 0.0, 1.0)
+                    distances = np.hypot(*(offset - along[:, None] * direction).T)
+                    nearest = int(np.argmin(distances))
+                    if distances[nearest] < best_distance:
+                        best, best_distance, best_t = int(candidates[nearest]), float(distances[nearest]), float(along[nearest])
+                if best_distance <= radius * self.cell_size:
+                    break
+
+        if best < 0:
+            return Projection(best, point.copy(), best_distance, 0.0)
+        return Projection(
+            best,
+            self._starts[best] + best_t * self._directions[best],
+            best_distance,
+            float(self._progress[best] + best_t * self._lengths[best]),
+        )
+
+    def _ring_offsets(self, radius: int) -> np.ndarray:
+        # column and row offsets of the square ring of cells at `radius`
+        offsets = self._rings.get(radius)
+        if offsets is None:
+            if radius == 0:
+                offsets = np.zeros((1, 2), dtype=np.int64)
+            else:
+                side = np.arange(-radius, radius + 1)
+                offsets = np.vstack((
+                    np.column_stack((side, np.full_like(side, -radius))),
+                    np.column_stack((side, np.full_like(side, radius))),
+                    np.column_stack((np.full(len(side) - 2, -radius), side[1:-1])),
+                    np.column_stack((np.full(len(side) - 2, radius), side[1:-1])),
+                ))
+            self._rings[radius] = offsets
+        return offsets
+
+    def _search_ring(self, points, cells, queries, radius, segment, distance, t) -> None:
+        # closest segments to `points[queries]` among those in the cells at `radius` around `cells[queries]`
+        offsets = self._ring_offsets(radius)
+        query = np.repeat(queries, len(offsets))
+        cell = cells[query] + np.tile(offsets, (len(queries), 1))
+        inside = (cell >= 0).all(axis=1) & (cell[:, 0] < self.columns) & (cell[:, 1] < self.rows)
+        query, cell = query[inside], cell[inside]
+        index = cell[:, 1] * self.columns + cell[:, 0]
+        first, counts = self.cells[index].astype(np.int64), (self.cells[index + 1] - self.cells[index]).astype(np.int64)
+        if not counts.sum():
+            return
+
+        # every segment of every cell against its query
+        query = np.repeat(query, counts)
+        entry = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+        candidate = self.entries[entry].astype(np.int64)
+        start, direction = self._starts[candidate], self._directions[candidate]
+        offset = points[query] - start
+        length2 = np.einsum("ij,ij->i", direction, direction)
+        along = np.clip(np.einsum("ij,ij->i", offset, direction) / np.where(length2 > 0, length2, 1.0), 0.0, 1.0)
+        candidate_distance = np.hypot(*(offset - along[:, None] * direction).T)
+
+        # the nearest candidate of every query, kept if it beats the rings before
+        order = np.lexsort((candidate_distance, query))
+        query, best = np.unique(query[order], return_index=True)
+        best = order[best]
+        better = candidate_distance[best] < distance[query]
+        query, best = query[better], best[better]
+        segment[query] = candidate[best]
+        distance[query] = candidate_distance[best]
+        t[query] = along[best]
+
+    def point_at(self, progress: np.ndarray) -> np.ndarray:
+        """Points at the distances `progress` along the track, around a closed loop
+        and clamped to the ends of an open track"""
+        progress = np.asarray(progress, dtype=np.float64)
+        if not len(self._lengths):
+            return np.broadcast_to(self.points[0].astype(np.float64), progress.shape + (2,)).copy()
+        if self.closed:
+            progress = np.mod(progress, self.length)
+        else:
+            progress = np.clip(progress, 0.0, self.length)
+        segment = np.clip(np.searchsorted(self._progress, progress, side="right") - 1, 0, len(self._lengths) - 1)
+        t = (progress - self._progress[segment]) / np.where(self._lengths[segment] > 0, self._lengths[segment], 1.0)
+        return self._starts[segment] + t[..., None] * self._directions[segment]
+
+    def progress(self, points: np.ndarray) -> np.ndarray:
+        """Distances along the track of the closest points to `points`"""
+        return self.closest(points).progress
+
+    def lookahead(self, points: np.ndarray, distance: float) -> np.ndarray:
+        """Points `distance` ahead along the track of the closest points to `points`"""
+        return self.point_at(np.asarray(self.closest(points).progress) + distance)
+
+    def save(self, path: str) -> None:
+        """Write the binary map to `path`"""
+        with open(path, "wb") as file:
+            file.write(
+                _HEADER.pack(
+                    MAGIC,
+                    VERSION,
+                    CLOSED if self.closed else 0,
+                    len(self.points),
+                    self.cell_size,
+                    float(self.origin[0]),
+                    float(self.origin[1]),
+                    self.columns,
+                    self.rows,
+                    len(self.entries),
+                )
+            )
+            file.write(self.points.astype("<f4").tobytes())
+            file.write(self.cells.astype("<u4").tobytes())
+            file.write(self.entries.astype("<u4").tobytes())
+
+    def save_text(self, path: str) -> None:
+        """Write the text map read by the steering node to `path`"""
+        np.savetxt(path, self.points, fmt="%.6f")
+
+    @classmethod
+    def load(cls, path: str) -> "TrackMap":
+        """Read a binary map, or build one from a text map or pose_logger output"""
+        with open(path, "rb") as file:
+            is_binary = file.read(len(MAGIC)) == MAGIC
+        if not is_binary:
+            return cls(np.vstack(list(read_points(path))))
+
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, flags, points, cell_size, x, y, columns, rows, entries = _HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"unsupported map version {version} in {path}")
+        offset = _HEADER.size
+        track = cls.__new__(cls)
+        track.points = np.frombuffer(data, "<f4", points * 2, offset).reshape(-1, 2).astype(np.float32)
+        offset += points * 8
+        track.cells = np.frombuffer(data, "<u4", columns * rows + 1, offset).astype(np.uint32)
+        offset += (columns * rows + 1) * 4
+        track.entries = np.frombuffer(data, "<u4", entries, offset).astype(np.uint32)
+        track.closed = bool(flags & CLOSED)
+        track.cell_size = cell_size
+        track.origin = np.array((x, y), dtype=np.float32)
+        track.columns, track.rows = columns, rows
+        track._prepare()
+        return track
@@ -1,28 +1,103 @@
+"""
+Collects the poses on a PoseStamped topic into a nav_msgs/Path.
+
+    python3 trajectory_path.py <pose topic> <path topic> [options]
+
+A pose is kept when it is `--distance` meters or `--angle` degrees away from the
+last kept one, and only the latest `--length` poses are kept. The path is published
+at most `--rate` times a second and only when it changed. With `--delta`, the poses
+kept since the last publish also go to <path topic>/delta, so a visualizer can
+append them instead of taking the whole path.
+"""
+import argparse
+import math
+from collections import deque
+
 import rclpy
+from rclpy.node import Node
+from rclpy.utilities import remove_ros_args
 from nav_msgs.msg import Path
 from geometry_msgs.msg import PoseStamped
 from sys import argv
 
-path = Path()
+MIN_DISTANCE = 0.05  # m
+MIN_ANGLE = 5.0  # deg
+MAX_LENGTH = 5000
+RATE = 5.0  # Hz
 
-def pose_callback(msg):
-    global path
-    path.header = msg.header
-    path.poses.append(msg)
+class TrajectoryPath(Node):
 
-def main():
+    def __init__(self, pose_topic, path_topic, min_distance, min_angle, max_length, rate, delta):
+        super().__init__("trajectory_path")
+        self.logger = self.get_logger()
+
+        self.min_distance = min_distance
+        self.min_angle = math.radians(min_angle)
+        # oldest poses drop out once the path is full
+        self.poses = deque(maxlen=max_length or None)
+        self.new_poses = []
+        self.last = None
+        self.header = None
+
+        self.pose_sub = self.create_subscription(PoseStamped, pose_topic, self.pose_callback, 10)
+        self.path_pub = self.create_publisher(Path, path_topic, 10)
+        self.delta_pub = self.create_publisher(Path, path_topic + "/delta", 10) if delta else None
+        self.timer = self.create_timer(1/rate, self.timer_callback)
+
+        self.logger.info(f"Collecting {pose_topic} into {path_topic}.")
 
-    rclpy.init(args=None)
-    node = rclpy.create_node('trajectory_path')
-    pose_sub = node.create_subscription(PoseStamped, argv[1], pose_callback, 10)
-    path_pub = node.create_publisher(Path, argv[2], 10)
-    pose_sub
+    def pose_callback(self, msg: PoseStamped):
+        self.header = msg.header
+        if self.last is not None and not self.moved(self.last.pose, msg.pose):
+            return
+        self.last = msg
+        self.poses.append(msg)
+        self.new_poses.append(msg)
+
+    def moved(self, a, b):
+        distance = math.dist(
+            (a.position.x, a.position.y, a.position.z), (b.position.x, b.position.y, b.position.z)
+        )
+        if distance >= self.min_distance:
+            return True
+        qa, qb = a.orientation, b.orientation
+        dot = abs(qa.w*qb.w + qa.x*qb.x + qa.y*qb.y + qa.z*qb.z)
+        return 2 * math.acos(min(dot, 1.0)) >= self.min_angle
+
+    def timer_callback(self):
+        if not self.new_poses:
+            return
+        self.logger.info("Publishing trajectory...", once=True)
+
+        msg = Path()
+        msg.header = self.header
+        msg.poses = list(self.poses)
+        self.path_pub.publish(msg)
+
+        if self.delta_pub is not None:
+            delta = Path()
+            delta.header = self.header
+            delta.poses = self.new_poses
+            self.delta_pub.publish(delta)
+        self.new_poses = []
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect poses into a path")
+    parser.add_argument("pose_topic")
+    parser.add_argument("path_topic")
+    parser.add_argument("--distance", type=float, default=MIN_DISTANCE, help="meters between kept poses")
+    parser.add_argument("--angle", type=float, default=MIN_ANGLE, help="degrees of rotation between kept poses")
+    parser.add_argument("--length", type=int, default=MAX_LENGTH, help="poses kept, 0 keeps all")
+    parser.add_argument("--rate", type=float, default=RATE, help="largest publish rate in Hz")
+    parser.add_argument("--delta", action="store_true", help="also publish the new poses on <path topic>/delta")
+    args = parser.parse_args(remove_ros_args(argv)[1:])
 
-    while True:
-        rclpy.spin_once(node)
+    rclpy.init(args=argv)
+    node = TrajectoryPath(args.pose_topic, args.path_topic, args.distance, args.angle, args.length, args.rate, args.delta)
+    rclpy.spin(node)
 
-        if len(path.poses) > 0:
-            path_pub.publish(path)
+    node.destroy_node()
+    rclpy.shutdown()
 
 if __name__ == '__main__':
     main()